@@ -0,0 +1,75 @@
+"""Benchmark of the local binning aggregators.
+
+Compares the NumPy aggregators of `eocanvas.snap.binning.binner` to a reference in pure
+Python, on random samples spread over a fixed number of bins. The NumPy aggregators
+process the samples in chunks of one million.
+Run with `python benchmarks/bench_binning.py`.
+"""
+
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from eocanvas.snap.binning.aggregators import (
+    AggregatorAvg,
+    AggregatorAvgOutlier,
+    AggregatorMinMax,
+    AggregatorOnMaxSet,
+    AggregatorPercentile,
+    AggregatorSum,
+)
+from eocanvas.snap.binning.binner import bin_samples
+
+SIZES = [100_000, 1_000_000, 10_000_000]
+NUM_BINS = 100_000
+# The pure Python reference is only measured on the smaller sample sets
+REFERENCE_SIZE = 1_000_000
+
+AGGREGATORS = {
+    "AVG": AggregatorAvg("chl", "chl"),
+    "AVG_OUTLIER": AggregatorAvgOutlier("chl", "chl"),
+    "MIN_MAX": AggregatorMinMax("chl", "chl"),
+    "ON_MAX_SET": AggregatorOnMaxSet("chl_max", "chl", "tsm"),
+    "PERCENTILE": AggregatorPercentile("chl", "chl", 90),
+    "SUM": AggregatorSum("chl", "chl"),
+}
+
+
+def reference(bins, values):
+    """Mean and min/max of each bin, in pure Python."""
+    sums = defaultdict(float)
+    counts = defaultdict(int)
+    minima, maxima = {}, {}
+    for index, value in zip(bins.tolist(), values.tolist()):
+        sums[index] += value
+        counts[index] += 1
+        minima[index] = min(minima.get(index, value), value)
+        maxima[index] = max(maxima.get(index, value), value)
+    return {index: sums[index] / counts[index] for index in sums}, minima, maxima
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'samples':>10} {'aggregator':>12} {'time (ms)':>10} {'Msamples/s':>11}")
+    for size in SIZES:
+        bins = rng.integers(0, NUM_BINS, size)
+        variables = {"chl": rng.lognormal(0.0, 1.0, size), "tsm": rng.random(size)}
+
+        for name, aggregator in AGGREGATORS.items():
+            start = time.perf_counter()
+            bin_samples([aggregator], bins, variables, num_bins=NUM_BINS)
+            elapsed = time.perf_counter() - start
+            print(f"{size:>10} {name:>12} {elapsed * 1000:>10.1f} {size / elapsed / 1e6:>11.1f}")
+
+        if size <= REFERENCE_SIZE:
+            start = time.perf_counter()
+            reference(bins, variables["chl"])
+            elapsed = time.perf_counter() - start
+            print(
+                f"{size:>10} {'python':>12} {elapsed * 1000:>10.1f} {size / elapsed / 1e6:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark of Graph.add_node on graphs with a growing number of nodes.
+
+Run with `python benchmarks/bench_graph.py`.
+"""
+
+import time
+
+from eocanvas.snap import Graph, Operator
+
+SIZES = [100, 500, 1000, 2000, 5000]
+
+
+def build(size):
+    operator = Operator("Subset", region="0,0,100,100", copyMetadata="true")
+    graph = Graph()
+    graph.add_node(Operator("Read", file="$img1"), "Read")
+    start = time.perf_counter()
+    for index in range(size):
+        source = "Read" if index == 0 else f"Subset{index - 1}"
+        graph.add_node(operator, f"Subset{index}", source)
+    return graph, time.perf_counter() - start
+
+
+def update(graph, size):
+    operator = Operator("Subset", region="0,0,50,50")
+    start = time.perf_counter()
+    for index in range(size):
+        graph.add_node(operator, f"Subset{index}")
+    return time.perf_counter() - start
+
+
+def encode(graph, repeat=10):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        graph.b64encode()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    print(
+        f"{'nodes':>8} {'add (s)':>10} {'add/node (us)':>14} {'update (s)':>11} "
+        f"{'encode (s)':>11} {'encode cached (s)':>18}"
+    )
+    for size in SIZES:
+        graph, added = build(size)
+        updated = update(graph, size)
+        first = encode(graph, repeat=1)
+        cached = encode(graph)
+        print(
+            f"{size:>8} {added:>10.3f} {added / size * 1e6:>14.1f} {updated:>11.3f} "
+            f"{first:>11.3f} {cached:>18.6f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
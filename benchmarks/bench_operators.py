@@ -0,0 +1,42 @@
+"""Benchmark of the first use of the SNAP operators, as paid by every new process.
+
+Each measure runs in a fresh interpreter, after the imports.
+Run with `python benchmarks/bench_operators.py`.
+"""
+
+import subprocess
+import sys
+
+REPEAT = 5
+
+IMPORTS = """
+import yaml
+from eocanvas.snap import Graph, Operator, index
+from eocanvas.snap.snap import Snap
+"""
+CASES = {
+    "Operator (index)": "Operator('Read')",
+    "Operator (json)": "Snap(index.JSON_FILENAME); Operator('Read')",
+    "list_operators": "Graph.list_operators()",
+    "operators.yaml": "yaml.safe_load(open(index.DIRNAME + '/data/operators.yaml'))",
+}
+
+
+def measure(code):
+    script = f"{IMPORTS}import time\nstart = time.perf_counter()\n{code}\n"
+    script += "print(time.perf_counter() - start)"
+    timings = [
+        float(subprocess.check_output([sys.executable, "-c", script], text=True))
+        for _ in range(REPEAT)
+    ]
+    return min(timings)
+
+
+def main():
+    print(f"{'first use of':>18} {'best of %d (ms)' % REPEAT:>16}")
+    for name, code in CASES.items():
+        print(f"{name:>18} {measure(code) * 1000:16.2f}")
+
+
+if __name__ == "__main__":
+    main()
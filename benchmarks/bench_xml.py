@@ -0,0 +1,54 @@
+"""Benchmark of the XML serialization of large binning configurations.
+
+Compares building the lxml tree with `to_xml` and serializing it, to streaming the
+configuration with `eocanvas.snap.xmlwriter.dump`. Each measure runs in a fresh
+interpreter, so that the peak memory is the one of the serialization.
+Run with `python benchmarks/bench_xml.py`.
+"""
+
+import subprocess
+import sys
+
+SIZES = [1000, 10000, 50000]
+
+SETUP = """
+import io, resource, time
+import lxml.etree as etree
+from eocanvas.snap.binning import Aggregators, BinningVariable, BinningVariables
+from eocanvas.snap.binning.aggregators import AggregatorAvg
+from eocanvas.snap.xmlwriter import dump
+
+size = {size}
+config = Aggregators([AggregatorAvg(f"var{{i}}", f"var{{i}}_avg") for i in range(size)])
+variables = BinningVariables(
+    [BinningVariable(f"var{{i}}", f"B{{i}} * 2", f"B{{i}} > 0") for i in range(size)]
+)
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+"""
+CASES = {
+    "tree": "for c in (config, variables): etree.tostring(c.to_xml(), pretty_print=True)",
+    "stream": "for c in (config, variables): dump(c, io.BytesIO())",
+}
+REPORT = """
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+"""
+
+
+def measure(size, code):
+    script = SETUP.format(size=size) + code + REPORT
+    elapsed, memory = subprocess.check_output([sys.executable, "-c", script], text=True).split()
+    return float(elapsed), int(memory)
+
+
+def main():
+    print(f"{'records':>8} {'case':>7} {'time (ms)':>10} {'peak RSS (KB)':>14}")
+    for size in SIZES:
+        for name, code in CASES.items():
+            elapsed, memory = measure(size, code)
+            print(f"{size:>8} {name:>7} {elapsed * 1000:>10.1f} {memory:>14}")
+
+
+if __name__ == "__main__":
+    main()
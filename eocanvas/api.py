@@ -3,6 +3,7 @@ from __future__ import annotations
 import base64
 import json
 import os
+import threading
 import time
 from dataclasses import dataclass, field, fields
 from datetime import datetime
@@ -12,12 +13,15 @@ from typing import TYPE_CHECKING, Any, Dict, Generator, List, Optional, Protocol
 import requests
 
 from .auth import Credentials, HTTPOAuth2, OAuthToken
+from .cache import ResultCache
 from .config import URLs
 from .exceptions import APINotInitializedError, JobFailed, NotDownloadableError
 from .http import delete, get, post
 from .keystore import encrypt_data
+from .ledger import SubmissionLedger
 from .logging import logger
-from .utils import Singleton
+from .ratelimit import RateLimiter
+from .utils import Singleton, canonical_hash
 
 # -----------------------------------------------------
 # Utils
@@ -46,6 +50,9 @@ class API(metaclass=Singleton):
     Attributes:
         urls: The :class:`eocanvas.config.URLs` object that maps all the API endpoints
         credentials: A :class:`eocanvas.auth.Credentials` object with username and password
+        rate_limiter: An optional :class:`eocanvas.ratelimit.RateLimiter` to throttle the calls
+        ledger: An optional :class:`eocanvas.ledger.SubmissionLedger` to avoid duplicated jobs
+        result_cache: An optional :class:`eocanvas.cache.ResultCache` to reuse completed results
     """
 
     def __init__(
@@ -53,6 +60,9 @@ class API(metaclass=Singleton):
         urls: Optional[URLs] = None,
         credentials: Optional[Credentials] = None,
         log_level: int = INFO,
+        rate_limiter: Optional[RateLimiter] = None,
+        ledger: Optional[SubmissionLedger] = None,
+        result_cache: Optional[ResultCache] = None,
     ):
         """"""
         logger.setLevel(log_level)
@@ -67,28 +77,52 @@ class API(metaclass=Singleton):
 
         self.urls = urls
         self.auth = HTTPOAuth2(token)
+        self.rate_limiter = rate_limiter
+        self.ledger = ledger
+        self.result_cache = result_cache
         self._builder = Builder(self)
+        # Submissions of the same fingerprint are serialized, so that concurrent submissions
+        # of one process find the job of the first in the ledger
+        self._submission_locks = [threading.Lock() for _ in range(64)]
+
+    def _throttle(self, endpoint_name: str) -> None:
+        """Waits for the rate limiter, if any, to allow a call to the endpoint."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(endpoint_name)
+
+    def _throttled_get(self, endpoint_name: str) -> GetCallable:
+        """Returns the http.get function throttled on the given endpoint."""
+
+        def _get(url: str, **kwargs: Any) -> requests.Response:
+            self._throttle(endpoint_name)
+            return get(url, **kwargs)
+
+        return _get
 
     def get_public_key(self) -> str | Any:
         url = self.urls.get("key_detail", key_id="cert/public")
+        self._throttle("key_detail")
         response = get(url, auth=self.auth)
         return response.content
 
     def landing_page(self) -> LandingPage:
         """Returns the standard OGC Landing Page."""
         url = self.urls.get("landing_page")
+        self._throttle("landing_page")
         response = get(url, auth=self.auth)
         return self._builder.build_landing_page(response.json())
 
     def get_api(self) -> Dict:
         """Gets the current API definition as a dictionary."""
         url = self.urls.get("api")
+        self._throttle("api")
         response = get(url, auth=self.auth)
         return response.json()
 
     def get_conformance(self) -> Dict:
         """Gets the OGC conformance list."""
         url = self.urls.get("conformance")
+        self._throttle("conformance")
         response = get(url, auth=self.auth)
         return response.json()
 
@@ -102,6 +136,7 @@ class API(metaclass=Singleton):
             A :class:`eocanvas.api.Key` instance.
         """
         url = self.urls.get("key_detail", key_id=key_id)
+        self._throttle("key_detail")
         response = get(url, auth=self.auth)
         return self._builder.build_key(response.json())
 
@@ -112,6 +147,7 @@ class API(metaclass=Singleton):
             A list of :class:`eocanvas.api.Key` instances.
         """
         url = self.urls.get("key_list")
+        self._throttle("key_list")
         response = get(url, auth=self.auth)
         return [self._builder.build_key(data) for data in response.json()]
 
@@ -125,6 +161,7 @@ class API(metaclass=Singleton):
             Key: The newly created Key
         """
         url = self.urls.get("key_list")
+        self._throttle("key_list")
         post(url, json=key.asdict(), auth=self.auth)
         # The API response is empty. We return the key itself.
         return key
@@ -136,6 +173,7 @@ class API(metaclass=Singleton):
             key_id (str): The ID of the key.
         """
         url = self.urls.get("key_detail", key_id=key_id)
+        self._throttle("key_detail")
         delete(url, auth=self.auth)
 
     def get_process(self, process_id: str) -> Process:
@@ -148,6 +186,7 @@ class API(metaclass=Singleton):
             A :class:`eocanvas.api.Process` instance.
         """
         url = self.urls.get("process_detail", process_id=process_id)
+        self._throttle("process_detail")
         response = get(url, auth=self.auth)
         return self._builder.build_process(response.json())
 
@@ -158,20 +197,70 @@ class API(metaclass=Singleton):
             A list of :class:`eocanvas.api.Process` instances.
         """
         url = self.urls.get("process_list")
-        paginator = Paginator(get, url, "processes")
+        paginator = Paginator(self._throttled_get("process_list"), url, "processes")
         return [self._builder.build_process(data) for data in paginator.run(auth=self.auth)]
 
-    def exec_process(self, process: Process) -> Job:
+    def exec_process(self, process: Process, force: bool = False, validate: bool = False) -> Job:
         """Submits a process to the API.
 
+        If a ledger is configured and an identical process has already been submitted,
+        the existing job is returned as long as it is still in progress or successful.
+
+        Args:
+            process (Process): The process to submit.
+            force (bool, optional): Submit the process even if it is a duplicate.
+            validate (bool, optional): Validate the process locally before submitting it.
+
         Returns:
             A :class:`eocanvas.api.Job` instance.
         """
+        if validate:
+            process.validate()
         inputs = process.prepare_inputs()
+        if self.ledger is None:
+            return self._post_process(process, inputs)
+
+        fingerprint = process.fingerprint()
+        with self._submission_locks[hash(fingerprint) % len(self._submission_locks)]:
+            if not force:
+                job = self._get_submitted_job(fingerprint)
+                if job is not None:
+                    logger.info(f"Process already submitted as job {job.job_id}")
+                    return job
+
+            job = self._post_process(process, inputs)
+            self.ledger.record(fingerprint, process.process_id, job.job_id)
+        return job
+
+    def _post_process(self, process: Process, inputs: Dict) -> Job:
         url = self.urls.get("process_execution", process_id=process.process_id)
-        response = post(url, json=inputs, auth=self.auth)
+        self._throttle("process_execution")
+        # A POST that timed out may still have created a job: resending it would submit
+        # the process twice, so only the connection errors are retried.
+        response = post(url, json=inputs, auth=self.auth, resend=False)
         return self._builder.build_job(response.json())
 
+    def _get_submitted_job(self, fingerprint: str) -> Optional[Job]:
+        """Returns the job recorded in the ledger for the fingerprint, if it is reusable."""
+        assert self.ledger is not None
+        job_id = self.ledger.lookup(fingerprint)
+        if job_id is None:
+            return None
+
+        try:
+            job = self.get_job(job_id)
+        except requests.exceptions.HTTPError as exc:
+            # Only a job unknown to the API is stale: other errors, such as an outage,
+            # must not lead to a duplicated submission
+            if exc.response is None or exc.response.status_code != 404:
+                raise
+            job = None
+
+        if job is None or job.status not in ("accepted", "running", "successful"):
+            self.ledger.forget(fingerprint)
+            return None
+        return job
+
     def get_job(self, job_id) -> Job:
         """Gets the details of a job.
 
@@ -179,6 +268,7 @@ class API(metaclass=Singleton):
             A :class:`eocanvas.api.Job` instance.
         """
         url = self.urls.get("job_detail", job_id=job_id)
+        self._throttle("job_detail")
         response = get(url, auth=self.auth)
         return self._builder.build_job(response.json())
 
@@ -189,7 +279,7 @@ class API(metaclass=Singleton):
             A list of :class:`eocanvas.api.Job` instances.
         """
         url = self.urls.get("job_list")
-        paginator = Paginator(get, url, "jobs")
+        paginator = Paginator(self._throttled_get("job_list"), url, "jobs")
         return [self._builder.build_job(data) for data in paginator.run(auth=self.auth)]
 
     def get_job_logs(self, job: Union[Job, str]) -> List[LogEntry]:
@@ -207,6 +297,7 @@ class API(metaclass=Singleton):
             job_id = job
 
         url = self.urls.get("job_logs", job_id=job_id)
+        self._throttle("job_logs")
         response = get(url, auth=self.auth)
         return [self._builder.build_log_entry(data) for data in response.json()]
 
@@ -225,6 +316,7 @@ class API(metaclass=Singleton):
             job_id = job
 
         url = self.urls.get("job_results", job_id=job_id)
+        self._throttle("job_results")
         response = get(url, auth=self.auth)
         results = response.json()
 
@@ -233,6 +325,7 @@ class API(metaclass=Singleton):
         next_page = results[-1]
         while next_page["title"] == "next-page":
             results.pop()
+            self._throttle("job_results")
             response = get(self.urls.base_url + next_page["href"], auth=self.auth)
             paginated_results = response.json()
             next_page = paginated_results[-1]
@@ -246,11 +339,12 @@ class API(metaclass=Singleton):
 
         return [self._builder.build_result(data) for data in results]
 
-    def download_result(self, result: Result, download_dir: Optional[str] = None):
+    def download_result(self, result: Result, download_dir: Optional[str] = None) -> str:
         if download_dir is None:
             download_dir = "."
 
         os.makedirs(download_dir, exist_ok=True)
+        self._throttle("download")
         response = get(result.full_url, auth=self.auth, stream=True)
         filename = result.title.split("/")[-1]
         download_path = os.path.join(download_dir, filename)
@@ -259,6 +353,7 @@ class API(metaclass=Singleton):
             for chunk in response.iter_content(chunk_size=1024):
                 if chunk:
                     f.write(chunk)
+        return download_path
 
 
 # -----------------------------------------------------
@@ -428,7 +523,7 @@ class Result:
     def full_url(self) -> str:
         return self.href
 
-    def download(self, download_dir: Optional[str] = None):
+    def download(self, download_dir: Optional[str] = None) -> str:
         if self.title.startswith("keystore"):
             raise NotDownloadableError(
                 "External reference to the result, not served by this service."
@@ -599,25 +694,66 @@ class Process:
 
         return inputs
 
-    def submit(self) -> Job:
+    def validate(self) -> None:
+        """Checks the process inputs locally. To be defined in subclasses."""
+
+    def fingerprint(self) -> str:
+        """Returns a stable hash of the process ID and of its inputs."""
+        return canonical_hash(self.process_id, self.prepare_inputs())
+
+    def submit(self, force: bool = False, validate: bool = False) -> Job:
         if self.api is None:
             raise APINotInitializedError("API not initialized")
-        return self.api.exec_process(self)
+        return self.api.exec_process(self, force=force, validate=validate)
 
     def run(
-        self, job: Optional[Job] = None, download_dir: Optional[str] = None, download: bool = True
-    ):
+        self,
+        job: Optional[Job] = None,
+        download_dir: Optional[str] = None,
+        download: bool = True,
+        force: bool = False,
+    ) -> List[str]:
+        """Submits the process, waits for its completion and downloads the results.
+
+        If the API has a result cache, an identical process already completed is not
+        submitted again: its cached files are restored instead.
+
+        Args:
+            job (Job, optional): An already submitted job to wait for.
+            download_dir (str, optional): Where to download the results. Defaults to ".".
+            download (bool, optional): Whether to download the results. Defaults to True.
+            force (bool, optional): Skip the submission ledger and the cache lookup.
+
+        Returns:
+            The list of the downloaded file paths.
+        """
+        cache = getattr(self.api, "result_cache", None)
+        fingerprint = None
+        if cache is not None and job is None:
+            fingerprint = self.fingerprint()
+            entry = None if force else cache.get(fingerprint)
+            if entry is not None:
+                logger.info(f"Using cached results of job {entry.job_id}")
+                return entry.restore(download_dir) if download else []
+
         if job is None:
-            job = self.submit()
-        return JobRunner(job, download).run(download_dir)
+            job = self.submit(force=force)
+        runner = JobRunner(job, download)
+        paths = runner.run(download_dir)
+
+        if cache is not None and fingerprint is not None and download:
+            results = [{"href": r.href, "title": r.title, "rel": r.rel} for r in runner.results]
+            cache.put(fingerprint, job.job_id, results, paths)
+        return paths
 
 
 class JobRunner:
     def __init__(self, job: Job, download: bool = True):
         self.job = job
         self.download = download
+        self.results: List[Result] = []
 
-    def run(self, download_dir: Optional[str] = None):
+    def run(self, download_dir: Optional[str] = None) -> List[str]:
         sleep = 10.0
         status = self.job.status
         while status != "successful":
@@ -633,12 +769,15 @@ class JobRunner:
             self.job.refresh_from_api()
             status = self.job.status
 
+        paths = []
         if self.download:
-            for result in self.job.results:
+            self.results = self.job.results
+            for result in self.results:
                 try:
-                    result.download(download_dir)
+                    paths.append(result.download(download_dir))
                 except NotDownloadableError:
                     logger.info(result.title)
+        return paths
 
 
 class GetCallable(Protocol):
@@ -0,0 +1,203 @@
+"""A persistent cache of the completed process results.
+
+Processes are keyed by their fingerprint, see :meth:`eocanvas.api.Process.fingerprint`.
+For every completed process the cache keeps the list of results and a copy of the
+downloaded files, so that running an identical process again does not need a new job.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+from .config import get_cache_dir
+from .logging import logger
+
+
+def _copy(src: str, dst: str) -> None:
+    """Copies a file, so that editing the copy leaves the cached file untouched."""
+    if os.path.exists(dst):
+        os.remove(dst)
+    shutil.copy2(src, dst)
+
+
+@dataclass
+class CacheEntry:
+    """The cached outcome of a process."""
+
+    fingerprint: str
+    job_id: str
+    results: List[Dict]
+    files: List[str]
+    created: float
+
+    def restore(self, download_dir: Optional[str] = None) -> List[str]:
+        """Copies the cached files to the download directory.
+
+        Returns:
+            The list of the restored file paths.
+        """
+        if download_dir is None:
+            download_dir = "."
+
+        os.makedirs(download_dir, exist_ok=True)
+        paths = []
+        for file in self.files:
+            path = os.path.join(download_dir, os.path.basename(file))
+            _copy(file, path)
+            logger.info(f"Restored {path} from cache")
+            paths.append(path)
+        return paths
+
+
+class ResultCache:
+    """Maps process fingerprints to their results and downloaded files.
+
+    Attributes:
+        path: The cache directory
+        ttl: Entries older than `ttl` seconds are discarded. Defaults to no limit.
+        max_size: When the cached files exceed `max_size` bytes the least recently used
+            entries are evicted. Defaults to no limit.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        ttl: Optional[float] = None,
+        max_size: Optional[int] = None,
+    ):
+        if path is None:
+            path = get_cache_dir() / "results"
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "fingerprint TEXT PRIMARY KEY, job_id TEXT NOT NULL, results TEXT NOT NULL, "
+                "files TEXT NOT NULL, size INTEGER NOT NULL, created REAL NOT NULL, "
+                "used REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(os.path.join(self.path, "index.db"), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _entry_dir(self, fingerprint: str) -> str:
+        return os.path.join(self.path, fingerprint)
+
+    def _delete(self, conn: sqlite3.Connection, fingerprint: str) -> None:
+        conn.execute("DELETE FROM results WHERE fingerprint = ?", (fingerprint,))
+        shutil.rmtree(self._entry_dir(fingerprint), ignore_errors=True)
+
+    def get(self, fingerprint: str) -> Optional[CacheEntry]:
+        """Returns the cached entry for the fingerprint, if any and still valid."""
+        with self._lock, self._transaction() as conn:
+            row = conn.execute(
+                "SELECT job_id, results, files, created FROM results WHERE fingerprint = ?",
+                (fingerprint,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            job_id, results, files, created = row
+            entry = CacheEntry(
+                fingerprint, job_id, json.loads(results), json.loads(files), created
+            )
+            expired = self.ttl is not None and time.time() - created > self.ttl
+            if expired or not all(os.path.exists(f) for f in entry.files):
+                self._delete(conn, fingerprint)
+                return None
+
+            conn.execute(
+                "UPDATE results SET used = ? WHERE fingerprint = ?", (time.time(), fingerprint)
+            )
+            return entry
+
+    def put(
+        self, fingerprint: str, job_id: str, results: List[Dict], files: List[str]
+    ) -> Optional[CacheEntry]:
+        """Stores the results of a job and a copy of its downloaded files.
+
+        Returns:
+            The new entry, or None if the files exceed `max_size` and are not cached.
+        """
+        size = sum(os.path.getsize(f) for f in files)
+        if self.max_size is not None and size > self.max_size:
+            logger.info(f"Results of job {job_id} exceed the cache size, not cached")
+            return None
+
+        entry_dir = self._entry_dir(fingerprint)
+        os.makedirs(entry_dir, exist_ok=True)
+        cached_files = []
+        for file in files:
+            cached = os.path.join(entry_dir, os.path.basename(file))
+            _copy(file, cached)
+            cached_files.append(cached)
+
+        now = time.time()
+        with self._lock, self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results "
+                "(fingerprint, job_id, results, files, size, created, used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    fingerprint,
+                    job_id,
+                    json.dumps(results),
+                    json.dumps(cached_files),
+                    size,
+                    now,
+                    now,
+                ),
+            )
+            self._evict(conn, keep=fingerprint)
+
+        return CacheEntry(fingerprint, job_id, results, cached_files, now)
+
+    def _evict(self, conn: sqlite3.Connection, keep: str) -> None:
+        """Removes the expired and least recently used entries, except the `keep` one."""
+        if self.ttl is not None:
+            expired = conn.execute(
+                "SELECT fingerprint FROM results WHERE created < ? AND fingerprint != ?",
+                (time.time() - self.ttl, keep),
+            ).fetchall()
+            for (fingerprint,) in expired:
+                self._delete(conn, fingerprint)
+
+        if self.max_size is None:
+            return
+
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+        if total <= self.max_size:
+            return
+
+        rows = conn.execute(
+            "SELECT fingerprint, size FROM results WHERE fingerprint != ? ORDER BY used", (keep,)
+        ).fetchall()
+        for fingerprint, size in rows:
+            if total <= self.max_size:
+                break
+            self._delete(conn, fingerprint)
+            total -= size
+
+    def clear(self) -> None:
+        """Removes all the entries."""
+        with self._lock, self._transaction() as conn:
+            for (fingerprint,) in conn.execute("SELECT fingerprint FROM results").fetchall():
+                self._delete(conn, fingerprint)
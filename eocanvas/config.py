@@ -18,6 +18,13 @@ def get_credentials_filepath(create: bool = False) -> Path:
     return get_credentials_dir(create) / ".hdarc"
 
 
+def get_cache_dir(create: bool = False) -> Path:
+    path = Path(os.getenv("EOCANVAS_CACHE_DIR", get_credentials_dir() / ".eocanvas"))
+    if create:
+        path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
 class URLs:
     def __init__(self, urlfile: Optional[str] = None):
         if urlfile is None:
@@ -0,0 +1,356 @@
+"""Spatial tiling of the Data Tailor requests.
+
+A large region of interest can exceed the limits of a single Data Tailor job, and runs
+on one worker. The :class:`Tiler` splits the region of interest of a chain into a grid
+of tiles, runs one :class:`eocanvas.processes.DataTailorProcess` per tile concurrently,
+and :func:`mosaic` merges the downloaded tiles back into one GeoTIFF, window by window,
+so that the whole mosaic is never held in memory.
+
+Example:
+    tiler = Tiler(chain, epct_input=inputs, tile_size=(5.0, 5.0))
+    path = tiler.run("out", "mosaic.tif")
+
+The mosaic requires rasterio: install it with `pip install eocanvas[local]`.
+"""
+
+import math
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import Future, as_completed
+from dataclasses import replace
+from typing import Any, List, Optional, Sequence, Tuple
+
+from eocanvas.executor import Executor
+from eocanvas.logging import logger
+from eocanvas.processes import DataTailorProcess
+
+from .chain import Chain, RegionOfInterest
+
+BLOCK_SIZE = 1024
+# The largest number of tiles Tiler.run submits at the same time
+MAX_WORKERS = 8
+# The downloaded files merged by Tiler.run
+RASTER_EXTENSIONS = {".tif", ".tiff", ".nc", ".nc4", ".jp2", ".img"}
+
+_SEPARATOR = re.compile(r"[,;\s]+")
+_EPSILON = 1e-9
+
+Tile = namedtuple("Tile", ["row", "column", "roi"])
+Tile.__doc__ = """A tile of a region of interest, by row from north and column from west."""
+
+
+def parse_nswe(value: str) -> Tuple[float, float, float, float]:
+    """Parses a `N,S,W,E` string into the north, south, west and east coordinates.
+
+    Raises:
+        ValueError: if the string is not made of four coordinates.
+    """
+    parts = [part for part in _SEPARATOR.split(value or "") if part]
+    if len(parts) != 4:
+        raise ValueError(f"Invalid NSWE {value!r}")
+    north, south, west, east = (float(part) for part in parts)
+    if north <= south:
+        raise ValueError(f"Invalid NSWE {value!r}: north is not above south")
+    return north, south, west, east
+
+
+def format_nswe(north: float, south: float, west: float, east: float) -> str:
+    # The shortest representation reading back as the same float, as `:g` rounds to 6 digits
+    values = (repr(float(value)) for value in (north, south, west, east))
+    return ",".join(value[:-2] if value.endswith(".0") else value for value in values)
+
+
+def _wrap(longitude: float, east: bool = False) -> float:
+    """Brings a longitude past the antimeridian back in [-180, 180]."""
+    if longitude > 180.0 or (longitude == 180.0 and not east):
+        return (longitude + 180.0) % 360.0 - 180.0
+    return longitude
+
+
+def split_roi(
+    roi: RegionOfInterest,
+    tile_size: Optional[Tuple[float, float]] = None,
+    rows: Optional[int] = None,
+    columns: Optional[int] = None,
+) -> List[Tile]:
+    """Splits a region of interest into a grid of tiles.
+
+    Args:
+        roi: The region of interest. A west coordinate larger than the east one crosses
+            the antimeridian.
+        tile_size: The largest tile height and width, in degrees. It takes precedence
+            over `rows` and `columns`.
+        rows: The number of rows of the grid.
+        columns: The number of columns of the grid.
+
+    Returns:
+        The tiles, by row from north then by column from west.
+    """
+    north, south, west, east = parse_nswe(roi.NSWE)
+    width = east - west if east > west else east + 360.0 - west
+    height = north - south
+    if tile_size is not None:
+        rows = max(1, math.ceil(height / tile_size[0] - 1e-9))
+        columns = max(1, math.ceil(width / tile_size[1] - 1e-9))
+    rows, columns = rows or 1, columns or 1
+
+    tiles = []
+    for row in range(rows):
+        top = north - height * row / rows
+        bottom = north - height * (row + 1) / rows
+        for column in range(columns):
+            left = _wrap(west + width * column / columns)
+            right = _wrap(west + width * (column + 1) / columns, east=True)
+            tile_roi = replace(
+                roi,
+                id=f"{roi.id}_{row}_{column}" if roi.id else None,
+                name=f"{roi.name} ({row}, {column})" if roi.name else None,
+                NSWE=format_nswe(top, bottom, left, right),
+            )
+            tiles.append(Tile(row, column, tile_roi))
+    return tiles
+
+
+class Tiler:
+    """Runs a Data Tailor chain tile by tile.
+
+    Attributes:
+        chain: The chain, with the region of interest to split
+        tiles: The tiles of the region of interest, see :func:`split_roi`
+        process_kwargs: Any other :class:`eocanvas.processes.DataTailorProcess` argument,
+            such as `epct_input`
+    """
+
+    def __init__(
+        self,
+        chain: Chain,
+        tile_size: Optional[Tuple[float, float]] = None,
+        rows: Optional[int] = None,
+        columns: Optional[int] = None,
+        **process_kwargs: Any,
+    ):
+        if not isinstance(chain.roi, RegionOfInterest) or not chain.roi.NSWE:
+            raise ValueError("The chain has no region of interest")
+        self.chain = chain
+        self.tiles = split_roi(chain.roi, tile_size, rows, columns)
+        self.process_kwargs = process_kwargs
+
+    def processes(self) -> List[DataTailorProcess]:
+        """Returns the process of each tile."""
+        return [
+            DataTailorProcess(epct_chain=replace(self.chain, roi=tile.roi), **self.process_kwargs)
+            for tile in self.tiles
+        ]
+
+    def submit(self, executor: Executor, force: bool = False) -> List[Tuple[Tile, Future]]:
+        """Submits the processes of the tiles concurrently.
+
+        Returns:
+            The tiles with their future, resolving as in
+            :meth:`eocanvas.executor.Executor.submit`.
+        """
+        processes = self.processes()
+        return [
+            (tile, executor.submit(process, force=force))
+            for tile, process in zip(self.tiles, processes)
+        ]
+
+    def run(
+        self,
+        download_dir: str,
+        output: Optional[str] = None,
+        variable: Optional[str] = None,
+        force: bool = False,
+        **executor_kwargs: Any,
+    ) -> Any:
+        """Runs the tiles, downloads them and mosaics them.
+
+        The results of each job are downloaded in their own `download_dir/{job_id}`
+        directory.
+
+        Args:
+            download_dir: Where to download the tiles.
+            output: The mosaic file name. If not given, the tiles are not merged.
+            variable: The variable to merge, see :func:`mosaic`.
+            force: Skip the submission ledger.
+            executor_kwargs: Any other :class:`eocanvas.executor.Executor` argument. By
+                default at most `MAX_WORKERS` tiles run at the same time.
+
+        Returns:
+            The mosaic path, or the list of the downloaded paths of each tile.
+        """
+        executor_kwargs.setdefault("max_workers", min(len(self.tiles), MAX_WORKERS))
+        executor_kwargs["download"] = True
+        executor_kwargs["download_dir"] = os.path.join(download_dir, "{job_id}")
+        with Executor(**executor_kwargs) as executor:
+            submitted = self.submit(executor, force=force)
+            positions = {future: index for index, (_, future) in enumerate(submitted)}
+            ordered: List[List[str]] = [[] for _ in submitted]
+            for future in as_completed(positions):
+                tile = submitted[positions[future]][0]
+                ordered[positions[future]] = future.result()
+                logger.info(f"Tile ({tile.row}, {tile.column}) done")
+
+        if output is None:
+            return ordered
+        rasters = [
+            path
+            for tile_paths in ordered
+            for path in tile_paths
+            if os.path.splitext(path)[1].lower() in RASTER_EXTENSIONS
+        ]
+        return mosaic(rasters, output, variable)
+
+
+def _placement(dataset, left, top, resolution, offset=0.0):
+    """Returns the row and column of the upper left pixel of a dataset in the mosaic."""
+    transform = dataset.transform
+    return (
+        int(round((top - transform.f) / resolution[1])),
+        int(round((transform.c + offset - left) / resolution[0])),
+    )
+
+
+def _unwrap(bounds: Sequence[Tuple[float, float]]) -> List[float]:
+    """Returns the longitude offset of each tile, so that tiles crossing the antimeridian
+    are contiguous.
+
+    The mosaic starts after the largest longitude range no tile covers: the tiles west of
+    that start are moved by 360 degrees, as in 170 to 190 rather than -180 to 180.
+    """
+    merged: List[List[float]] = []
+    for left, right in sorted(bounds):
+        if merged and left <= merged[-1][1] + _EPSILON:
+            merged[-1][1] = max(merged[-1][1], right)
+        else:
+            merged.append([left, right])
+    gaps = [(merged[0][0] + 360.0 - merged[-1][1], merged[0][0])]
+    gaps += [
+        (following[0] - current[1], following[0]) for current, following in zip(merged, merged[1:])
+    ]
+    _, start = max(gaps, key=lambda gap: gap[0])
+    return [360.0 if left < start - _EPSILON else 0.0 for left, _ in bounds]
+
+
+def mosaic(
+    paths: Sequence[str],
+    output: str,
+    variable: Optional[str] = None,
+    block_size: int = BLOCK_SIZE,
+) -> str:
+    """Merges tiles on the same grid into one GeoTIFF.
+
+    The mosaic is written by windows of `block_size` pixels, reading from each tile only
+    the overlapping window. Where tiles overlap, the first valid pixel wins.
+
+    Tiles in geographic coordinates crossing the antimeridian are unwrapped, so the mosaic
+    can extend east of 180 degrees instead of spanning the whole globe.
+
+    Args:
+        paths: The tile files, in any format rasterio reads.
+        output: The mosaic file name.
+        variable: The variable to merge, for NetCDF tiles holding several ones.
+        block_size: The window size, in pixels.
+
+    Returns:
+        The mosaic file name.
+
+    Raises:
+        ValueError: if the tiles have different coordinate systems, resolutions or
+            numbers of bands.
+    """
+    import numpy as np
+    import rasterio
+    from rasterio.transform import from_origin
+    from rasterio.windows import Window
+
+    if not paths:
+        raise ValueError("No tiles to merge")
+    if variable is not None:
+        paths = [f'NETCDF:"{path}":{variable}' for path in paths]
+
+    datasets = [rasterio.open(path) for path in paths]
+    try:
+        first = datasets[0]
+        resolution = (first.transform.a, -first.transform.e)
+        for dataset in datasets[1:]:
+            if dataset.crs != first.crs or dataset.count != first.count:
+                raise ValueError(f"{dataset.name} does not match {first.name}")
+            if not np.allclose((dataset.transform.a, -dataset.transform.e), resolution):
+                raise ValueError(f"{dataset.name} has another resolution than {first.name}")
+
+        offsets = [0.0] * len(datasets)
+        if first.crs is not None and first.crs.is_geographic:
+            offsets = _unwrap([(d.bounds.left, d.bounds.right) for d in datasets])
+        left = min(d.bounds.left + offset for d, offset in zip(datasets, offsets))
+        top = max(d.bounds.top for d in datasets)
+        placements = [
+            _placement(d, left, top, resolution, offset) for d, offset in zip(datasets, offsets)
+        ]
+        height = max(row + d.height for (row, _), d in zip(placements, datasets))
+        width = max(column + d.width for (_, column), d in zip(placements, datasets))
+
+        dtype = np.dtype(first.dtypes[0])
+        no_data = first.nodata
+        if no_data is None:
+            no_data = np.nan if np.issubdtype(dtype, np.floating) else 0
+        profile = {
+            "driver": "GTiff",
+            "height": height,
+            "width": width,
+            "count": first.count,
+            "dtype": dtype.name,
+            "crs": first.crs,
+            "transform": from_origin(left, top, *resolution),
+            "nodata": no_data,
+            "tiled": True,
+        }
+        logger.info(f"Merging {len(datasets)} tiles into {output} ({width}x{height})")
+        with rasterio.open(output, "w", **profile) as target:
+            for row in range(0, height, block_size):
+                for column in range(0, width, block_size):
+                    window = Window(
+                        column, row, min(block_size, width - column), min(block_size, height - row)
+                    )
+                    data = _merge_window(datasets, placements, window, no_data, dtype)
+                    target.write(data, window=window)
+    finally:
+        for dataset in datasets:
+            dataset.close()
+    return output
+
+
+def _merge_window(datasets, placements, window, no_data, dtype):
+    """Returns the mosaic pixels of a window, of all the bands."""
+    import numpy as np
+    from rasterio.windows import Window
+
+    count = datasets[0].count
+    data = np.full((count, window.height, window.width), no_data, dtype=dtype)
+    filled = np.zeros((window.height, window.width), dtype=bool)
+    for dataset, (top, left) in zip(datasets, placements):
+        row0, row1 = max(window.row_off, top), min(
+            window.row_off + window.height, top + dataset.height
+        )
+        col0, col1 = max(window.col_off, left), min(
+            window.col_off + window.width, left + dataset.width
+        )
+        if row0 >= row1 or col0 >= col1:
+            continue
+
+        tile = dataset.read(window=Window(col0 - left, row0 - top, col1 - col0, row1 - row0))
+        valid = np.ones(tile.shape[1:], dtype=bool)
+        if dataset.nodata is not None and not np.isnan(dataset.nodata):
+            valid &= (tile != dataset.nodata).any(axis=0)
+        if np.issubdtype(tile.dtype, np.floating):
+            valid &= ~np.isnan(tile).all(axis=0)
+
+        rows = slice(row0 - window.row_off, row1 - window.row_off)
+        cols = slice(col0 - window.col_off, col1 - window.col_off)
+        valid &= ~filled[rows, cols]
+        data[:, rows, cols] = np.where(valid, tile, data[:, rows, cols])
+        filled[rows, cols] |= valid
+        if filled.all():
+            break
+    return data
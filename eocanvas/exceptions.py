@@ -38,10 +38,47 @@ class SnapOperatorNotFound(EOCanvasError):
     """Exception on non-existent SNAP operator."""
 
 
+class InvalidGraphError(EOCanvasError):
+    """Exception on a SNAP Graph that does not match the SNAP operators."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__("Invalid SNAP Graph:\n" + "\n".join(self.errors))
+
+
+class InvalidExpressionError(EOCanvasError):
+    """Exception on a band maths expression that cannot be parsed."""
+
+    def __init__(self, expression, message, position=None):
+        self.expression = expression
+        self.position = position
+        where = f" at {position}" if position is not None else ""
+        super().__init__(f"Invalid expression {expression!r}{where}: {message}")
+
+
+class UnsupportedGraphError(EOCanvasError):
+    """Exception on a SNAP Graph that cannot be run locally."""
+
+
 class JobFailed(EOCanvasError):
     """Exception on a job that returns failed status."""
 
 
+class PartialFailureError(EOCanvasError):
+    """Exception on a split process whose parts still fail after their retries."""
+
+    def __init__(self, errors, results):
+        self.errors = dict(errors)
+        self.results = list(results)
+        super().__init__(
+            "{} of {} parts failed:\n{}".format(
+                len(self.errors),
+                len(self.results),
+                "\n".join(f"{key}: {error}" for key, error in self.errors.items()),
+            )
+        )
+
+
 class InvalidChainError(EOCanvasError):
     """Exception on invalid YAML file for a Data Tailor Chain."""
 
@@ -52,3 +89,7 @@ class NotDownloadableError(EOCanvasError):
 
 class UnknownResultTypeError(EOCanvasError):
     """Results of unknown rel type."""
+
+
+class RateLimitError(EOCanvasError):
+    """Exception on a rate limit token not available in time."""
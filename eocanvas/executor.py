@@ -0,0 +1,432 @@
+"""A :mod:`concurrent.futures` style executor for processes.
+
+Submissions run on a thread pool, while a single monitor thread polls all the jobs in
+progress, instead of one blocking :class:`eocanvas.api.JobRunner` per job.
+The returned futures are standard :class:`concurrent.futures.Future` objects, so they can
+be used with :func:`concurrent.futures.as_completed` and :func:`concurrent.futures.wait`.
+
+Example:
+    with Executor(max_workers=8) as executor:
+        futures = [executor.submit(process) for process in processes]
+        for future in as_completed(futures):
+            job = future.result()
+
+With `download=True` the results of each job are downloaded as soon as it succeeds, on a
+bounded pool, while the other jobs are still being submitted or polled. If the API has a
+result cache, the downloads are then stored in it, and identical processes already
+completed are not submitted again, as with :meth:`eocanvas.api.Process.run`.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .api import Job, Process
+from .cache import ResultCache
+from .exceptions import JobFailed, NotDownloadableError, PartialFailureError
+from .logging import logger
+
+
+class _Watch:
+    """A job being monitored, with its future and polling schedule."""
+
+    __slots__ = ("job", "future", "interval", "next_check", "errors", "cache", "fingerprint")
+
+    def __init__(
+        self,
+        job: Job,
+        future: Future,
+        interval: float,
+        cache: Optional[ResultCache] = None,
+        fingerprint: Optional[str] = None,
+    ):
+        self.job = job
+        self.future = future
+        self.interval = interval
+        self.next_check = time.monotonic() + interval
+        self.errors = 0
+        # Where to store the downloaded results, for submitted processes
+        self.cache = cache
+        self.fingerprint = fingerprint
+
+
+class Executor:
+    """Submits processes concurrently and resolves their futures when the jobs complete.
+
+    Attributes:
+        max_workers: How many submissions can run at the same time
+        poll_interval: The initial number of seconds between two status checks of a job
+        max_poll_interval: The interval grows by 10% after each check up to this value
+        max_poll_errors: How many consecutive failed status checks before giving up on a job
+        download: Whether to download the results. If so, futures resolve to the file paths
+        download_dir: Where to download the results. It can contain a `{job_id}` placeholder,
+            and defaults to one directory per job, as results are named after their title
+        max_downloads: How many jobs can download their results at the same time
+        min_free_space: Downloads wait until the download disk has this many free bytes
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        poll_interval: float = 10.0,
+        max_poll_interval: float = 60.0,
+        max_poll_errors: int = 5,
+        download: bool = False,
+        download_dir: str = "{job_id}",
+        max_downloads: int = 2,
+        min_free_space: int = 0,
+        space_check_interval: float = 30.0,
+    ):
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_poll_errors = max_poll_errors
+        self.download = download
+        self.download_dir = download_dir
+        self.max_downloads = max_downloads
+        self.min_free_space = min_free_space
+        self.space_check_interval = space_check_interval
+
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="eocanvas-submit")
+        self._download_pool = ThreadPoolExecutor(
+            max_downloads, thread_name_prefix="eocanvas-download"
+        )
+        self._cond = threading.Condition()
+        # One watch per submission: the ledger can return the same job to several of them
+        self._watches: Set[_Watch] = set()
+        self._pending = 0
+        self._shutdown = False
+        self._monitor = threading.Thread(
+            target=self._run_monitor, name="eocanvas-monitor", daemon=True
+        )
+        self._monitor.start()
+
+    def __enter__(self) -> Executor:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown(wait=True)
+
+    def submit(self, process: Process, force: bool = False) -> Future:
+        """Schedules the submission of a process.
+
+        With `download` set, a process whose results are in the result cache of its API
+        is not submitted: the cached files are restored instead. `force` skips both the
+        submission ledger and the cache lookup.
+
+        Returns:
+            A future resolving to the completed :class:`eocanvas.api.Job`, or to the list
+            of the downloaded file paths if `download` is set.
+        """
+        future: Future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit after shutdown")
+            self._pending += 1
+        self._pool.submit(self._submit, process, force, future)
+        return future
+
+    def watch(self, job: Job) -> Future:
+        """Monitors an already submitted job.
+
+        Returns:
+            A future resolving as in :meth:`submit`.
+        """
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Cannot watch after shutdown")
+        future: Future = Future()
+        if future.set_running_or_notify_cancel():
+            self._add_watch(job, future)
+        return future
+
+    def map(self, processes: Iterable[Process], timeout: Optional[float] = None) -> Iterator[Job]:
+        """Submits all the processes and yields the completed jobs in order."""
+        end_time = None if timeout is None else time.monotonic() + timeout
+        futures = [self.submit(process) for process in processes]
+
+        def result_iterator() -> Iterator[Any]:
+            for future in futures:
+                if end_time is None:
+                    yield future.result()
+                else:
+                    yield future.result(end_time - time.monotonic())
+
+        return result_iterator()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops accepting new processes.
+
+        The jobs already submitted are still monitored, and their results downloaded,
+        until they are done: the download pool is only shut down when the monitor exits.
+
+        Args:
+            wait (bool, optional): Block until all the submitted jobs are done.
+        """
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        self._pool.shutdown(wait=wait)
+        if wait:
+            self._monitor.join()
+            self._download_pool.shutdown(wait=True)
+
+    @property
+    def jobs(self) -> List[Job]:
+        """The jobs currently being monitored."""
+        with self._cond:
+            return list({watch.job.job_id: watch.job for watch in self._watches}.values())
+
+    def _submit(self, process: Process, force: bool, future: Future) -> None:
+        try:
+            if not future.set_running_or_notify_cancel():
+                return
+            cache = getattr(process.api, "result_cache", None) if self.download else None
+            fingerprint = None
+            try:
+                if cache is not None:
+                    fingerprint = process.fingerprint()
+                    entry = None if force else cache.get(fingerprint)
+                    if entry is not None:
+                        logger.info(f"Using cached results of job {entry.job_id}")
+                        download_dir = self.download_dir.format(job_id=entry.job_id)
+                        future.set_result(entry.restore(download_dir))
+                        return
+                job = process.submit(force=force)
+            except BaseException as exc:
+                future.set_exception(exc)
+                return
+            self._add_watch(job, future, cache, fingerprint)
+        finally:
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify_all()
+
+    def _add_watch(
+        self,
+        job: Job,
+        future: Future,
+        cache: Optional[ResultCache] = None,
+        fingerprint: Optional[str] = None,
+    ) -> None:
+        watch = _Watch(job, future, self.poll_interval, cache, fingerprint)
+        try:
+            if self._finish(watch):
+                return
+        except BaseException as exc:
+            self._fail(watch, exc)
+            return
+        with self._cond:
+            self._watches.add(watch)
+            self._cond.notify_all()
+
+    def _run_monitor(self) -> None:
+        try:
+            self._monitor_watches()
+        except BaseException as exc:
+            logger.error(f"Job monitor stopped: {exc}")
+            with self._cond:
+                watches = list(self._watches)
+                self._watches.clear()
+            for watch in watches:
+                self._fail(watch, RuntimeError(f"Job monitor stopped: {exc}"))
+        finally:
+            self._download_pool.shutdown(wait=False)
+
+    def _monitor_watches(self) -> None:
+        while True:
+            with self._cond:
+                while not self._watches:
+                    if self._shutdown and self._pending == 0:
+                        return
+                    self._cond.wait()
+
+                now = time.monotonic()
+                due = [w for w in self._watches if w.next_check <= now]
+                if not due:
+                    self._cond.wait(min(w.next_check for w in self._watches) - now)
+                    continue
+
+            for watch in due:
+                try:
+                    self._check(watch)
+                except Exception as exc:
+                    # A failure with one job must not stop the monitoring of the others
+                    self._remove(watch)
+                    self._fail(watch, exc)
+
+    def _check(self, watch: _Watch) -> None:
+        """Refreshes the status of a job and either completes or reschedules it."""
+        try:
+            watch.job.refresh_from_api()
+            watch.errors = 0
+        except Exception as exc:
+            watch.errors += 1
+            logger.warning(f"Job: {watch.job.job_id} - Status check failed: {exc}")
+            if watch.errors >= self.max_poll_errors:
+                self._remove(watch)
+                watch.future.set_exception(exc)
+                return
+
+        if self._finish(watch):
+            self._remove(watch)
+            return
+
+        logger.debug(f"Job: {watch.job.job_id} - Status: {watch.job.status}")
+        watch.interval = min(watch.interval * 1.1, self.max_poll_interval)
+        watch.next_check = time.monotonic() + watch.interval
+
+    def _finish(self, watch: _Watch) -> bool:
+        """Resolves the future if the job is done. Returns whether it was."""
+        job = watch.job
+        if job.status == "successful":
+            logger.info(f"Job: {job.job_id} - Status: {job.status}")
+            self._on_success(watch)
+            return True
+
+        if job.status not in ("accepted", "running"):
+            watch.future.set_exception(
+                JobFailed(f"Job {job.job_id} {job.status}. Try checking the logs for more info.")
+            )
+            return True
+
+        return False
+
+    def _on_success(self, watch: _Watch) -> None:
+        if not self.download:
+            watch.future.set_result(watch.job)
+            return
+
+        try:
+            self._download_pool.submit(self._download, watch)
+        except RuntimeError as exc:
+            self._fail(watch, exc)
+
+    def _download(self, watch: _Watch) -> None:
+        """Downloads the results of a job and resolves its future with the file paths."""
+        try:
+            download_dir = self.download_dir.format(job_id=watch.job.job_id)
+            paths = []
+            results = watch.job.results
+            for result in results:
+                self._wait_for_space(download_dir)
+                try:
+                    paths.append(result.download(download_dir))
+                except NotDownloadableError:
+                    logger.info(result.title)
+            if watch.cache is not None:
+                hrefs = [{"href": r.href, "title": r.title, "rel": r.rel} for r in results]
+                watch.cache.put(watch.fingerprint, watch.job.job_id, hrefs, paths)
+        except BaseException as exc:
+            watch.future.set_exception(exc)
+        else:
+            watch.future.set_result(paths)
+
+    def _wait_for_space(self, download_dir: str) -> None:
+        """Blocks until the download disk has at least `min_free_space` free bytes."""
+        if not self.min_free_space:
+            return
+
+        os.makedirs(download_dir, exist_ok=True)
+        warned = False
+        while shutil.disk_usage(download_dir).free < self.min_free_space:
+            if not warned:
+                logger.warning(f"Not enough free space in {download_dir}, downloads paused")
+                warned = True
+            time.sleep(self.space_check_interval)
+
+    @staticmethod
+    def _fail(watch: _Watch, exc: BaseException) -> None:
+        if not watch.future.done():
+            watch.future.set_exception(exc)
+
+    def _remove(self, watch: _Watch) -> None:
+        with self._cond:
+            self._watches.discard(watch)
+            self._cond.notify_all()
+
+
+def pipeline(
+    processes: Iterable[Process], download_dir: str = "{job_id}", **kwargs: Any
+) -> Iterator[Tuple[Process, List[str]]]:
+    """Runs all the processes, downloading the results of each job as soon as it succeeds.
+
+    Downloads of the completed jobs overlap with the submission and the polling of the
+    others, so the total time is close to the slowest job plus its download.
+
+    Args:
+        processes: The processes to run.
+        download_dir: Where to download the results. It can contain a `{job_id}` placeholder,
+            and defaults to one directory per job.
+        kwargs: Any other :class:`Executor` argument.
+
+    Yields:
+        The processes, with their downloaded file paths, in order of completion.
+    """
+    with Executor(download=True, download_dir=download_dir, **kwargs) as executor:
+        futures = {executor.submit(process): process for process in processes}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def run_with_retries(
+    processes: Sequence[Process],
+    retries: int = 2,
+    labels: Optional[Sequence[str]] = None,
+    executor: Optional[Executor] = None,
+    force: bool = False,
+    **kwargs: Any,
+) -> List[Any]:
+    """Runs all the processes concurrently, submitting again each failed one on its own.
+
+    Args:
+        processes: The processes to run.
+        retries: How many times a failed process is submitted again.
+        labels: A name for each process, used in the logs and errors. Defaults to the
+            process positions.
+        executor: The executor to submit to. By default a new one is created with the
+            other arguments, and shut down once all the processes are done.
+        force: Skip the submission ledger for the first submission of each process. The
+            failed jobs are never reused.
+        kwargs: Any other :class:`Executor` argument, when no executor is given.
+
+    Returns:
+        The result of each process, in order, as in :meth:`Executor.submit`.
+
+    Raises:
+        PartialFailureError: if some processes still fail after their retries. It holds
+            the errors by label and the results of the other processes.
+    """
+    if executor is None:
+        with Executor(**kwargs) as executor:
+            return run_with_retries(processes, retries, labels, executor, force)
+
+    labels = list(labels) if labels is not None else [str(i) for i in range(len(processes))]
+    results: List[Any] = [None] * len(processes)
+    attempts = [0] * len(processes)
+    errors: Dict[str, BaseException] = {}
+    futures = {executor.submit(process, force=force): i for i, process in enumerate(processes)}
+    while futures:
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            index = futures.pop(future)
+            error = future.exception()
+            if error is None:
+                results[index] = future.result()
+            elif attempts[index] < retries:
+                attempts[index] += 1
+                logger.warning(
+                    f"{labels[index]} failed, retrying ({attempts[index]}/{retries}): {error}"
+                )
+                futures[executor.submit(processes[index])] = index
+            else:
+                errors[labels[index]] = error
+
+    if errors:
+        raise PartialFailureError(errors, results)
+    return results
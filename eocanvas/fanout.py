@@ -0,0 +1,347 @@
+"""Fan-out of a SNAP Graph over many input products.
+
+A :class:`eocanvas.processes.SnapProcess` with a long list of inputs runs as one remote
+job, on one worker. The :class:`FanOut` planner splits the products into independent
+jobs instead, and submits them in parallel with an :class:`eocanvas.executor.Executor`.
+
+The graph processes one product, read from per-product placeholders such as `$img1`.
+A job processing several products runs a graph made of one copy of the graph per
+product: the node identifiers, the placeholders and the written file names of the
+copies are suffixed with `_1`, `_2`, ... and the inputs are renamed accordingly.
+
+Example:
+    fan_out = FanOut(graph, [Input("img1", url) for url in urls], jobs=8)
+    handle = fan_out.submit(download_dir="out")
+    paths = handle.result()
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import re
+import threading
+from concurrent.futures import Future, as_completed, wait
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import lxml.etree as etree
+
+from .api import Config, Input
+from .executor import Executor
+from .http import get_session
+from .processes import SnapProcess
+from .snap.graph import Graph
+from .snap.node import Source
+
+Product = Union[Input, Sequence[Input]]
+
+
+@dataclass
+class Batch:
+    """The products processed by one job.
+
+    Attributes:
+        index: The position of the job in the plan
+        products: The inputs of each product, in the order of the products list
+        size: The estimated size of the products
+    """
+
+    index: int
+    products: List[List[Input]]
+    size: float
+
+
+def content_length(product: Product) -> float:
+    """Estimates the size of a product from the `Content-Length` of its input URLs.
+
+    Inputs whose size cannot be found count as zero bytes.
+    """
+    size = 0
+    for eo_input in _inputs(product):
+        try:
+            response = get_session().head(eo_input.url, allow_redirects=True, timeout=30)
+            size += int(response.headers.get("Content-Length", 0))
+        except Exception:
+            continue
+    return size
+
+
+def _inputs(product: Product) -> List[Input]:
+    return [product] if isinstance(product, Input) else list(product)
+
+
+def _suffix_placeholders(text: str, keys: Sequence[str], suffix: str) -> str:
+    pattern = r"\$(\{)?(" + "|".join(map(re.escape, keys)) + r")(?(1)\}|(?![A-Za-z0-9_]))"
+    return re.sub(pattern, lambda match: f"${match.group(2)}{suffix}", text)
+
+
+def _suffix_file(value: Optional[str], suffix: str) -> Optional[str]:
+    """Adds a suffix to a file name, before its extension."""
+    if not value:
+        return value
+    root, extension = os.path.splitext(value)
+    return f"{root}{suffix}{extension}"
+
+
+def merge_copies(graph: Graph, keys: Sequence[str], count: int) -> Graph:
+    """Returns a graph made of `count` copies of a graph.
+
+    The node identifiers, the `keys` placeholders and the files written by the copy `i`
+    are suffixed with `_i`, starting from 1.
+
+    Args:
+        graph: The graph processing one product.
+        keys: The per-product placeholders.
+        count: The number of copies.
+    """
+    merged = graph.copy(nodes=False)
+    for copy in range(1, count + 1):
+        suffix = f"_{copy}"
+        for node in graph.nodes.values():
+            node = node.copy()
+            node.id += suffix
+            node.sources = [
+                Source(
+                    source.name,
+                    source.refid + suffix if source.refid is not None else None,
+                    source.text + suffix if source.text is not None else None,
+                )
+                for source in node.sources
+            ]
+            for name, value in node.parameters.items():
+                if isinstance(value, etree._Element):
+                    for elem in value.iter():
+                        if elem.text and "$" in elem.text:
+                            elem.text = _suffix_placeholders(elem.text, keys, suffix)
+                elif value and "$" in value:
+                    node.parameters[name] = _suffix_placeholders(value, keys, suffix)
+            if node.operator == "Write":
+                node.parameters["file"] = _suffix_file(node.parameters.get("file"), suffix)
+            merged.set_node(node)
+    return merged
+
+
+class FanOut:
+    """Splits the processing of many products into parallel jobs.
+
+    Attributes:
+        graph: The graph processing one product
+        products: The products, each being an input or the list of its inputs. All the
+            products have inputs of the same keys, matching placeholders of the graph
+        jobs: The number of jobs. Defaults to one job per `max_products`
+        max_products: The largest number of products of a job, if `jobs` is not given
+        size: A function estimating the size of a product, such as :func:`content_length`.
+            If given, jobs are balanced by size rather than by number of products
+        eo_config: The configurations of the per-product inputs, renamed with them
+        process_kwargs: Any other :class:`eocanvas.processes.SnapProcess` argument
+    """
+
+    def __init__(
+        self,
+        graph: Graph,
+        products: Sequence[Product],
+        jobs: Optional[int] = None,
+        max_products: int = 1,
+        size: Optional[Callable[[Product], float]] = None,
+        eo_config: Optional[List[Config]] = None,
+        **process_kwargs: Any,
+    ):
+        if hasattr(graph, "to_graph"):
+            graph = graph.to_graph()
+        self.graph = graph
+        self.products = [_inputs(product) for product in products]
+        self.jobs = jobs
+        self.max_products = max_products
+        self.size = size
+        self.eo_config = eo_config or []
+        self.process_kwargs = process_kwargs
+
+        keys = [eo_input.key for eo_input in self.products[0]] if self.products else []
+        for product in self.products:
+            if sorted(eo_input.key for eo_input in product) != sorted(keys):
+                raise ValueError(f"Products have different inputs: {keys} and {product}")
+        xml = graph.tostring().decode()
+        missing = [key for key in keys if not re.search(rf"\$\{{?{re.escape(key)}\b", xml)]
+        if missing:
+            raise ValueError(f"Inputs {', '.join(missing)} are not placeholders of the graph")
+        self.keys = keys
+
+    def plan(self) -> List[Batch]:
+        """Splits the products into batches, one per job.
+
+        Without a size estimate, the batches are consecutive products of about the same
+        count. Otherwise each product, largest first, goes to the smallest batch so far.
+        """
+        count = len(self.products)
+        if not count:
+            return []
+        jobs = self.jobs or math.ceil(count / max(self.max_products, 1))
+        jobs = max(1, min(jobs, count))
+
+        if self.size is None:
+            batches, start = [], 0
+            for index in range(jobs):
+                end = start + count // jobs + (index < count % jobs)
+                batches.append(Batch(index, self.products[start:end], end - start))
+                start = end
+            return batches
+
+        sizes = [float(self.size(product)) for product in self.products]
+        heap: List[Tuple[float, int]] = [(0.0, index) for index in range(jobs)]
+        members: List[List[int]] = [[] for _ in range(jobs)]
+        for position in sorted(range(count), key=lambda p: (-sizes[p], p)):
+            load, index = heapq.heappop(heap)
+            members[index].append(position)
+            heapq.heappush(heap, (load + sizes[position], index))
+        return [
+            Batch(
+                index,
+                [self.products[p] for p in sorted(positions)],
+                sum(sizes[p] for p in positions),
+            )
+            for index, positions in enumerate(members)
+            if positions
+        ]
+
+    def process(self, batch: Batch) -> SnapProcess:
+        """Returns the process of a batch."""
+        if len(batch.products) == 1:
+            graph = self.graph
+            eo_input = list(batch.products[0])
+            eo_config = list(self.eo_config)
+        else:
+            graph = merge_copies(self.graph, self.keys, len(batch.products))
+            eo_input, eo_config = [], []
+            for copy, product in enumerate(batch.products, start=1):
+                eo_input.extend(replace(i, key=f"{i.key}_{copy}") for i in product)
+                eo_config.extend(replace(c, key=f"{c.key}_{copy}") for c in self.eo_config)
+        return SnapProcess(
+            snap_graph=graph, eo_input=eo_input, eo_config=eo_config, **self.process_kwargs
+        )
+
+    def processes(self) -> List[SnapProcess]:
+        """Returns the process of each batch of the plan."""
+        return [self.process(batch) for batch in self.plan()]
+
+    def submit(
+        self,
+        download_dir: Optional[str] = None,
+        executor: Optional[Executor] = None,
+        force: bool = False,
+        **executor_kwargs: Any,
+    ) -> FanOutHandle:
+        """Submits the jobs in parallel.
+
+        Args:
+            download_dir: Where to download the results, in one `{job_id}` directory per
+                job, as all the jobs write the same file names. If not given, the results
+                are not downloaded.
+            executor: The executor to submit to. By default a new one is created with one
+                worker per job, and shut down once all the jobs are done. Its own download
+                settings apply, so it cannot be given with `download_dir`.
+            force: Skip the submission ledger.
+            executor_kwargs: Any other :class:`eocanvas.executor.Executor` argument, when
+                no executor is given.
+
+        Raises:
+            ValueError: if an executor is given with `download_dir` or executor arguments.
+        """
+        if executor is not None and (download_dir is not None or executor_kwargs):
+            raise ValueError("download_dir and executor arguments need no executor to be given")
+        batches = self.plan()
+        own = executor is None
+        if own:
+            if download_dir is not None:
+                executor_kwargs["download"] = True
+                executor_kwargs["download_dir"] = os.path.join(download_dir, "{job_id}")
+            executor_kwargs.setdefault("max_workers", max(len(batches), 1))
+            executor = Executor(**executor_kwargs)
+        futures = [executor.submit(self.process(batch), force=force) for batch in batches]
+        handle = FanOutHandle(batches, futures)
+        if own:
+            handle.on_done(lambda: executor.shutdown(wait=False))
+        return handle
+
+
+class FanOutHandle:
+    """The jobs of a fan-out, collected in one handle.
+
+    Attributes:
+        batches: The batch of each job
+        futures: The future of each job, resolving as in
+            :meth:`eocanvas.executor.Executor.submit`
+    """
+
+    def __init__(self, batches: List[Batch], futures: List[Future]):
+        self.batches = batches
+        self.futures = futures
+        self._lock = threading.Lock()
+        self._remaining = len(futures)
+        self._callbacks: List[Callable[[], None]] = []
+        for future in futures:
+            future.add_done_callback(self._on_future_done)
+
+    def __repr__(self):
+        done = sum(future.done() for future in self.futures)
+        return "FanOutHandle({}/{} jobs done)".format(done, len(self.futures))
+
+    def _on_future_done(self, future: Future) -> None:
+        with self._lock:
+            self._remaining -= 1
+            callbacks = self._callbacks if self._remaining == 0 else []
+        for callback in callbacks:
+            callback()
+
+    def on_done(self, callback: Callable[[], None]) -> None:
+        """Calls a function once all the jobs are done, right away if they already are."""
+        with self._lock:
+            if self._remaining:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def done(self) -> bool:
+        return all(future.done() for future in self.futures)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits for all the jobs. Returns whether they are all done."""
+        return not wait(self.futures, timeout).not_done
+
+    def errors(self) -> Dict[int, BaseException]:
+        """The exceptions of the failed jobs, by batch index."""
+        return {
+            batch.index: future.exception()
+            for batch, future in zip(self.batches, self.futures)
+            if future.done() and not future.cancelled() and future.exception() is not None
+        }
+
+    def as_completed(self, timeout: Optional[float] = None) -> Iterator[Tuple[Batch, Any]]:
+        """Yields the batches with their result, in order of completion.
+
+        Raises:
+            The exception of a failed job, when it is reached.
+        """
+        batches = {future: batch for batch, future in zip(self.batches, self.futures)}
+        for future in as_completed(batches, timeout):
+            yield batches[future], future.result()
+
+    def results(self, timeout: Optional[float] = None) -> List[Any]:
+        """Returns the result of each job, in plan order.
+
+        Raises:
+            The exception of the first failed job.
+        """
+        self.wait(timeout)
+        return [future.result(0) for future in self.futures]
+
+    def result(self, timeout: Optional[float] = None) -> List[Any]:
+        """Returns the results of all the jobs in one list, such as the downloaded paths."""
+        results = []
+        for result in self.results(timeout):
+            if isinstance(result, list):
+                results.extend(result)
+            else:
+                results.append(result)
+        return results
@@ -1,5 +1,6 @@
 """HTTP functions. Inspired by EUMDAC request module."""
 
+import threading
 from typing import Any, Dict
 
 import requests
@@ -8,8 +9,10 @@ from requests.adapters import HTTPAdapter, Retry
 from .exceptions import HTTPError, QuotaExceededError
 from .logging import logger
 
+_sessions = threading.local()
 
-def get_adapter(max_retries: int, backoff_factor: float) -> HTTPAdapter:
+
+def get_adapter(max_retries: int, backoff_factor: float, resend: bool = True) -> HTTPAdapter:
     """
     Returns an HTTPAdapter able to handling retries.
     See: https://requests.readthedocs.io/en/latest/user/advanced/#example-automatic-retries
@@ -18,6 +21,9 @@ def get_adapter(max_retries: int, backoff_factor: float) -> HTTPAdapter:
     :type max_retries: int
     :param backoff_factor: A backoff factor to apply between attempts after the second try
     :type backoff_factor: float
+    :param resend: Whether to retry requests that may have reached the server. If not,
+        only the connection errors are retried
+    :type resend: bool
     """
     retries = Retry(
         total=max_retries,
@@ -25,19 +31,49 @@ def get_adapter(max_retries: int, backoff_factor: float) -> HTTPAdapter:
         status_forcelist=[500, 502, 503, 504],
         allowed_methods=["HEAD", "GET", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"],
     )
+    if not resend:
+        retries = retries.new(read=False, status=0, other=0)
     return HTTPAdapter(max_retries=retries)
 
 
+def get_session(
+    max_retries: int = 5, backoff_factor: float = 0.25, resend: bool = True
+) -> requests.Session:
+    """
+    Returns a session with a retrying adapter, reused by all the requests of the thread.
+    Its connection pool avoids a new connection and TLS handshake for each request.
+
+    :param max_retries: Max number of retries before failing
+    :type max_retries: int
+    :param backoff_factor: A backoff factor to apply between attempts after the second try
+    :type backoff_factor: float
+    :param resend: Whether to retry requests that may have reached the server
+    :type resend: bool
+    """
+    sessions = getattr(_sessions, "sessions", None)
+    if sessions is None:
+        sessions = _sessions.sessions = {}
+
+    key = (max_retries, backoff_factor, resend)
+    session = sessions.get(key)
+    if session is None:
+        adapter = get_adapter(max_retries, backoff_factor, resend)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        sessions[key] = session
+    return session
+
+
 def request(
     method: str,
     url: str,
     max_retries: int = 5,
     backoff_factor: float = 0.25,
+    resend: bool = True,
     **kwargs: Any,
 ) -> requests.Response:
-    adapter = get_adapter(max_retries, backoff_factor)
-    session = requests.Session()
-    session.mount("https://", adapter)
+    session = get_session(max_retries, backoff_factor, resend)
 
     response = requests.Response()
 
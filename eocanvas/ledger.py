@@ -0,0 +1,76 @@
+"""A local ledger of the submitted processes.
+
+The ledger maps the fingerprint of a process, see :meth:`eocanvas.api.Process.fingerprint`,
+to the job it has been submitted as. It is used to avoid submitting the same process twice.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from .config import get_cache_dir
+
+
+class SubmissionLedger:
+    """Keeps track of the submitted processes in a SQLite database.
+
+    Attributes:
+        path: The SQLite database file
+        max_age: Entries older than `max_age` seconds are ignored. Defaults to no limit.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, max_age: Optional[float] = None):
+        if path is None:
+            path = get_cache_dir(create=True) / "submissions.db"
+        self.path = str(path)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS submissions ("
+                "fingerprint TEXT PRIMARY KEY, process_id TEXT, job_id TEXT NOT NULL, "
+                "submitted REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, fingerprint: str) -> Optional[str]:
+        """Returns the ID of the job submitted with the given fingerprint, if any."""
+        with self._lock, self._transaction() as conn:
+            row = conn.execute(
+                "SELECT job_id, submitted FROM submissions WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        job_id, submitted = row
+        if self.max_age is not None and time.time() - submitted > self.max_age:
+            return None
+        return job_id
+
+    def record(self, fingerprint: str, process_id: Optional[str], job_id: str) -> None:
+        """Records the submission of a process."""
+        with self._lock, self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO submissions (fingerprint, process_id, job_id, submitted) "
+                "VALUES (?, ?, ?, ?)",
+                (fingerprint, process_id, job_id, time.time()),
+            )
+
+    def forget(self, fingerprint: str) -> None:
+        """Removes a submission from the ledger."""
+        with self._lock, self._transaction() as conn:
+            conn.execute("DELETE FROM submissions WHERE fingerprint = ?", (fingerprint,))
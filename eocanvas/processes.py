@@ -1,16 +1,18 @@
 import json
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Union
 
 from .api import Config, Input, Process
 from .datatailor.chain import Chain
 from .snap.graph import Graph
+from .snap.template import RenderedGraph
+from .utils import canonical_hash
 
 
 @dataclass
 class _SnapParams:
-    snap_graph: Graph
+    snap_graph: Union[Graph, RenderedGraph]
     eo_input: List[Input] = field(default_factory=list)
     eo_config: List[Config] = field(default_factory=list)
 
@@ -28,10 +30,29 @@ class SnapProcess(Process, _SnapParams):
         if not isinstance(self.eo_input, list):
             self.eo_input = [self.eo_input]
 
+    def validate(self) -> None:
+        """Checks the graph against the SNAP operators.
+
+        Raises:
+            InvalidGraphError: if the graph is invalid.
+        """
+        self.snap_graph.validate()
+
     def prepare_inputs(self) -> Dict:
+        return self._prepare_inputs(self.snap_graph.b64encode())
+
+    def fingerprint(self) -> str:
+        """Returns a stable hash of the process.
+
+        The graph is represented by its own fingerprint, see
+        :meth:`eocanvas.snap.graph.Graph.fingerprint`, so that it is not serialized.
+        """
+        return canonical_hash(self.process_id, self._prepare_inputs(self.snap_graph.fingerprint()))
+
+    def _prepare_inputs(self, snap_graph: str) -> Dict:
         inputs = super().prepare_inputs()
         inputs["inputs"] = {
-            "snap_graph": self.snap_graph.b64encode(),
+            "snap_graph": snap_graph,
             "eo_input": json.dumps([i.asdict() for i in self.eo_input]),
         }
         if self.eo_config:
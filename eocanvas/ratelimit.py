@@ -0,0 +1,216 @@
+"""Client side rate limiting.
+
+Requests are throttled through token buckets, one per API endpoint name as defined in
+:class:`eocanvas.config.URLs`. Buckets can be kept in memory, and shared between threads,
+or stored in a SQLite database to share the same budget between processes.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Mapping, Optional, Tuple, Union
+
+from .config import URLs
+from .exceptions import RateLimitError
+
+
+class TokenBucket:
+    """A thread-safe, in-memory token bucket.
+
+    Attributes:
+        rate: How many tokens are added to the bucket every second
+        capacity: The maximum number of tokens, that is the allowed burst
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("Rate must be a positive number")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        if self.capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _take(self, tokens: float, now: float, available: float, updated: float):
+        """Refills the bucket and tries to take the tokens from it.
+
+        Returns the new token count and how long to wait before the tokens are available.
+        """
+        available = min(self.capacity, available + (now - updated) * self.rate)
+        if available >= tokens:
+            return available - tokens, 0.0
+        return available, (tokens - available) / self.rate
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Takes the tokens if available.
+
+        Returns:
+            0 if the tokens have been taken, otherwise the seconds to wait before retrying.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens, wait = self._take(tokens, now, self._tokens, self._updated)
+            self._updated = now
+            return wait
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> None:
+        """Blocks until the tokens are available.
+
+        Args:
+            tokens (float, optional): How many tokens to take. Defaults to 1.
+            timeout (float, optional): Maximum seconds to wait. Defaults to no limit.
+
+        Raises:
+            RateLimitError: if the tokens are not available within the timeout.
+        """
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of {self.capacity}")
+
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return
+            if deadline is not None and self._clock() + wait > deadline:
+                raise RateLimitError(f"Rate limit not available within {timeout} seconds")
+            self._sleep(wait)
+
+
+class SQLiteTokenBucket(TokenBucket):
+    """A token bucket whose state is stored in a SQLite database.
+
+    Every process pointing to the same file and bucket name shares the same budget.
+    The wall clock is used, since monotonic clocks are not comparable between processes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        name: str,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        super().__init__(rate, capacity, clock=clock, sleep=sleep)
+        self.path = str(path)
+        self.name = name
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                (self.name, self.capacity, self._clock()),
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        with self._lock:
+            conn = self._connect()
+            try:
+                # An immediate transaction takes the write lock, so the read-modify-write
+                # cycle is atomic between processes.
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    available, updated = conn.execute(
+                        "SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)
+                    ).fetchone()
+                    now = self._clock()
+                    available, wait = self._take(tokens, now, available, updated)
+                    conn.execute(
+                        "UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?",
+                        (available, now, self.name),
+                    )
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.close()
+            return wait
+
+
+LimitSpec = Union[float, Tuple[float, float], TokenBucket]
+
+
+class RateLimiter:
+    """Throttles the API calls with a token bucket per endpoint name.
+
+    Example:
+        limiter = RateLimiter({"job_detail": 1, "process_execution": (0.2, 5)}, default=10)
+
+    Attributes:
+        buckets: The endpoint name to :class:`TokenBucket` mapping
+        default: The bucket for the endpoints without a specific limit, if any
+        timeout: Maximum seconds to wait for a token before raising
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Mapping[str, LimitSpec]] = None,
+        default: Optional[LimitSpec] = None,
+        urls: Optional[URLs] = None,
+        path: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Args:
+            limits: Maps an endpoint name to either a rate, a (rate, capacity) tuple or a bucket.
+                The same bucket instance can be used for several endpoints to share a budget.
+            default: The limit applied to the endpoints not listed in `limits`.
+            urls: If given, the endpoint names are validated against it.
+            path: If given, buckets are backed by this SQLite file and shared between processes.
+            timeout: Maximum seconds to wait for a token. Defaults to no limit.
+        """
+        limits = limits or {}
+        if urls is not None:
+            unknown = set(limits) - set(urls.endpoints)
+            if unknown:
+                raise ValueError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+        self.path = path
+        self.timeout = timeout
+        self.buckets: Dict[str, TokenBucket] = {
+            name: self._make_bucket(name, spec) for name, spec in limits.items()
+        }
+        self.default = None if default is None else self._make_bucket("__default__", default)
+
+    def _make_bucket(self, name: str, spec: LimitSpec) -> TokenBucket:
+        if isinstance(spec, TokenBucket):
+            return spec
+
+        if isinstance(spec, (tuple, list)):
+            rate, capacity = spec
+        else:
+            rate, capacity = spec, None
+
+        if self.path is not None:
+            return SQLiteTokenBucket(self.path, name, rate, capacity)
+        return TokenBucket(rate, capacity)
+
+    def bucket(self, endpoint_name: str) -> Optional[TokenBucket]:
+        return self.buckets.get(endpoint_name, self.default)
+
+    def acquire(self, endpoint_name: str) -> None:
+        """Blocks until a request to the given endpoint is allowed."""
+        bucket = self.bucket(endpoint_name)
+        if bucket is not None:
+            bucket.acquire(timeout=self.timeout)
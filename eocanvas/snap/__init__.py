@@ -6,7 +6,10 @@ All the operators are statically listed.
 """
 
 from .graph import Graph  # noqa: F401
+from .node import Node  # noqa: F401
 from .operator import Operator  # noqa: F401
+from .optimizer import OptimizationReport, optimize  # noqa: F401
 from .operatorparams import OperatorParams  # noqa: F401
 from .target_band import TargetBand  # noqa: F401
 from .target_band_descriptors import TargetBandDescriptors  # noqa: F401
+from .template import GraphTemplate, RenderedGraph  # noqa: F401
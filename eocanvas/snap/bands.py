@@ -0,0 +1,143 @@
+"""Analysis of the bands a SNAP Graph actually uses.
+
+Starting from the Write nodes, the analysis goes up the graph and collects the bands each
+node needs from its sources: the bands referenced by the BandMaths and Binning expressions
+and aggregators, and the bands selected by the operators that pass their bands through.
+Operators it does not know are assumed to need all the bands.
+"""
+
+import re
+from typing import Dict, Iterable, Optional, Set
+
+from .expression import references
+from .graph import Graph
+from .node import Node
+
+# The operators whose output bands have the same name as their source bands
+_PASS_THROUGH_OPERATORS = {"Subset", "Reproject", "Resample", "BandMerge"}
+# Parameters selecting the bands of a pass-through operator
+_BAND_SELECTIONS = {
+    "Subset": ("bandNames", "sourceBands"),
+    "BandMerge": ("sourceBandNames", "sourceBands"),
+}
+# Parameters naming a band the operator needs along with the selected ones
+_REFERENCE_BANDS = ("referenceBand", "referenceBandName")
+# Bands SNAP copies with the geocoding, even when no expression uses them
+GEOCODING_BANDS = frozenset(["latitude", "longitude", "lat", "lon"])
+
+_PRODUCT_REFERENCE = re.compile(r"^\$\d+\.")
+
+
+def band_list(value) -> Optional[list]:
+    """Splits a comma separated band list. Returns None if it is empty, meaning all bands."""
+    if not isinstance(value, str):
+        return None
+    bands = [band.strip() for band in value.split(",") if band.strip()]
+    return bands or None
+
+
+def required_bands(graph: Graph, order: Iterable[str]) -> Dict[str, Optional[Set[str]]]:
+    """Returns the bands required from the output of each node.
+
+    Args:
+        graph: The graph to analyze.
+        order: The node identifiers in topological order.
+
+    Returns:
+        A dictionary mapping each node identifier to the set of the band names its
+        consumers need, or to None if they may need all of them.
+    """
+    nodes = graph.nodes
+    required: Dict[str, Optional[Set[str]]] = {node_id: set() for node_id in nodes}
+
+    for node_id in reversed(list(order)):
+        node = nodes[node_id]
+        needed = _needed_from_sources(node, required[node_id])
+        for source_id in node.source_ids:
+            if source_id not in required or required[source_id] is None:
+                continue
+            if needed is None:
+                required[source_id] = None
+            else:
+                required[source_id] |= needed
+
+    return required
+
+
+def _needed_from_sources(node: Node, output: Optional[Set[str]]) -> Optional[Set[str]]:
+    """Returns the bands a node needs from its sources to produce the given output bands."""
+    try:
+        if node.operator == "BandMaths":
+            return _band_maths_references(node)
+        if node.operator == "Binning":
+            return _binning_references(node)
+    except ValueError:
+        return None
+
+    if node.operator not in _PASS_THROUGH_OPERATORS:
+        return None
+
+    needed = output
+    for name in _BAND_SELECTIONS.get(node.operator, ()):
+        selected = band_list(node.parameters.get(name))
+        if selected is not None:
+            needed = set(selected) if output is None else output & set(selected)
+            break
+
+    if needed is None:
+        return None
+    return needed | {
+        node.parameters[name]
+        for name in _REFERENCE_BANDS
+        if isinstance(node.parameters.get(name), str) and node.parameters[name].strip()
+    }
+
+
+def _texts(node: Node, parameter: str, path: str) -> Iterable[str]:
+    elem = node.parameters.get(parameter)
+    if elem is None or isinstance(elem, str):
+        return []
+    return [e.text.strip() for e in elem.iterfind(path) if e.text and e.text.strip()]
+
+
+def _expression_references(expressions: Iterable[str]) -> Set[str]:
+    names = set()
+    for expression in expressions:
+        names |= {_PRODUCT_REFERENCE.sub("", name) for name in references(expression)}
+    return names
+
+
+def _band_maths_references(node: Node) -> Set[str]:
+    names = _expression_references(
+        _texts(node, "targetBands", "targetBand/expression")
+        + _texts(node, "targetBands", "targetBand/validExpression")
+    )
+    return names - set(_texts(node, "variables", "variable/name"))
+
+
+def _binning_references(node: Node) -> Set[str]:
+    mask = node.parameters.get("maskExpr")
+    names = _expression_references(
+        _texts(node, "variables", "variable/expr")
+        + _texts(node, "variables", "variable/validExpr")
+        + ([mask] if isinstance(mask, str) and mask.strip() else [])
+    )
+    for path in ("aggregator/varName", "aggregator/onMaxVarName", "aggregator/setVarNames"):
+        for text in _texts(node, "aggregators", path):
+            names |= set(band_list(text) or [])
+    return names - set(_texts(node, "variables", "variable/name"))
+
+
+def prune_band_list(bands: Iterable[str], required: Set[str]) -> list:
+    """Keeps the required bands of a list, along with the geocoding bands.
+
+    Flag bands are kept when one of their masks is required: a mask such as
+    `WQSF_lsb_LAND` keeps the `WQSF_lsb` band.
+    """
+    return [
+        band
+        for band in bands
+        if band in required
+        or band in GEOCODING_BANDS
+        or any(name.startswith(band + "_") for name in required)
+    ]
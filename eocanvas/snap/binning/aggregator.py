@@ -0,0 +1,43 @@
+import attr
+import lxml.etree as etree
+
+from ..xmlwriter import field_names
+
+
+class Aggregator(object):
+    """Serialization shared by the binning aggregators.
+
+    Subclasses are `attrs` classes, declared with `repr=False`, whose first attribute is
+    `type`, and set `TYPE` to the aggregator type. The type is always serialized from
+    `TYPE`, so it cannot be changed on the instances.
+    """
+
+    TYPE = None
+
+    def __str__(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return "{}({})".format(
+            type(self).__name__,
+            ", ".join(["{}='{}'".format(key, value) for key, value in self.to_dict().items()]),
+        )
+
+    def _fields(self):
+        yield "type", self.TYPE
+        for name in field_names(type(self))[1:]:
+            yield name, getattr(self, name)
+
+    def to_dict(self):
+        return {**attr.asdict(self), "type": self.TYPE}
+
+    def to_xml(self):
+        root = etree.Element("aggregator")
+
+        for key, value in self._fields():
+            etree.SubElement(root, key).text = str(value)
+
+        return root
+
+    def write_xml(self, writer):
+        writer.record("aggregator", ((key, str(value)) for key, value in self._fields()))
@@ -1,10 +1,13 @@
 import attr
-import lxml.etree as etree
 
+from .aggregator import Aggregator
 
-@attr.s
-class AggregatorAvg(object):
-    type = attr.ib(init=False, default="AVG")
+
+@attr.s(repr=False)
+class AggregatorAvg(Aggregator):
+    TYPE = "AVG"
+
+    type = attr.ib(init=False, default=TYPE)
     varName = attr.ib()
     targetName = attr.ib()
     weightCoeff = attr.ib(default=0.0)
@@ -20,27 +23,3 @@ class AggregatorAvg(object):
     def _check_sums_type(self, attribute, value):
         if value not in ["true", "false"]:
             raise ValueError("output_sums value is either 'true' or 'false'")
-
-    def __str__(self):
-        self.type = "AVG"
-        return self.__repr__()
-
-    def __repr__(self):
-        self.type = "AVG"
-        return "AggregatorAvg({})".format(
-            ", ".join(["{}='{}'".format(key, value) for key, value in self.to_dict().items()])
-        )
-
-    def to_dict(self):
-        self.type = "AVG"
-        return attr.asdict(self)
-
-    def to_xml(self):
-        self.type = "AVG"
-        root = etree.Element("aggregator")
-
-        for key, value in self.to_dict().items():
-            elem = etree.SubElement(root, key)
-            elem.text = str(value)
-
-        return root
@@ -19,3 +19,8 @@ class Aggregators(object):
             root.append(aggregator.to_xml())
 
         return root
+
+    def write_xml(self, writer):
+        with writer.element("aggregators"):
+            for aggregator in self.output_aggregators:
+                aggregator.write_xml(writer)
@@ -0,0 +1,436 @@
+"""Local implementation of the binning aggregators with NumPy.
+
+The samples are given as arrays: the index of the bin of each sample, the values of the
+binning variables and, optionally, a weight. They can be added in chunks, so that samples
+larger than the memory are binned chunk by chunk. NumPy is an optional dependency: install
+it with `pip install eocanvas[local]`.
+
+Example:
+    >>> binner = Binner([AggregatorAvg("chl", "chl"), AggregatorMinMax("chl", "chl")])
+    >>> for bins, chl in chunks:
+    ...     binner.update(bins, {"chl": chl})
+    >>> binner.result()["chl_mean"]
+
+The bin indexes are dense, from 0 to the number of bins. NaN values are skipped. The
+AVG, MIN_MAX, ON_MAX_SET and SUM aggregators keep a few values per bin. AVG_OUTLIER and
+PERCENTILE need the values of a bin, so they keep a uniform random sample of at most
+`max_samples` values per bin: they are exact for the bins with fewer values, and
+estimated from the sample for the others, so that memory stays bounded.
+"""
+
+from typing import Dict, Iterable, List, Mapping, Optional
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # pragma: no cover
+    raise ModuleNotFoundError(
+        "The local binning requires NumPy: pip install eocanvas[local]"
+    ) from None
+
+# Values further than this number of standard deviations from the mean are outliers
+DEVIATION_FACTOR = 1.0
+# The number of values kept per bin by AVG_OUTLIER and PERCENTILE
+MAX_SAMPLES = 1000
+
+
+def _grow(array, size, fill):
+    """Returns the array extended to `size` with `fill` values, or the array itself."""
+    if len(array) >= size:
+        return array
+    grown = np.full(size, fill, dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+def _valid(bins, values, weights=None):
+    """Drops the samples with a NaN value."""
+    mask = ~np.isnan(values)
+    if mask.all():
+        return bins, values, weights
+    return bins[mask], values[mask], None if weights is None else weights[mask]
+
+
+def _divide(numerator, denominator):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+class _Accumulator:
+    """The state of an aggregator over the bins, updated chunk by chunk."""
+
+    def __init__(self, aggregator, num_bins):
+        self.aggregator = aggregator
+        self.size = num_bins or 0
+
+    def _resize(self, bins):
+        if len(bins):
+            self.size = max(self.size, int(bins.max()) + 1)
+
+    def names(self) -> List[str]:
+        """The output names."""
+        raise NotImplementedError
+
+    def update(self, bins, variables, weights):
+        raise NotImplementedError
+
+    def result(self) -> Dict[str, "np.ndarray"]:
+        raise NotImplementedError
+
+
+class _Sum(_Accumulator):
+    def __init__(self, aggregator, num_bins):
+        super().__init__(aggregator, num_bins)
+        self.sums = np.zeros(self.size)
+
+    def update(self, bins, variables, weights):
+        bins, values, _ = _valid(bins, variables[self.aggregator.varName])
+        self._resize(bins)
+        self.sums = _grow(self.sums, self.size, 0.0)
+        self.sums += np.bincount(bins, weights=values, minlength=self.size)
+
+    def names(self):
+        return [f"{self.aggregator.targetName}_sum"]
+
+    def result(self):
+        return {f"{self.aggregator.targetName}_sum": self.sums}
+
+
+class _Avg(_Accumulator):
+    """Weighted mean and standard deviation. Weights are raised to `weightCoeff`."""
+
+    def __init__(self, aggregator, num_bins):
+        super().__init__(aggregator, num_bins)
+        self.counts = np.zeros(self.size, dtype=np.int64)
+        self.sums = [np.zeros(self.size) for _ in range(3)]
+
+    def update(self, bins, variables, weights):
+        bins, values, weights = _valid(bins, variables[self.aggregator.varName], weights)
+        self._resize(bins)
+        if weights is None:
+            weights = np.ones(len(values))
+        else:
+            weights = np.power(weights, float(self.aggregator.weightCoeff))
+
+        self.counts = _grow(self.counts, self.size, 0)
+        self.counts += np.bincount(bins, minlength=self.size)
+        for index, terms in enumerate((weights, weights * values, weights * values * values)):
+            self.sums[index] = _grow(self.sums[index], self.size, 0.0)
+            self.sums[index] += np.bincount(bins, weights=terms, minlength=self.size)
+
+    def names(self):
+        target = self.aggregator.targetName
+        names = [f"{target}_mean", f"{target}_sigma"]
+        if self.aggregator.outputCounts == "true":
+            names.append(f"{target}_counts")
+        if self.aggregator.outputSums == "true":
+            names += [f"{target}_sum", f"{target}_sum_sq"]
+        return names
+
+    def result(self):
+        target = self.aggregator.targetName
+        sum_w, sum_x, sum_xx = self.sums
+        mean = _divide(sum_x, sum_w)
+        variance = _divide(sum_xx, sum_w) - mean * mean
+        result = {
+            f"{target}_mean": mean,
+            f"{target}_sigma": np.sqrt(np.maximum(variance, 0.0)),
+        }
+        if self.aggregator.outputCounts == "true":
+            result[f"{target}_counts"] = self.counts
+        if self.aggregator.outputSums == "true":
+            result[f"{target}_sum"] = sum_x
+            result[f"{target}_sum_sq"] = sum_xx
+        return result
+
+
+class _MinMax(_Accumulator):
+    def __init__(self, aggregator, num_bins):
+        super().__init__(aggregator, num_bins)
+        self.minimum = np.full(self.size, np.inf)
+        self.maximum = np.full(self.size, -np.inf)
+
+    def update(self, bins, variables, weights):
+        bins, values, _ = _valid(bins, variables[self.aggregator.varName])
+        self._resize(bins)
+        self.minimum = _grow(self.minimum, self.size, np.inf)
+        self.maximum = _grow(self.maximum, self.size, -np.inf)
+        np.minimum.at(self.minimum, bins, values)
+        np.maximum.at(self.maximum, bins, values)
+
+    def names(self):
+        return [f"{self.aggregator.targetName}_min", f"{self.aggregator.targetName}_max"]
+
+    def result(self):
+        target = self.aggregator.targetName
+        empty = np.isinf(self.minimum) & (self.minimum > 0)
+        return {
+            f"{target}_min": np.where(empty, np.nan, self.minimum),
+            f"{target}_max": np.where(empty, np.nan, self.maximum),
+        }
+
+
+class _OnMaxSet(_Accumulator):
+    """The maximum of a variable, and the values of other variables on the same sample."""
+
+    def __init__(self, aggregator, num_bins):
+        super().__init__(aggregator, num_bins)
+        names = aggregator.setVarNames or ""
+        self.set_names = [name.strip() for name in names.split(",") if name.strip()]
+        self.maximum = np.full(self.size, -np.inf)
+        self.values = {name: np.full(self.size, np.nan) for name in self.set_names}
+
+    def update(self, bins, variables, weights):
+        values = variables[self.aggregator.onMaxVarName]
+        mask = ~np.isnan(values)
+        bins, values = bins[mask], values[mask]
+        self._resize(bins)
+        self.maximum = _grow(self.maximum, self.size, -np.inf)
+        if not len(bins):
+            return
+
+        chunk = np.full(self.size, -np.inf)
+        np.maximum.at(chunk, bins, values)
+        # The samples holding the maximum of their bin, if it is larger than the current one
+        better = (values == chunk[bins]) & (values > self.maximum[bins])
+        maxima, samples = bins[better], np.flatnonzero(mask)[better]
+        self.maximum[maxima] = values[better]
+        for name in self.set_names:
+            self.values[name] = _grow(self.values[name], self.size, np.nan)
+            self.values[name][maxima] = np.asarray(variables[name])[samples]
+
+    def names(self):
+        target = self.aggregator.targetName
+        return [f"{target}_max"] + [f"{target}_{name}" for name in self.set_names]
+
+    def result(self):
+        target = self.aggregator.targetName
+        result = {f"{target}_max": np.where(np.isinf(self.maximum), np.nan, self.maximum)}
+        for name in self.set_names:
+            result[f"{target}_{name}"] = _grow(self.values[name], self.size, np.nan)
+        return result
+
+
+class _Samples(_Accumulator):
+    """Keeps a uniform random sample of at most `max_samples` values per bin.
+
+    Each value gets a random key, and each bin keeps the values of its smallest keys. The
+    chunks are only reduced once a bin holds twice `max_samples` values, and only the
+    samples of the full bins are sorted.
+    """
+
+    def __init__(self, aggregator, num_bins, max_samples=MAX_SAMPLES):
+        super().__init__(aggregator, num_bins)
+        self.max_samples = max_samples
+        self.chunks = []
+        self.counts = np.zeros(self.size, dtype=np.int64)
+        self.stored = np.zeros(self.size, dtype=np.int64)
+        self._rng = np.random.default_rng(0)
+
+    def update(self, bins, variables, weights):
+        bins, values, _ = _valid(bins, variables[self.aggregator.varName])
+        self._resize(bins)
+        chunk_counts = np.bincount(bins, minlength=self.size)
+        self.counts = _grow(self.counts, self.size, 0) + chunk_counts
+        self.stored = _grow(self.stored, self.size, 0) + chunk_counts
+        self.chunks.append((bins, values, self._rng.random(len(values))))
+        if len(bins) and self.stored.max() > 2 * self.max_samples:
+            self._reduce()
+
+    def _reduce(self):
+        bins, values, keys = (np.concatenate(arrays) for arrays in zip(*self.chunks))
+        full = (self.stored > self.max_samples)[bins]
+        order = np.lexsort((keys[full], bins[full]))
+        sampled = [array[full][order] for array in (bins, values, keys)]
+        ranks = np.arange(len(order)) - np.searchsorted(sampled[0], sampled[0])
+        kept = ranks < self.max_samples
+        self.chunks = [
+            tuple(array[~full] for array in (bins, values, keys)),
+            tuple(array[kept] for array in sampled),
+        ]
+        self.stored = np.minimum(self.stored, self.max_samples)
+
+    def _samples(self):
+        if self.chunks:
+            return tuple(np.concatenate(arrays) for arrays in list(zip(*self.chunks))[:2])
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    def _sorted(self):
+        """Returns the values sorted by bin then value, and where each bin starts."""
+        bins, values = self._samples()
+        # A stable sort by bin keeps the values sorted within each bin
+        order = np.argsort(values)
+        order = order[np.argsort(bins[order], kind="stable")]
+        bins, values = bins[order], values[order]
+        starts = np.searchsorted(bins, np.arange(self.size + 1))
+        return bins, values, starts
+
+
+class _Percentile(_Samples):
+    """The percentile of the values, interpolated linearly as :func:`numpy.percentile`."""
+
+    def names(self):
+        return [f"{self.aggregator.targetName}_p{self.aggregator.percentage}"]
+
+    def result(self):
+        _, values, starts = self._sorted()
+        counts = np.diff(starts)
+        rank = np.maximum(counts - 1, 0) * (self.aggregator.percentage / 100.0)
+        low = np.floor(rank).astype(np.int64)
+        high = np.minimum(low + 1, np.maximum(counts - 1, 0))
+        padded = np.append(values, np.nan)
+        empty = counts == 0
+        below = padded[np.where(empty, len(values), starts[:-1] + low)]
+        above = padded[np.where(empty, len(values), starts[:-1] + high)]
+        percentile = below + (above - below) * (rank - low)
+        return {f"{self.aggregator.targetName}_p{self.aggregator.percentage}": percentile}
+
+
+class _AvgOutlier(_Samples):
+    """The mean and standard deviation of the values, without the outliers.
+
+    Outliers are the values further than `DEVIATION_FACTOR` standard deviations from the
+    mean of the bin. For the sampled bins the counts are scaled to all the values.
+    """
+
+    def names(self):
+        target = self.aggregator.targetName
+        return [f"{target}_mean", f"{target}_sigma", f"{target}_counts"]
+
+    def result(self):
+        bins, values = self._samples()
+        sampled = np.bincount(bins, minlength=self.size)
+        counts = sampled
+        mean = _divide(np.bincount(bins, weights=values, minlength=self.size), counts)
+        sigma = np.sqrt(
+            np.maximum(
+                _divide(np.bincount(bins, weights=values * values, minlength=self.size), counts)
+                - mean * mean,
+                0.0,
+            )
+        )
+
+        kept = np.abs(values - mean[bins]) <= DEVIATION_FACTOR * sigma[bins] + 1e-12
+        bins, values = bins[kept], values[kept]
+        counts = np.bincount(bins, minlength=self.size)
+        totals = _grow(self.counts, self.size, 0)
+        scaled = np.rint(counts * totals / np.maximum(sampled, 1)).astype(np.int64)
+        mean = _divide(np.bincount(bins, weights=values, minlength=self.size), counts)
+        square = _divide(np.bincount(bins, weights=values * values, minlength=self.size), counts)
+        target = self.aggregator.targetName
+        return {
+            f"{target}_mean": mean,
+            f"{target}_sigma": np.sqrt(np.maximum(square - mean * mean, 0.0)),
+            f"{target}_counts": np.where(sampled < totals, scaled, counts),
+        }
+
+
+ACCUMULATORS = {
+    "AVG": _Avg,
+    "AVG_OUTLIER": _AvgOutlier,
+    "MIN_MAX": _MinMax,
+    "ON_MAX_SET": _OnMaxSet,
+    "PERCENTILE": _Percentile,
+    "SUM": _Sum,
+}
+
+
+class Binner:
+    """Aggregates samples into bins, chunk by chunk.
+
+    Args:
+        aggregators: A list of aggregators, or an
+            :class:`eocanvas.snap.binning.Aggregators`.
+        num_bins: The number of bins. If not given, it is the largest bin index plus one.
+        max_samples: The number of values kept per bin by AVG_OUTLIER and PERCENTILE.
+
+    Raises:
+        ValueError: if an aggregator type is not supported, or if two aggregators have
+            the same output, as SNAP does.
+    """
+
+    def __init__(
+        self, aggregators, num_bins: Optional[int] = None, max_samples: int = MAX_SAMPLES
+    ):
+        aggregators = getattr(aggregators, "output_aggregators", aggregators)
+        self.num_bins = num_bins
+        self._accumulators = []
+        outputs = set()
+        for aggregator in aggregators:
+            accumulator = ACCUMULATORS.get(aggregator.TYPE)
+            if accumulator is None:
+                raise ValueError(f"Unsupported aggregator {aggregator.TYPE}")
+            if issubclass(accumulator, _Samples):
+                accumulator = accumulator(aggregator, num_bins, max_samples)
+            else:
+                accumulator = accumulator(aggregator, num_bins)
+            duplicates = outputs.intersection(accumulator.names())
+            if duplicates:
+                raise ValueError(f"Duplicated aggregator outputs {', '.join(sorted(duplicates))}")
+            outputs.update(accumulator.names())
+            self._accumulators.append(accumulator)
+
+    def update(
+        self,
+        bins: "np.ndarray",
+        variables: Mapping[str, "np.ndarray"],
+        weights: Optional["np.ndarray"] = None,
+    ) -> None:
+        """Adds a chunk of samples.
+
+        Args:
+            bins: The bin index of each sample.
+            variables: The values of the variables for each sample, by name.
+            weights: The weight of each sample, such as the number of observations it
+                aggregates. AVG raises it to its `weightCoeff`; by default all the
+                samples have the same weight.
+        """
+        bins = np.asarray(bins, dtype=np.int64).ravel()
+        if len(bins) and (bins.min() < 0 or (self.num_bins and bins.max() >= self.num_bins)):
+            raise ValueError("Bin indexes out of range")
+        variables = {
+            name: np.asarray(values, dtype=np.float64).ravel()
+            for name, values in variables.items()
+        }
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64).ravel()
+        for accumulator in self._accumulators:
+            accumulator.update(bins, variables, weights)
+
+    def result(self) -> Dict[str, "np.ndarray"]:
+        """Returns the aggregated values of each bin, by output name. Empty bins are NaN."""
+        size = max([self.num_bins or 0] + [a.size for a in self._accumulators])
+        result = {}
+        for accumulator in self._accumulators:
+            accumulator.size = size
+            for name, values in accumulator.result().items():
+                fill = 0 if np.issubdtype(values.dtype, np.integer) else np.nan
+                result[name] = _grow(values, size, fill)
+        return result
+
+
+def bin_samples(
+    aggregators,
+    bins: "np.ndarray",
+    variables: Mapping[str, "np.ndarray"],
+    weights: Optional["np.ndarray"] = None,
+    num_bins: Optional[int] = None,
+    chunk_size: int = 1_000_000,
+    max_samples: int = MAX_SAMPLES,
+) -> Dict[str, "np.ndarray"]:
+    """Aggregates samples into bins, processing them in chunks of `chunk_size` samples.
+
+    See :class:`Binner` for the arguments.
+    """
+    binner = Binner(aggregators, num_bins, max_samples)
+    for start, end in _chunks(len(np.ravel(bins)), chunk_size):
+        binner.update(
+            np.ravel(bins)[start:end],
+            {name: np.ravel(values)[start:end] for name, values in variables.items()},
+            None if weights is None else np.ravel(weights)[start:end],
+        )
+    return binner.result()
+
+
+def _chunks(size: int, chunk_size: int) -> Iterable:
+    for start in range(0, size, chunk_size):
+        yield start, min(start + chunk_size, size)
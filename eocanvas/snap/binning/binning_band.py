@@ -1,6 +1,8 @@
 import attr
 import lxml.etree as etree
 
+from ..xmlwriter import field_names
+
 
 @attr.s
 class BinningBand(object):
@@ -23,8 +25,10 @@ class BinningBand(object):
     def to_xml(self):
         root = etree.Element("band")
 
-        for key, value in self.to_dict().items():
-            elem = etree.SubElement(root, key)
-            elem.text = str(value)
+        for key in field_names(BinningBand):
+            etree.SubElement(root, key).text = str(getattr(self, key))
 
         return root
+
+    def write_xml(self, writer):
+        writer.record("band", ((key, str(getattr(self, key))) for key in field_names(BinningBand)))
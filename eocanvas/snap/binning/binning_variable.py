@@ -1,6 +1,8 @@
 import attr
 import lxml.etree as etree
 
+from ..xmlwriter import field_names
+
 
 @attr.s
 class BinningVariable(object):
@@ -19,6 +21,15 @@ class BinningVariable(object):
     def to_dict(self):
         return attr.asdict(self)
 
+    def evaluate(self, bands, no_data=None):
+        """Computes the variable locally from the arrays of the source bands, with NumPy.
+
+        See :func:`eocanvas.snap.evaluator.evaluate_variable`.
+        """
+        from ..evaluator import evaluate_variable
+
+        return evaluate_variable(self, bands, no_data)
+
     def format_key(self, key):
         if key in ["expression"]:
             return "expr"
@@ -30,8 +41,13 @@ class BinningVariable(object):
     def to_xml(self):
         root = etree.Element("variable")
 
-        for key, value in self.to_dict().items():
-            elem = etree.SubElement(root, self.format_key(key))
-            elem.text = value
+        for key in field_names(BinningVariable):
+            etree.SubElement(root, self.format_key(key)).text = getattr(self, key)
 
         return root
+
+    def write_xml(self, writer):
+        writer.record(
+            "variable",
+            ((self.format_key(key), getattr(self, key)) for key in field_names(BinningVariable)),
+        )
@@ -24,3 +24,18 @@ class BinningVariables(object):
                 raise ValueError("Provide a BinningVariable object")
 
         return root
+
+    def evaluate(self, bands, no_data=None):
+        """Computes the variables locally with NumPy, returning the arrays by name.
+
+        Each variable can use the ones defined before it.
+        """
+        bands = dict(bands)
+        for band in self.output_bands:
+            bands[band.name] = band.evaluate(bands, no_data)
+        return {band.name: bands[band.name] for band in self.output_bands}
+
+    def write_xml(self, writer):
+        with writer.element("variables"):
+            for band in self.output_bands:
+                band.write_xml(writer)
@@ -24,3 +24,8 @@ class BinningOutputBands(object):
                 raise ValueError("Provide a BinningBand object")
 
         return root
+
+    def write_xml(self, writer):
+        with writer.element("outputBands"):
+            for band in self.output_bands:
+                band.write_xml(writer)
@@ -0,0 +1,366 @@
+"""Local evaluation of the band maths expressions with NumPy.
+
+The expressions are compiled once to vectorized NumPy operations and evaluated on the
+arrays of the bands they reference, so that expressions and graphs can be previewed and
+tested on small samples without a remote SNAP job. NumPy is an optional dependency:
+install it with `pip install eocanvas[local]`.
+
+Example:
+    >>> compiled = compile_numpy("if B1 > 0 then B1 / B2 else NaN")
+    >>> compiled({"B1": np.array([1.0, -1.0]), "B2": np.array([2.0, 2.0])})
+    array([0.5, nan])
+
+The evaluation follows SNAP: integer divisions are truncated, comparisons and logical
+operators give booleans, and `X` and `Y` are the pixel center coordinates.
+"""
+
+from functools import lru_cache
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # pragma: no cover
+    raise ModuleNotFoundError(
+        "The local evaluation of expressions requires NumPy: pip install eocanvas[local]"
+    ) from None
+
+from eocanvas.exceptions import InvalidExpressionError
+
+from .expression import Binary, Conditional, Name, Number, String, Unary, fold, parse
+
+# The SNAP data types of the target bands
+DTYPES = {
+    "int8": np.int8,
+    "int16": np.int16,
+    "int32": np.int32,
+    "uint8": np.uint8,
+    "uint16": np.uint16,
+    "uint32": np.uint32,
+    "float32": np.float32,
+    "float64": np.float64,
+}
+
+_CONSTANTS = {"PI": np.pi, "E": np.e, "NaN": np.nan, "true": True, "false": False}
+# The constants also read in any case, as the parser does
+_CASELESS_CONSTANTS = {"nan": np.nan, "true": True, "false": False}
+
+
+def _divide(a, b):
+    if _is_integer(a) and _is_integer(b):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Adding 0.0 turns -0.0 into 0, as integers have no negative zero
+            return np.trunc(np.true_divide(a, b)) + 0.0
+    return np.true_divide(a, b)
+
+
+def _power(x, y):
+    # NumPy takes a scalar exponent of 0.5 as a square root, which gives NaN for -inf and
+    # keeps -0.0, so the exponent is expanded to an array
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float64), y)
+    return np.power(np.atleast_1d(x), np.array(y, ndmin=1)).reshape(x.shape)
+
+
+def _remainder(a, b):
+    return np.fmod(a, b)
+
+
+def _is_integer(value):
+    return np.issubdtype(np.asarray(value).dtype, np.integer)
+
+
+def _round(x):
+    return np.floor(np.add(x, 0.5))
+
+
+def _feq(a, b, eps=1e-6):
+    return np.abs(np.subtract(a, b)) <= eps
+
+
+def _to_integer(x):
+    """Converts to integers as Java casts to int: truncated, clamped, and NaN as 0."""
+    x = np.asarray(x)
+    if x.dtype == np.bool_ or np.issubdtype(x.dtype, np.integer):
+        return x
+    with np.errstate(invalid="ignore"):
+        return np.clip(np.nan_to_num(np.trunc(x)), -(2**31), 2**31 - 1).astype(np.int64)
+
+
+def _integers(function):
+    """Returns a bitwise operation taking float operands as integers, as SNAP does."""
+    return lambda *args: function(*(_to_integer(arg) for arg in args))
+
+
+def _bit_set(x, index):
+    return np.bitwise_and(np.right_shift(_to_integer(x), index), 1) == 1
+
+
+_BINARY = {
+    "+": np.add,
+    "-": np.subtract,
+    "*": np.multiply,
+    "/": _divide,
+    "%": _remainder,
+    "==": np.equal,
+    "!=": np.not_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "&&": np.logical_and,
+    "and": np.logical_and,
+    "||": np.logical_or,
+    "or": np.logical_or,
+    "&": _integers(np.bitwise_and),
+    "|": _integers(np.bitwise_or),
+    "^": _integers(np.bitwise_xor),
+    "<<": _integers(np.left_shift),
+    ">>": _integers(np.right_shift),
+}
+_UNARY = {
+    "-": np.negative,
+    "+": np.positive,
+    "!": np.logical_not,
+    "not": np.logical_not,
+    "~": _integers(np.invert),
+}
+_FUNCTIONS = {
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "asin": np.arcsin,
+    "acos": np.arccos,
+    "atan": np.arctan,
+    "atan2": np.arctan2,
+    "sinh": np.sinh,
+    "cosh": np.cosh,
+    "tanh": np.tanh,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "exp10": lambda x: np.power(10.0, x),
+    "log": np.log,
+    "log10": np.log10,
+    "pow": _power,
+    "abs": np.abs,
+    "sign": np.sign,
+    "min": np.minimum,
+    "max": np.maximum,
+    "floor": np.floor,
+    "ceil": np.ceil,
+    "round": _round,
+    "rint": np.rint,
+    "rad": np.radians,
+    "deg": np.degrees,
+    "nan": np.isnan,
+    "inf": np.isinf,
+    "feq": _feq,
+    "fneq": lambda a, b, eps=1e-6: ~_feq(a, b, eps),
+    "bit_set": _bit_set,
+}
+
+
+class NumpyExpression:
+    """A band maths expression compiled to NumPy operations.
+
+    Attributes:
+        expression: The source expression
+        names: The bands, masks or variables the expression uses
+        simplify: Whether the expression is folded before being compiled
+    """
+
+    def __init__(self, expression: str, simplify: bool = True):
+        self.expression = expression
+        self.names = set()
+        self.simplify = simplify
+        self._uses_coordinates = False
+        tree = parse(expression)
+        self._function = self._compile(fold(tree) if simplify else tree)
+
+    def __repr__(self):
+        return "NumpyExpression({!r})".format(self.expression)
+
+    def __call__(
+        self, bands: Mapping[str, "np.ndarray"], offset: Tuple[int, int] = (0, 0)
+    ) -> "np.ndarray":
+        """Evaluates the expression.
+
+        Args:
+            bands: The arrays of the bands, by name. Product references such as `$1.B1`
+                and raw values such as `B1.raw` are looked up as given, then as `B1`.
+            offset: The row and column of the first pixel of the arrays, when they are a
+                window of the bands, for the `X` and `Y` coordinates.
+
+        Raises:
+            InvalidExpressionError: if a band is missing.
+        """
+        arrays = {}
+        missing = []
+        for name in self.names:
+            key = _band_key(name, bands)
+            if key is None:
+                missing.append(name)
+            else:
+                arrays[name] = np.asarray(bands[key])
+        if missing:
+            raise InvalidExpressionError(
+                self.expression, f"missing bands {', '.join(sorted(missing))}"
+            )
+
+        shapes = [a.shape for a in arrays.values()]
+        if not shapes and self._uses_coordinates:
+            shapes = [np.shape(a) for a in bands.values()]
+        shape = np.broadcast_shapes(*shapes) if shapes else ()
+        if self._uses_coordinates:
+            arrays.update(_coordinates(shape, offset))
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            result = np.asarray(self._function(arrays))
+        if result.shape != shape:
+            result = np.broadcast_to(result, shape).copy()
+        return result
+
+    def _compile(self, tree) -> Callable[[Dict], object]:
+        if isinstance(tree, Number):
+            value = tree.value
+            return lambda arrays: value
+        if isinstance(tree, String):
+            raise InvalidExpressionError(self.expression, f"unsupported string {tree.text}")
+
+        if isinstance(tree, Name):
+            if tree.name in _CONSTANTS or tree.name.lower() in _CASELESS_CONSTANTS:
+                value = _CONSTANTS.get(tree.name, _CASELESS_CONSTANTS.get(tree.name.lower()))
+                return lambda arrays: value
+            name = tree.name
+            if name in ("X", "Y"):
+                self._uses_coordinates = True
+            else:
+                self.names.add(name)
+            return lambda arrays: arrays[name]
+
+        if isinstance(tree, Unary):
+            function = _UNARY[tree.op]
+            operand = self._compile(tree.operand)
+            return lambda arrays: function(operand(arrays))
+
+        if isinstance(tree, Binary):
+            function = _BINARY[tree.op]
+            left, right = self._compile(tree.left), self._compile(tree.right)
+            return lambda arrays: function(left(arrays), right(arrays))
+
+        if isinstance(tree, Conditional):
+            condition = self._compile(tree.condition)
+            then, otherwise = self._compile(tree.then), self._compile(tree.otherwise)
+            return lambda arrays: np.where(condition(arrays), then(arrays), otherwise(arrays))
+
+        function = _FUNCTIONS.get(tree.name)
+        if function is None:
+            raise InvalidExpressionError(self.expression, f"unsupported function {tree.name}")
+        args = [self._compile(arg) for arg in tree.args]
+        return lambda arrays: function(*(arg(arrays) for arg in args))
+
+
+def _band_key(name, bands):
+    """Returns the key of the array of a band in `bands`, or None if it is missing."""
+    if name in bands:
+        return name
+    if name.startswith("$"):
+        name = name.split(".", 1)[1]
+    if name.endswith(".raw"):
+        name = name[:-4]
+    return name if name in bands else None
+
+
+def _coordinates(shape, offset=(0, 0)):
+    """The X and Y pixel center coordinates of an image of the given shape."""
+    row, column = offset
+    if len(shape) < 2:
+        return {"X": np.arange(shape[0] if shape else 1) + column + 0.5, "Y": row + 0.5}
+    rows, columns = shape[-2:]
+    return {
+        "X": np.arange(columns) + column + 0.5,
+        "Y": (np.arange(rows) + row + 0.5)[:, np.newaxis],
+    }
+
+
+@lru_cache(maxsize=256)
+def compile_numpy(expression: str) -> NumpyExpression:
+    """Compiles an expression to NumPy operations.
+
+    The compiled expressions are cached, so that evaluating an expression window by
+    window compiles it once.
+
+    Raises:
+        InvalidExpressionError: if the expression is not valid or uses a function the
+            local evaluation does not support.
+    """
+    return NumpyExpression(expression)
+
+
+def evaluate(expression: str, bands: Mapping[str, "np.ndarray"]) -> "np.ndarray":
+    """Evaluates an expression on the arrays of the bands."""
+    return compile_numpy(expression)(bands)
+
+
+def valid_mask(
+    names, bands: Mapping[str, "np.ndarray"], no_data: Optional[Mapping[str, float]] = None
+) -> "np.ndarray":
+    """Returns where all the given bands are valid: not NaN, nor their no-data value."""
+    valid = np.bool_(True)
+    no_data = no_data or {}
+    for name in names:
+        key = _band_key(name, bands)
+        array = np.asarray(bands[key])
+        if np.issubdtype(array.dtype, np.floating):
+            valid = valid & ~np.isnan(array)
+        if key in no_data:
+            valid = valid & (array != no_data[key])
+    return valid
+
+
+def evaluate_target_band(
+    target_band,
+    bands: Mapping[str, "np.ndarray"],
+    no_data: Optional[Mapping[str, float]] = None,
+    offset: Tuple[int, int] = (0, 0),
+) -> "np.ndarray":
+    """Computes a BandMaths target band.
+
+    Pixels where a band the expression uses is invalid, or where the result is NaN, are
+    set to the no-data value of the target band. The result has the target band type.
+
+    Args:
+        target_band: A :class:`eocanvas.snap.target_band.TargetBand`.
+        bands: The arrays of the source bands, by name.
+        no_data: The no-data values of the source bands, by name.
+        offset: The row and column of the first pixel of the arrays, see
+            :meth:`NumpyExpression.__call__`.
+    """
+    compiled = compile_numpy(target_band.expression)
+    values = np.asarray(compiled(bands, offset), dtype=np.float64)
+    valid = valid_mask(compiled.names, bands, no_data) & ~np.isnan(values)
+
+    dtype = DTYPES.get(target_band.type)
+    if dtype is None:
+        raise ValueError(f"Unsupported target band type {target_band.type}")
+    fill = float(target_band.no_data_value) if target_band.no_data_value is not None else np.nan
+    if np.issubdtype(dtype, np.integer):
+        if np.isnan(fill):
+            fill = 0
+        values = np.trunc(np.where(valid, values, fill))
+    return np.where(valid, values, fill).astype(dtype)
+
+
+def evaluate_variable(
+    variable, bands: Mapping[str, "np.ndarray"], no_data: Optional[Mapping[str, float]] = None
+) -> "np.ndarray":
+    """Computes a binning variable, NaN where its valid expression does not hold.
+
+    Args:
+        variable: A :class:`eocanvas.snap.binning.BinningVariable`.
+        bands: The arrays of the source bands, by name.
+        no_data: The no-data values of the source bands, by name.
+    """
+    compiled = compile_numpy(variable.expression)
+    values = np.asarray(compiled(bands), dtype=np.float64)
+    valid = valid_mask(compiled.names, bands, no_data)
+    if variable.valid_expression:
+        valid = valid & np.asarray(evaluate(variable.valid_expression, bands), dtype=bool)
+    return np.where(valid, values, np.nan)
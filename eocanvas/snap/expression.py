@@ -0,0 +1,636 @@
+"""A tokenizer, parser and compiler for the SNAP band maths expressions.
+
+The tokenizer is enough to find the bands an expression references and to replace them,
+without touching function names, keywords, numbers or strings. The parser builds the
+syntax tree of an expression, which :func:`fold` simplifies and :func:`unparse` turns
+back into an expression. :func:`compile_expression` does all of it at once.
+
+Example:
+    >>> compile_expression("(B1 + B2) * (2 * PI / 360) - 0", bands=["B1", "B2"])
+    '(B1 + B2) * 0.017453292519943295'
+"""
+
+import math
+import re
+from collections import namedtuple
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Tuple
+from xml.sax.saxutils import escape, unescape
+
+from eocanvas.exceptions import InvalidExpressionError
+
+Token = namedtuple("Token", ["kind", "text"])
+
+NAME, NUMBER, STRING, OPERATOR, SPACE = "name", "number", "string", "operator", "space"
+
+_TOKEN = re.compile(
+    r"(?P<space>\s+)"
+    r"|(?P<number>0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)"
+    r"|(?P<name>(?:\$\d+\.)?[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*)"
+    r"|(?P<string>'[^']*'|\"[^\"]*\")"
+    r"|(?P<operator>&[A-Za-z]+;|&&|\|\||==|!=|<=|>=|<<|>>|[-+*/%^<>!=?:(),&|~@])"
+)
+
+# Names that are not bands: keywords, constants and pixel symbols. A name is also a
+# keyword if its lower case is, as `TRUE` or `NAN`
+KEYWORDS = frozenset(
+    ["if", "then", "else", "and", "or", "not", "true", "false", "NaN", "nan", "PI", "E"]
+    + ["X", "Y", "LAT", "LON", "TIME", "MJD"]
+)
+
+
+def tokenize(expression: str) -> Iterator[Token]:
+    """Splits an expression into tokens. Concatenating their text gives the expression.
+
+    Raises:
+        ValueError: if the expression contains an unexpected character.
+    """
+    position = 0
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if match is None:
+            raise ValueError(
+                f"Unexpected character {expression[position]!r} at {position} in {expression!r}"
+            )
+        yield Token(match.lastgroup, match.group())
+        position = match.end()
+
+
+def references(expression: str) -> Set[str]:
+    """Returns the names of the bands, masks or variables used in an expression."""
+    tokens = list(tokenize(expression))
+    return {tokens[index].text for index in _band_indexes(tokens)}
+
+
+def substitute(expression: str, replacements: Dict[str, str]) -> str:
+    """Replaces the band references with the given sub-expressions, in parentheses."""
+    tokens = list(tokenize(expression))
+    parts = [token.text for token in tokens]
+    for index in _band_indexes(tokens):
+        replacement = replacements.get(tokens[index].text)
+        if replacement is not None:
+            parts[index] = f"({replacement})"
+    return "".join(parts)
+
+
+def _band_indexes(tokens):
+    """Returns the index of the tokens referencing a band, such as `B1`, `$2.B1` or `B1.raw`."""
+    following = None
+    indexes = []
+    for index in range(len(tokens) - 1, -1, -1):
+        token = tokens[index]
+        if token.kind == SPACE:
+            continue
+        if (
+            token.kind == NAME
+            and token.text not in KEYWORDS
+            and token.text.lower() not in KEYWORDS
+            and following != "("  # Not a function call
+        ):
+            indexes.append(index)
+        following = token.text
+    return reversed(indexes)
+
+
+# Where the operators keep their expressions: the parameter and, for the structured
+# parameters, the path of the elements holding them.
+EXPRESSION_PARAMETERS = {
+    "BandMaths": (
+        ("targetBands", "targetBand/expression"),
+        ("targetBands", "targetBand/validExpression"),
+    ),
+    "Binning": (
+        ("variables", "variable/expr"),
+        ("variables", "variable/validExpr"),
+        ("maskExpr", None),
+    ),
+}
+
+# The syntax tree. Binary and unary operators keep their spelling, as `and` or `&&`.
+Number = namedtuple("Number", ["value", "text"])
+Name = namedtuple("Name", ["name"])
+String = namedtuple("String", ["text"])
+Call = namedtuple("Call", ["name", "args"])
+Unary = namedtuple("Unary", ["op", "operand"])
+Binary = namedtuple("Binary", ["op", "left", "right"])
+Conditional = namedtuple("Conditional", ["condition", "then", "otherwise", "keyword"])
+
+_CONDITIONAL = 1
+_BINARY = {
+    **dict.fromkeys(["||", "or"], 2),
+    **dict.fromkeys(["&&", "and"], 3),
+    "|": 4,
+    "^": 5,
+    "&": 6,
+    **dict.fromkeys(["==", "!="], 7),
+    **dict.fromkeys(["<", "<=", ">", ">="], 8),
+    **dict.fromkeys(["<<", ">>"], 9),
+    **dict.fromkeys(["+", "-"], 10),
+    **dict.fromkeys(["*", "/", "%"], 11),
+}
+# The operators taking numbers only, as opposed to logic and equality
+_ARITHMETIC_OPERATORS = {"<<", ">>", "+", "-", "*", "/", "%"}
+_BITWISE_OPERATORS = {"|", "^", "&"}
+_ORDERING_OPERATORS = {"<", "<=", ">", ">="}
+_UNARY = 12
+_ATOM = 13
+_PREFIX = {"-", "+", "!", "~", "not"}
+_KEYWORD_OPERATORS = {"and", "or", "not", "if", "then", "else"}
+_XML_ENTITIES = {"&quot;": '"', "&apos;": "'"}
+
+_INT_RANGE = range(-(2**31), 2**31)
+_CONSTANTS = {"PI": math.pi, "E": math.e}
+_BOOLEANS = {"true": True, "false": False}
+_FUNCTIONS = {
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "asin": math.asin,
+    "acos": math.acos,
+    "atan": math.atan,
+    "atan2": math.atan2,
+    "sqrt": math.sqrt,
+    "exp": math.exp,
+    "exp10": lambda x: 10.0**x,
+    "log": math.log,
+    "log10": math.log10,
+    "pow": math.pow,
+    "floor": math.floor,
+    "ceil": math.ceil,
+    "rad": math.radians,
+    "deg": math.degrees,
+}
+# Functions keeping integer arguments integer. Like NumPy, min and max return the second
+# argument on ties, so that the sign of a zero is kept, and propagate NaN.
+_INT_FUNCTIONS = {
+    "abs": abs,
+    "min": lambda a, b: a if a != a or a < b else b,
+    "max": lambda a, b: a if a != a or a > b else b,
+}
+# The number of arguments of the functions taking numbers
+_ARITIES = {
+    **dict.fromkeys(_FUNCTIONS, 1),
+    **dict.fromkeys(_INT_FUNCTIONS, 1),
+    **dict.fromkeys(["atan2", "pow", "min", "max"], 2),
+}
+# The result types, when known: bands can be numbers or masks
+BOOLEAN, NUMERIC = "boolean", "numeric"
+_NUMERIC_NAMES = {"PI", "E", "NaN", "X", "Y", "LAT", "LON", "TIME", "MJD"}
+
+
+class _Parser:
+    """A Pratt parser, each operator binding its operands according to its precedence."""
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = []
+        position = 0
+        try:
+            for token in tokenize(unescape(expression, _XML_ENTITIES)):
+                if token.kind != SPACE:
+                    self.tokens.append((token, position))
+                position += len(token.text)
+        except ValueError as exc:
+            raise InvalidExpressionError(expression, str(exc).split(" in ")[0])
+        self.index = 0
+
+    def error(self, message, position=None):
+        if position is None and self.index < len(self.tokens):
+            position = self.tokens[self.index][1]
+        return InvalidExpressionError(self.expression, message, position)
+
+    def peek(self):
+        if self.index < len(self.tokens):
+            token = self.tokens[self.index][0]
+            return token.text.lower() if token.text.lower() in _KEYWORD_OPERATORS else token.text
+        return None
+
+    def next(self):
+        if self.index >= len(self.tokens):
+            raise self.error("unexpected end of expression")
+        token = self.tokens[self.index][0]
+        self.index += 1
+        return token
+
+    def expect(self, text):
+        if self.peek() != text:
+            found = self.peek()
+            raise self.error(f"expected {text!r}" + (f", found {found!r}" if found else ""))
+        self.index += 1
+
+    def parse(self):
+        if not self.tokens:
+            raise self.error("empty expression")
+        tree = self.parse_expression(0)
+        if self.index < len(self.tokens):
+            raise self.error(f"unexpected {self.tokens[self.index][0].text!r}")
+        return tree
+
+    def parse_expression(self, precedence):
+        left = self.parse_prefix()
+        while True:
+            op = self.peek()
+            if op == "?" and precedence < _CONDITIONAL:
+                self.index += 1
+                then = self.parse_expression(0)
+                self.expect(":")
+                otherwise = self.parse_expression(_CONDITIONAL - 1)
+                left = Conditional(left, then, otherwise, False)
+            elif op in _BINARY and _BINARY[op] > precedence:
+                self.index += 1
+                left = Binary(op, left, self.parse_expression(_BINARY[op]))
+            else:
+                return left
+
+    def parse_prefix(self):
+        token = self.next()
+        text = token.text
+        keyword = text.lower()
+
+        if token.kind == NUMBER:
+            return Number(_number(text), text)
+        if token.kind == STRING:
+            return String(text)
+        if keyword == "if":
+            condition = self.parse_expression(0)
+            self.expect("then")
+            then = self.parse_expression(0)
+            self.expect("else")
+            return Conditional(condition, then, self.parse_expression(0), True)
+        if text in _PREFIX or keyword == "not":
+            op = keyword if keyword == "not" else text
+            return Unary(op, self.parse_expression(_UNARY - 1))
+        if token.kind == NAME and keyword not in _KEYWORD_OPERATORS:
+            if self.peek() != "(":
+                return Name(text)
+            position = self.tokens[self.index - 1][1]
+            self.index += 1
+            args = []
+            if self.peek() != ")":
+                args.append(self.parse_expression(0))
+                while self.peek() == ",":
+                    self.index += 1
+                    args.append(self.parse_expression(0))
+            self.expect(")")
+            arity = _ARITIES.get(text)
+            if arity is not None and len(args) != arity:
+                raise self.error(f"{text} takes {arity} argument(s), not {len(args)}", position)
+            return Call(text, tuple(args))
+        if text == "(":
+            tree = self.parse_expression(0)
+            self.expect(")")
+            return tree
+
+        self.index -= 1
+        raise self.error(f"unexpected {text!r}")
+
+
+def _number(text):
+    if text[:2].lower() == "0x":
+        return int(text, 16)
+    if text.isdigit():
+        return int(text)
+    return float(text)
+
+
+def parse(expression: str):
+    """Parses an expression into its syntax tree.
+
+    XML entities such as `&lt;` are read as the characters they stand for. The number of
+    arguments of the functions is checked, and so are the types of the operands, before
+    and after folding: booleans cannot be used as numbers.
+
+    Raises:
+        InvalidExpressionError: if the expression is not valid.
+    """
+    tree = _Parser(expression).parse()
+    try:
+        # The folded tree is checked too, as a constant condition selects a branch
+        result_type(tree)
+        result_type(fold(tree))
+    except TypeError as exc:
+        raise InvalidExpressionError(expression, str(exc))
+    return tree
+
+
+def result_type(tree) -> Optional[str]:
+    """Returns the type of the result of a syntax tree: `BOOLEAN` if it is or can be a
+    boolean, `NUMERIC` if it is a number, or None if it is not known, as for a band.
+
+    Raises:
+        TypeError: if a boolean is used as a number, or the branches of a conditional
+            have different types.
+    """
+    if isinstance(tree, Number):
+        return NUMERIC
+    if isinstance(tree, Name):
+        if tree.name.lower() in _BOOLEANS:
+            return BOOLEAN
+        return NUMERIC if tree.name in _NUMERIC_NAMES or tree.name == "nan" else None
+    if isinstance(tree, String):
+        return None
+    if isinstance(tree, Call):
+        types = [result_type(arg) for arg in tree.args]
+        if tree.name not in _ARITIES:
+            return None
+        if BOOLEAN in types:
+            raise TypeError(f"{tree.name} takes numbers, not booleans")
+        return NUMERIC
+    if isinstance(tree, Unary):
+        operand = result_type(tree.operand)
+        if tree.op in ("!", "not"):
+            return BOOLEAN
+        if operand == BOOLEAN:
+            raise TypeError(f"unary {tree.op!r} takes a number, not a boolean")
+        return NUMERIC
+    if isinstance(tree, Binary):
+        left, right = result_type(tree.left), result_type(tree.right)
+        if tree.op in _ARITHMETIC_OPERATORS or tree.op in _ORDERING_OPERATORS:
+            if BOOLEAN in (left, right):
+                raise TypeError(f"{tree.op!r} takes numbers, not booleans")
+            return NUMERIC if tree.op in _ARITHMETIC_OPERATORS else BOOLEAN
+        if tree.op in _BITWISE_OPERATORS:
+            return left if left == right else None
+        return BOOLEAN
+
+    result_type(tree.condition)
+    then, otherwise = result_type(tree.then), result_type(tree.otherwise)
+    if {then, otherwise} == {BOOLEAN, NUMERIC}:
+        raise TypeError("the branches of the conditional are a boolean and a number")
+    # A branch which is a band can be a mask, so the conditional is only known to be
+    # numeric if both branches are
+    if BOOLEAN in (then, otherwise):
+        return BOOLEAN
+    return then if then == otherwise else None
+
+
+def unparse(tree) -> str:
+    """Turns a syntax tree back into an expression, with the needed parentheses only."""
+    return _unparse(tree)[0]
+
+
+def _unparse(tree):
+    """Returns the expression of a tree and the precedence of its top operator."""
+    if isinstance(tree, Number):
+        return tree.text, _UNARY if tree.text.startswith("-") else _ATOM
+    if isinstance(tree, Name):
+        return tree.name, _ATOM
+    if isinstance(tree, String):
+        return tree.text, _ATOM
+    if isinstance(tree, Call):
+        return "{}({})".format(tree.name, ", ".join(unparse(arg) for arg in tree.args)), _ATOM
+    if isinstance(tree, Unary):
+        operand = _wrap(tree.operand, _UNARY)
+        if tree.op == "not":
+            return "not " + operand, _UNARY
+        if operand.startswith(tree.op):
+            operand = " " + operand
+        return tree.op + operand, _UNARY
+    if isinstance(tree, Binary):
+        precedence = _BINARY[tree.op]
+        left = _wrap(tree.left, precedence)
+        right = _wrap(tree.right, precedence + 1)
+        return f"{left} {tree.op} {right}", precedence
+
+    condition = _wrap(tree.condition, _CONDITIONAL + 1)
+    then = unparse(tree.then)
+    otherwise = _wrap(tree.otherwise, _CONDITIONAL)
+    if tree.keyword:
+        return f"if {condition} then {then} else {otherwise}", _CONDITIONAL
+    return f"{condition} ? {then} : {otherwise}", _CONDITIONAL
+
+
+def _wrap(tree, precedence):
+    text, own = _unparse(tree)
+    return f"({text})" if own < precedence else text
+
+
+def fold(tree):
+    """Simplifies a syntax tree.
+
+    Operations on constants are computed, with the Java semantics of SNAP: integer
+    operations are only folded when they cannot overflow, and integer divisions are left
+    to SNAP. Subtractions of 0 and multiplications by 1, as integers, are removed from
+    operands known to be numeric, as are conditionals with equal branches or with a
+    constant condition, when dropping a branch does not change their type.
+    """
+    if isinstance(tree, Unary):
+        operand = fold(tree.operand)
+        value = _constant(operand)
+        if tree.op == "-" and isinstance(operand, Unary) and operand.op == "-":
+            if result_type(operand.operand) != BOOLEAN:
+                return operand.operand
+        if tree.op in ("-", "+") and isinstance(operand, Number):
+            return _make_constant(-value if tree.op == "-" else value) or Unary(tree.op, operand)
+        if tree.op in ("!", "not") and isinstance(value, bool):
+            return _make_constant(not value)
+        return Unary(tree.op, operand)
+
+    if isinstance(tree, Binary):
+        left, right = fold(tree.left), fold(tree.right)
+        folded = _fold_binary(tree.op, left, right)
+        return folded if folded is not None else Binary(tree.op, left, right)
+
+    if isinstance(tree, Conditional):
+        condition = fold(tree.condition)
+        then, otherwise = fold(tree.then), fold(tree.otherwise)
+        value = _constant(condition)
+        if isinstance(value, bool):
+            kept, dropped = (then, otherwise) if value else (otherwise, then)
+            if _keeps_type(kept, dropped):
+                return kept
+        if then == otherwise:
+            return then
+        return Conditional(condition, then, otherwise, tree.keyword)
+
+    if isinstance(tree, Call):
+        args = tuple(fold(arg) for arg in tree.args)
+        values = [_constant(arg) for arg in args]
+        if args and all(v is not None and not isinstance(v, bool) for v in values):
+            function = _INT_FUNCTIONS.get(tree.name)
+            try:
+                if function is not None:
+                    result = function(*values)
+                    if any(isinstance(v, float) for v in values):
+                        result = float(result)
+                elif tree.name in _FUNCTIONS:
+                    result = float(_FUNCTIONS[tree.name](*map(float, values)))
+                else:
+                    result = None
+            except (ArithmeticError, TypeError, ValueError):
+                result = None
+            folded = _make_constant(result)
+            if folded is not None:
+                return folded
+        return Call(tree.name, args)
+
+    return tree
+
+
+def _fold_binary(op, left, right):
+    """Returns the folded operation, or None if it cannot be simplified."""
+    a, b = _constant(left), _constant(right)
+
+    if a is not None and b is not None:
+        if isinstance(a, bool) and isinstance(b, bool):
+            if op in ("&&", "and"):
+                return _make_constant(a and b)
+            if op in ("||", "or"):
+                return _make_constant(a or b)
+            return None
+        if isinstance(a, bool) or isinstance(b, bool):
+            return None
+        integers = isinstance(a, int) and isinstance(b, int)
+        try:
+            if op in ("+", "-", "*"):
+                result = a + b if op == "+" else a - b if op == "-" else a * b
+                if integers and result not in _INT_RANGE:
+                    return None
+                return _make_constant(result)
+            if op in ("/", "%") and not integers:
+                return _make_constant(a / b if op == "/" else math.fmod(a, b))
+        except (ArithmeticError, ValueError):
+            return None
+        if op in ("==", "!=", "<", "<=", ">", ">="):
+            result = {
+                "==": a == b,
+                "!=": a != b,
+                "<": a < b,
+                "<=": a <= b,
+                ">": a > b,
+                ">=": a >= b,
+            }[op]
+            return _make_constant(result)
+        return None
+
+    # Removing the identity of a boolean operand would turn a 0/1 band into a boolean one.
+    # Bands are not known to be numeric, since they can be masks. Adding 0 is kept, as it
+    # turns -0.0 into 0.0, and so are divisions by 1, which turn integers into floats locally.
+    if type(b) is int and result_type(left) == NUMERIC:
+        if (op == "-" and b == 0) or (op == "*" and b == 1):
+            return left
+    if type(a) is int and a == 1 and op == "*" and result_type(right) == NUMERIC:
+        return right
+    return None
+
+
+def _keeps_type(kept, dropped):
+    """Returns whether a conditional has the type of its kept branch whatever the dropped
+    one is: an integer or a boolean constant, or a float kept branch.
+
+    As in SNAP, a conditional is a float if either branch is, so `false ? B1 : I1` is
+    not `I1` when `B1` is a float band.
+    """
+    value = _constant(dropped)
+    if kept == dropped or (value is not None and not isinstance(value, float)):
+        return True
+    if isinstance(kept, Call):
+        return kept.name in _FUNCTIONS
+    return isinstance(_constant(kept), float) or kept == Name("NaN")
+
+
+def _constant(tree):
+    """Returns the value of a constant tree, a number or a boolean, or None."""
+    if isinstance(tree, Number):
+        return tree.value
+    if isinstance(tree, Name):
+        if tree.name in _CONSTANTS:
+            return _CONSTANTS[tree.name]
+        return _BOOLEANS.get(tree.name.lower())
+    return None
+
+
+def _make_constant(value):
+    """Returns the tree of a constant, or None if it cannot be written as a literal."""
+    if isinstance(value, bool):
+        return Name("true" if value else "false")
+    if isinstance(value, int):
+        return Number(value, str(value))
+    if isinstance(value, float) and math.isfinite(value):
+        return Number(value, repr(value))
+    return None
+
+
+def names(tree) -> Iterator[str]:
+    """Yields the bands, masks or variables used in a syntax tree."""
+    if isinstance(tree, Name):
+        if tree.name not in KEYWORDS and tree.name.lower() not in KEYWORDS:
+            yield tree.name
+    elif isinstance(tree, Call):
+        for arg in tree.args:
+            yield from names(arg)
+    elif isinstance(tree, Unary):
+        yield from names(tree.operand)
+    elif isinstance(tree, Binary):
+        yield from names(tree.left)
+        yield from names(tree.right)
+    elif isinstance(tree, Conditional):
+        for child in (tree.condition, tree.then, tree.otherwise):
+            yield from names(child)
+
+
+def node_expressions(node) -> Iterator[Tuple[Any, Optional[str], str]]:
+    """Yields the non empty expressions of a graph node.
+
+    Each expression comes as `(owner, key, text)`: the owner is the lxml element holding
+    the expression when the key is None, else the parameters of the node.
+    """
+    for parameter, path in EXPRESSION_PARAMETERS.get(node.operator, ()):
+        value = node.parameters.get(parameter)
+        if path is None:
+            if isinstance(value, str) and value.strip():
+                yield node.parameters, parameter, value
+        elif value is not None and not isinstance(value, str):
+            for elem in value.iterfind(path):
+                if elem.text and elem.text.strip():
+                    yield elem, None, elem.text
+
+
+def _is_known(name: str, bands: Set[str]) -> bool:
+    """Returns whether a name is a band, a band property such as `B1.raw`, or a mask."""
+    name = re.sub(r"^\$\d+\.", "", name)
+    return (
+        name in bands
+        or name.split(".")[0] in bands
+        or any(name.startswith(band + "_") for band in bands)
+    )
+
+
+def compile_expression(expression: str, bands: Optional[Iterable[str]] = None) -> str:
+    """Validates and simplifies an expression.
+
+    Args:
+        expression: The expression. If it is XML escaped, as in `B1 &lt; 0`, so is the
+            result.
+        bands: The names of the available bands, to check the ones the expression uses.
+            Masks named after a flag band, as `WQSF_lsb_LAND`, are accepted.
+
+    Returns:
+        The simplified expression.
+
+    Raises:
+        InvalidExpressionError: if the expression is not valid or uses unknown bands.
+    """
+    tree = parse(expression)
+    if bands is not None:
+        bands = set(bands)
+        unknown = sorted({name for name in names(tree) if not _is_known(name, bands)})
+        if unknown:
+            raise InvalidExpressionError(expression, f"unknown bands {', '.join(unknown)}")
+
+    return _simplified(expression, tree)
+
+
+def simplify(expression: str) -> str:
+    """Returns the simplified expression. If it is XML escaped, so is the result.
+
+    Raises:
+        InvalidExpressionError: if the expression is not valid.
+    """
+    return _simplified(expression, parse(expression))
+
+
+def _simplified(expression, tree):
+    simplified = unparse(fold(tree))
+    if unescape(expression, _XML_ENTITIES) != expression:
+        simplified = escape(simplified)
+    return simplified
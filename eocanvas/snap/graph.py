@@ -1,33 +1,198 @@
 import os
+import re
+import threading
 from base64 import b64encode
+from collections import OrderedDict
+from copy import deepcopy
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Tuple
 from urllib.parse import urlparse
 from xml.sax.saxutils import unescape
 
 import lxml.etree as etree
-import requests
 import yaml
 
+from eocanvas.exceptions import InvalidExpressionError, InvalidGraphError
+from eocanvas.http import get_session
+from eocanvas.logging import logger
+from eocanvas.utils import canonical_hash
+
 from .binning import Aggregators, BinningVariables
 from .binning.output_bands import BinningOutputBands
+from .expression import node_expressions, parse
+from .index import DIRNAME
+from .node import PARAMETERS_CLASS, Node, Source
+from .operator import Operator
+from .snap import Snap
 from .target_band_descriptors import TargetBandDescriptors
+from .xmlwriter import xml_writer
+
+# Parameters holding an XML configuration rather than a plain value
+_COMPLEX_PARAMETERS = {
+    "targetBandDescriptors",
+    "aggregatorConfigs",
+    "variableConfigs",
+    "bandConfigurations",
+    "postProcessorConfig",
+    "productCustomizerConfig",
+}
+# Complex parameters that can be omitted
+_OPTIONAL_COMPLEX_PARAMETERS = {
+    "bandConfigurations",
+    "variableConfigs",
+    "postProcessorConfig",
+    "productCustomizerConfig",
+}
+_CONFIG_TYPES = (TargetBandDescriptors, Aggregators, BinningOutputBands, BinningVariables)
+_SIMPLE, _COMPLEX, _OPTIONAL_COMPLEX = range(3)
+_PARSER = etree.XMLParser(remove_blank_text=True, huge_tree=True)
+# XML tags accepted by SNAP in place of the parameter names of operators.json
+_PARAMETER_ALIASES = {
+    "targetBands": ("targetBandDescriptors",),
+    "aggregators": ("aggregatorConfigs",),
+    "variables": ("variableConfigs",),
+    "outputBands": ("bandConfigurations",),
+    "sourceBands": ("sourceBandNames", "bandNames"),
+    "tiePointGrids": ("tiePointGridNames",),
+    "resampling": ("resamplingName",),
+}
+# Parameters written by the SNAP Graph Builder and ignored by the operators
+_IGNORED_PARAMETERS = {"useAdvancedOptions"}
+# A template placeholder, as opposed to a product reference such as `$1.B1`
+_PLACEHOLDER = re.compile(r"\$(?!\d+\.)")
+_DESCRIPTIONS_FILENAME = os.path.join(DIRNAME, "data", "operators.yaml")
+
+# The graphs fetched by URL, along with their ETag, least recently used first
+_REMOTE_GRAPHS: "OrderedDict[str, Tuple[str, Graph]]" = OrderedDict()
+_REMOTE_GRAPHS_LOCK = threading.Lock()
+_REMOTE_GRAPHS_MAX_SIZE = 32
+
+
+@lru_cache(maxsize=None)
+def _parameter_plan(names):
+    """Returns the parameter names in serialization order, along with their kind.
+
+    The plan only depends on the names, so it is computed once per operator signature.
+    """
+    plan = []
+    for name in sorted(names):
+        if name in _OPTIONAL_COMPLEX_PARAMETERS:
+            plan.append((name, _OPTIONAL_COMPLEX))
+        elif name in _COMPLEX_PARAMETERS:
+            plan.append((name, _COMPLEX))
+        else:
+            plan.append((name, _SIMPLE))
+    return tuple(plan)
+
+
+@lru_cache(maxsize=None)
+def _operator_names():
+    return tuple(sorted(Snap().operators))
+
+
+@lru_cache(maxsize=None)
+def _operator_descriptions():
+    with open(_DESCRIPTIONS_FILENAME) as f:
+        operators = yaml.safe_load(f)
+    return MappingProxyType({key: value["desc"] for key, value in operators.items()})
+
+
+def _canonical_element(elem):
+    """Returns a structure equal for elements differing only in attribute order or spacing."""
+    return [
+        elem.tag,
+        sorted(elem.attrib.items()),
+        " ".join((elem.text or "").split()),
+        [_canonical_element(child) for child in elem if isinstance(child.tag, str)],
+    ]
+
+
+def _canonical_parameters(node, defaults):
+    """Returns the node parameters which are not set to their default value.
+
+    Parameters are keyed by their operators.json name, rather than by their XML alias.
+    """
+    parameters = {}
+    for tag, value in node.parameters.items():
+        name = tag
+        if name not in defaults:
+            name = next((n for n in _PARAMETER_ALIASES.get(tag, ()) if n in defaults), tag)
+
+        if isinstance(value, etree._Element):
+            value = _canonical_element(value)
+            if value[1:] == [[], "", []]:
+                value = None
+        elif value is not None:
+            value = " ".join(value.split()) or None
+
+        default = defaults.get(name)
+        if value is None or value == (" ".join(default.split()) if default else None):
+            continue
+        parameters[name] = value
+    return parameters
+
+
+@dataclass
+class GraphDiff:
+    """The differences between two graphs, see :meth:`Graph.diff`.
+
+    Attributes:
+        added: The identifiers of the nodes only found in the other graph
+        removed: The identifiers of the nodes only found in this graph
+        changed: The names of the parameters that differ, by node identifier. Changes of
+            operator or of sources are listed as `operator` and `sources`
+        renamed: The (identifier, other identifier) pairs of the identical nodes
+    """
+
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: Dict[str, List[str]] = field(default_factory=dict)
+    renamed: List[Tuple[str, str]] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed or self.renamed)
+
+
+def _operator_parameters(operator):
+    """Returns the operator parameters, including the ones set after its creation."""
+    if isinstance(operator, Operator):
+        return operator.to_dict()
+    return {
+        name: value
+        for name, value in vars(operator).items()
+        if not name.startswith("_") and name != "operator"
+    }
 
 
 class Graph:
     """SNAP Graph class
 
-    This class provides the methods to create, view and run a SNAP Graph
+    This class provides the methods to create, view and run a SNAP Graph.
+
+    The graph is kept as a list of :class:`eocanvas.snap.node.Node`. The XML document is
+    only produced when needed, and cached until the graph is modified. The element
+    returned by :attr:`root` is kept as well, and the edits made to it are applied to the
+    graph.
 
     Attributes:
-        None.
+        attrib: The attributes of the `graph` element
+        version: The graph version
     """
 
     def __init__(self, wdir=".", root=None):
-        if root is None:
-            self.root = etree.Element("graph")
-            version = etree.SubElement(self.root, "version")
-            version.text = "1.0"
-        else:
-            self.root = root
+        self.attrib = {}
+        self.version = "1.0"
+        self._nodes = {}
+        self._extras = []
+        self._serialized = {}
+        self._hashes = None
+        self._root = None
+        self._root_snapshot = None
+
+        if root is not None:
+            self._load(root)
 
         self.pid = None
         self.p = None
@@ -36,27 +201,228 @@ class Graph:
     def __str__(self):
         return "working dir: {}\n\n{}".format(
             self.wdir,
-            etree.tostring(self.root, pretty_print=True).decode("utf-8"),
+            self.tostring().decode("utf-8"),
         ).replace("\\n", "\n")
 
     def __repr__(self):
         return "Graph(wdir='{}')".format(self.wdir)
 
+    def _load(self, root):
+        self.attrib = dict(root.attrib)
+        self._nodes = {}
+        self._extras = []
+        for child in root:
+            if isinstance(child.tag, str):
+                self._load_child(child)
+        self.invalidate()
+
+    def _load_child(self, child):
+        if child.tag == "version":
+            self.version = child.text
+        elif child.tag == "node":
+            node = Node.from_element(child)
+            self._nodes[node.id] = node
+        else:
+            extra = deepcopy(child)
+            extra.tail = None
+            self._extras.append(extra)
+
+    def invalidate(self):
+        """Drops the cached XML, element and hashes.
+
+        It must be called after editing the nodes in place. An element previously
+        returned by :attr:`root` is then no longer applied to the graph.
+        """
+        self._serialized = {}
+        self._hashes = None
+        self._root = None
+
+    def _sync(self):
+        """Reloads the nodes from the element returned by :attr:`root` if it was edited."""
+        root = self._root
+        if root is not None and etree.tostring(root) != self._root_snapshot:
+            self._load(root)
+            self._keep_root(root)
+
+    def _keep_root(self, root):
+        self._root = root
+        self._root_snapshot = etree.tostring(root)
+
+    def _build_root(self):
+        root = etree.Element("graph", self.attrib)
+        etree.SubElement(root, "version").text = self.version
+        for node in self._nodes.values():
+            root.append(node.to_element())
+        for extra in self._extras:
+            root.append(deepcopy(extra))
+        return root
+
+    @property
+    def root(self):
+        """The graph as an lxml element.
+
+        The element is built at the first access and kept: the edits made to it are
+        applied to the graph, until the graph is modified through its nodes. Comparing the
+        element with its state when built costs a serialization each time the graph is
+        used, so `graph.tostring()` or `graph.nodes` are the cheaper ways to read it.
+        """
+        self._sync()
+        if self._root is None:
+            self._keep_root(self._build_root())
+        return self._root
+
+    @root.setter
+    def root(self, root):
+        self._load(root)
+        self._keep_root(root)
+
+    @property
+    def nodes(self):
+        """A read-only mapping of the node identifiers to the nodes."""
+        self._sync()
+        return MappingProxyType(self._nodes)
+
+    def remove_node(self, node_id):
+        """Removes a node. Sources referencing it are left untouched."""
+        self._sync()
+        del self._nodes[node_id]
+        self.invalidate()
+
+    def set_node(self, node):
+        """Adds a :class:`eocanvas.snap.node.Node`, replacing the node of the same identifier."""
+        self._sync()
+        self._nodes[node.id] = node
+        self.invalidate()
+
+    def copy(self, nodes=True):
+        """Returns a copy of the graph.
+
+        Args:
+            nodes: Copy the nodes. If False, only the attributes, the version and the
+                elements other than the nodes are copied.
+        """
+        self._sync()
+        graph = Graph(wdir=self.wdir)
+        graph.attrib = dict(self.attrib)
+        graph.version = self.version
+        if nodes:
+            graph._nodes = {node_id: node.copy() for node_id, node in self._nodes.items()}
+        graph._extras = [deepcopy(extra) for extra in self._extras]
+        return graph
+
+    def tostring(self, pretty_print=True):
+        """Serializes the graph to XML.
+
+        Args:
+            pretty_print: Indent the document. If False the output is minified.
+
+        Returns
+            The XML document as bytes.
+        """
+        self._sync()
+        serialized = self._serialized.get(pretty_print)
+        if serialized is None:
+            serialized = etree.tostring(self._build_root(), pretty_print=pretty_print)
+            self._serialized[pretty_print] = serialized
+        return serialized
+
+    def write(self, target, pretty_print=True):
+        """Writes the graph XML to a file, streaming the nodes without building the document.
+
+        Args:
+            target: A file name or a binary file object
+            pretty_print: Indent the document. If False the output is minified.
+        """
+        self._sync()
+        with xml_writer(target, pretty_print) as writer:
+            with writer.element("graph", self.attrib):
+                writer.leaf("version", self.version)
+                for node in self._nodes.values():
+                    node.write_xml(writer)
+                for extra in self._extras:
+                    writer.write(extra)
+
     @classmethod
     def from_text(cls, text):
-        root = etree.fromstring(text)
+        root = etree.fromstring(text, _PARSER)
         return cls(root=root)
 
     @classmethod
-    def from_uri(cls, uri):
+    def from_uri(cls, uri, timeout=60, use_cache=True):
+        """Loads a graph from a file or from an HTTP URL.
+
+        The document is parsed incrementally, one node at a time, so that large graphs
+        are never fully held in memory as XML.
+
+        Args:
+            uri: The file path or URL
+            timeout: The HTTP timeout in seconds
+            use_cache: Reuse the graph fetched earlier from the same URL, if the server
+                reports it is unchanged by its ETag. Only the 32 most recently used
+                graphs are kept.
+
+        Raises:
+            ValueError: if the document is not a SNAP Graph.
+        """
         parsed = urlparse(uri)
         if parsed.scheme.startswith("http"):
-            r = requests.get(uri)
-            root = etree.fromstring(r.content).xpath("/graph")[0]
-        else:
-            root = etree.parse(uri).getroot()
+            return cls._from_url(uri, timeout, use_cache)
 
-        return cls(root=root)
+        return cls._parse(uri)
+
+    @classmethod
+    def _from_url(cls, url, timeout, use_cache):
+        with _REMOTE_GRAPHS_LOCK:
+            cached = _REMOTE_GRAPHS.get(url) if use_cache else None
+            if cached is not None:
+                _REMOTE_GRAPHS.move_to_end(url)
+
+        headers = {"If-None-Match": cached[0]} if cached is not None else {}
+        with get_session().get(url, headers=headers, stream=True, timeout=timeout) as response:
+            if response.status_code == 304 and cached is not None:
+                logger.debug(f"Graph {url} not modified")
+                return cached[1].copy()
+
+            response.raise_for_status()
+            response.raw.decode_content = True
+            graph = cls._parse(response.raw)
+            etag = response.headers.get("ETag")
+
+        if use_cache and etag:
+            with _REMOTE_GRAPHS_LOCK:
+                _REMOTE_GRAPHS[url] = (etag, graph.copy())
+                _REMOTE_GRAPHS.move_to_end(url)
+                while len(_REMOTE_GRAPHS) > _REMOTE_GRAPHS_MAX_SIZE:
+                    _REMOTE_GRAPHS.popitem(last=False)
+        return graph
+
+    @classmethod
+    def _parse(cls, source):
+        """Builds a graph from a file or a stream, clearing each element once loaded."""
+        graph = cls()
+        root = None
+        depth = 0
+        for event, elem in etree.iterparse(
+            source, events=("start", "end"), remove_blank_text=True, huge_tree=True
+        ):
+            if event == "start":
+                if root is None:
+                    if elem.tag != "graph":
+                        raise ValueError(f"Not a SNAP Graph: found {elem.tag} instead of graph")
+                    root = elem
+                    graph.attrib = dict(elem.attrib)
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth == 1:
+                graph._load_child(elem)
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del root[0]
+
+        graph.invalidate()
+        return graph
 
     @staticmethod
     def list_operators():
@@ -71,11 +437,7 @@ class Graph:
         Raises:
             None.
         """
-        filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data/operators.yaml")
-        with open(filename) as f:
-            operators = yaml.safe_load(f)
-
-        return list(operators.keys())
+        return list(_operator_names())
 
     @staticmethod
     def describe_operators():
@@ -90,19 +452,224 @@ class Graph:
         Raises:
             None.
         """
-        with open("data/operators.yaml") as f:
-            operators = yaml.safe_load(f)
-
-        descriptions = {key: value["desc"] for key, value in operators.items()}
+        descriptions = dict(_operator_descriptions())
 
         for op, desc in descriptions.items():
             print(f"{op} - {desc}")
 
         return descriptions
 
-    def b64encode(self):
-        graph = etree.tostring(self.root, pretty_print=True)
-        return b64encode(graph).decode()
+    def validate(self, strict=True):
+        """Checks the graph against the SNAP operators, without submitting it.
+
+        Nodes are checked for unknown operators and parameters, values outside of the
+        allowed ones, Read and Write formats, the syntax of the BandMaths and Binning
+        expressions, sources referencing missing nodes and cycles. Values containing a `$`
+        placeholder are not checked.
+
+        Args:
+            strict: Raise an exception if the graph is invalid.
+
+        Returns
+            The list of the errors found.
+
+        Raises:
+            InvalidGraphError: if the graph is invalid and `strict` is set.
+        """
+        self._sync()
+        snap = Snap()
+        errors = []
+
+        for node in self._nodes.values():
+            allowed = snap.parameters.get(node.operator)
+            if allowed is None:
+                errors.append(f"Node {node.id}: unknown operator {node.operator}")
+                continue
+
+            formats = snap.formats.get(node.operator)
+            for tag, value in node.parameters.items():
+                if tag in _IGNORED_PARAMETERS:
+                    continue
+                name = tag
+                if name not in allowed:
+                    name = next((n for n in _PARAMETER_ALIASES.get(tag, ()) if n in allowed), None)
+                    if name is None:
+                        errors.append(
+                            f"Node {node.id}: unknown parameter {tag} for {node.operator}"
+                        )
+                        continue
+
+                if not isinstance(value, str) or not value.strip() or "$" in value:
+                    continue
+                value = value.strip()
+                values = formats if name == "formatName" and formats else allowed[name]
+                if values and value not in values:
+                    errors.append(f"Node {node.id}: invalid {tag} value {value!r}")
+
+            for _, _, expression in node_expressions(node):
+                if _PLACEHOLDER.search(expression):
+                    continue
+                try:
+                    parse(expression)
+                except InvalidExpressionError as exc:
+                    errors.append(f"Node {node.id}: {exc}")
+
+            for source_id in node.source_ids:
+                if source_id and "$" not in source_id and source_id not in self._nodes:
+                    errors.append(f"Node {node.id}: source {source_id} not found")
+
+        errors.extend(f"Cycle between nodes {', '.join(cycle)}" for cycle in self._cycles())
+
+        if errors and strict:
+            raise InvalidGraphError(errors)
+        return errors
+
+    def _cycles(self):
+        """Returns the cycles of the graph, as lists of node identifiers."""
+        state = {}  # 1 while on the current path, 2 once all its sources are visited
+        cycles = []
+        end = object()
+
+        for start in self._nodes:
+            if start in state:
+                continue
+            path = [start]
+            stack = [iter(self._nodes[start].source_ids)]
+            state[start] = 1
+            while stack:
+                source_id = next(stack[-1], end)
+                if source_id is end:
+                    state[path.pop()] = 2
+                    stack.pop()
+                elif state.get(source_id) == 1:
+                    first = path.index(source_id)
+                    cycles.append(path[first:])
+                elif source_id in self._nodes and source_id not in state:
+                    state[source_id] = 1
+                    path.append(source_id)
+                    stack.append(iter(self._nodes[source_id].source_ids))
+
+        return cycles
+
+    def _node_hashes(self):
+        """Returns the hash of each node, covering its operator, parameters and sources.
+
+        Sources are hashed by content rather than by identifier, so the hashes do not
+        depend on the node identifiers.
+
+        Raises:
+            InvalidGraphError: if the graph has a cycle.
+        """
+        self._sync()
+        if self._hashes is not None:
+            return self._hashes
+
+        defaults = Snap().defaults
+        hashes = {}
+        end = object()
+
+        for start in self._nodes:
+            if start in hashes:
+                continue
+            path, on_path = [start], {start}
+            stack = [iter(self._nodes[start].source_ids)]
+            while stack:
+                source_id = next(stack[-1], end)
+                if source_id is end:
+                    node = self._nodes[path.pop()]
+                    on_path.discard(node.id)
+                    stack.pop()
+                    hashes[node.id] = canonical_hash(
+                        node.operator,
+                        _canonical_parameters(node, defaults.get(node.operator, {})),
+                        [
+                            (s.name, hashes.get(source_id, source_id))
+                            for s, source_id in zip(node.sources, node.source_ids)
+                        ],
+                    )
+                elif source_id in on_path:
+                    raise InvalidGraphError([f"Cycle through node {source_id}"])
+                elif source_id in self._nodes and source_id not in hashes:
+                    path.append(source_id)
+                    on_path.add(source_id)
+                    stack.append(iter(self._nodes[source_id].source_ids))
+
+        self._hashes = hashes
+        return hashes
+
+    def fingerprint(self):
+        """Returns a stable hash of the graph.
+
+        The hash only depends on the operators, on the parameters not set to their default
+        value and on how the nodes are connected: node identifiers, parameter order,
+        spacing and presentation data do not change it. It is cached until the graph is
+        modified.
+
+        Raises:
+            InvalidGraphError: if the graph has a cycle.
+        """
+        return canonical_hash(sorted(self._node_hashes().values()))
+
+    def diff(self, other):
+        """Compares the graph with another one.
+
+        Nodes with identical content are matched even if their identifiers differ. A node
+        is changed only if its own operator, parameters or sources differ, not because one
+        of its sources changed.
+
+        Returns:
+            A :class:`GraphDiff`.
+        """
+        hashes, other_hashes = self._node_hashes(), other._node_hashes()
+        diff = GraphDiff()
+
+        unmatched = {}
+        for node_id, node_hash in other_hashes.items():
+            if hashes.get(node_id) != node_hash:
+                unmatched.setdefault(node_hash, []).append(node_id)
+
+        renames = {}
+        for node_id, node_hash in hashes.items():
+            if other_hashes.get(node_id) == node_hash:
+                renames[node_id] = node_id
+            elif unmatched.get(node_hash):
+                renames[node_id] = unmatched[node_hash].pop(0)
+                diff.renamed.append((node_id, renames[node_id]))
+
+        matched = set(renames.values())
+        defaults = Snap().defaults
+        for node_id, node in self._nodes.items():
+            if node_id in renames:
+                continue
+            other_node = other._nodes.get(node_id)
+            if other_node is None or node_id in matched:
+                diff.removed.append(node_id)
+                continue
+
+            matched.add(node_id)
+            params = _canonical_parameters(node, defaults.get(node.operator, {}))
+            other_params = _canonical_parameters(other_node, defaults.get(other_node.operator, {}))
+            changes = sorted(
+                name
+                for name in set(params) | set(other_params)
+                if params.get(name) != other_params.get(name)
+            )
+            if node.operator != other_node.operator:
+                changes.insert(0, "operator")
+            sources = [(s.name, renames.get(i, i)) for s, i in zip(node.sources, node.source_ids)]
+            other_sources = [
+                (s.name, i) for s, i in zip(other_node.sources, other_node.source_ids)
+            ]
+            if sources != other_sources:
+                changes.append("sources")
+            if changes:
+                diff.changed[node_id] = changes
+
+        diff.added = [node_id for node_id in other._nodes if node_id not in matched]
+        return diff
+
+    def b64encode(self, minify=False):
+        return b64encode(self.tostring(pretty_print=not minify)).decode()
 
     def nice_view(self):
         try:
@@ -123,12 +690,10 @@ class Graph:
                     )
                 )
 
-            display_xml_nice(etree.tostring(self.root, pretty_print=True))
+            display_xml_nice(self.tostring())
 
         except ModuleNotFoundError:
-            print(
-                etree.tostring(self.root, pretty_print=True).decode("utf-8").replace("\\n", "\n")
-            )
+            print(self.tostring().decode("utf-8").replace("\\n", "\n"))
 
     def view(self):
         """This method prints SNAP Graph
@@ -142,11 +707,14 @@ class Graph:
         Raises:
             None.
         """
-        print(unescape(etree.tostring(self.root, pretty_print=True).decode("utf-8")))
+        print(unescape(self.tostring().decode("utf-8")))
 
     def add_node(self, operator, node_id, source=None):
         """This method adds or overwrites a node to the SNAP Graph
 
+        When the node already exists its parameters are replaced with the operator ones,
+        and its sources are replaced only if `source` is given.
+
         Args:
             operator: SNAP operator
             node_id: node identifier
@@ -156,162 +724,70 @@ class Graph:
             None.
 
         Raises:
-            None.
+            ValueError: if a mandatory complex parameter is missing.
         """
-        xpath_expr = '/graph/node[@id="%s"]' % node_id
-
-        if len(self.root.xpath(xpath_expr)) != 0:
-            node_elem = self.root.xpath(xpath_expr)[0]
-            operator_elem = self.root.xpath(xpath_expr + "/operator")[0]
-            sources_elem = self.root.xpath(xpath_expr + "/sources")[0]
-            parameters_elem = self.root.xpath(xpath_expr + "/parameters")
-
-            for param in [
-                name
-                for name in dir(operator)
-                if not name.startswith("__")
-                and not name.endswith("__")
-                and name != "_params"
-                and name != "operator"
-                and type(getattr(operator, name)).__name__
-                in [
-                    "str",
-                    "NoneType",
-                    "TargetBandDescriptors",
-                    "Aggregators",
-                    "BinningOutputBands",
-                    "BinningVariables",
-                ]
-            ]:
-                if param in [
-                    "targetBandDescriptors",
-                    "aggregatorConfigs",
-                    "variableConfigs",
-                    "bandConfigurations",
-                    "postProcessorConfig",
-                    "productCustomizerConfig",
-                ]:
-                    if param in [
-                        "bandConfigurations",
-                        "variableConfigs",
-                        "postProcessorConfig",
-                        "productCustomizerConfig",
-                    ] and not getattr(operator, param):
-                        continue
-
-                    if (
-                        isinstance(getattr(operator, param), TargetBandDescriptors)
-                        or isinstance(getattr(operator, param), Aggregators)
-                        or isinstance(getattr(operator, param), BinningOutputBands)
-                        or isinstance(getattr(operator, param), BinningVariables)
-                    ):
-                        parameters_elem.append(getattr(operator, param).to_xml())
-
-                    elif isinstance(getattr(operator, param), str):
-                        parameters_elem.append(etree.fromstring(getattr(operator, param)))
-                    else:
-                        raise ValueError()
-
-                else:
-                    try:
-                        p_elem = self.root.xpath(xpath_expr + "/parameters/%s" % param)[0]
-
-                        if getattr(operator, param) is not None:
-                            if getattr(operator, param)[0] != "<":
-                                p_elem.text = getattr(operator, param)
-                            else:
-                                p_elem.text.append(etree.fromstring(getattr(operator, param)))
-                    except IndexError:
-                        pass
+        self._sync()
+        node = self._nodes.get(node_id)
 
+        if node is None:
+            node = Node(node_id, operator.operator)
+            self._nodes[node_id] = node
         else:
-            node_elem = etree.SubElement(self.root, "node")
-            operator_elem = etree.SubElement(node_elem, "operator")
-            sources_elem = etree.SubElement(node_elem, "sources")
-
-            if isinstance(source, list):
-                for index, s in enumerate(source):
-                    if index == 0:
-                        source_product_elem = etree.SubElement(sources_elem, "sourceProduct")
-
-                    else:
-                        source_product_elem = etree.SubElement(
-                            sources_elem, "sourceProduct.%s" % str(index)
-                        )
+            node.operator = operator.operator
+            node.parameters_attrib = {"class": PARAMETERS_CLASS}
 
-                    source_product_elem.attrib["refid"] = s
+        if source is not None:
+            node.sources = self._make_sources(source)
 
-            elif isinstance(source, dict):
-                for key, value in source.iteritems():
-                    source_product_elem = etree.SubElement(sources_elem, key)
-                    source_product_elem.text = value
+        node.parameters = self._make_parameters(operator)
+        self.invalidate()
 
-            elif source is not None:
-                source_product_elem = etree.SubElement(sources_elem, "sourceProduct")
-                source_product_elem.attrib["refid"] = source
-
-            parameters_elem = etree.SubElement(node_elem, "parameters")
-            parameters_elem.attrib["class"] = "com.bc.ceres.binding.dom.XppDomElement"
-
-            for param in [
-                name
-                for name in dir(operator)
-                if not name.startswith("__")
-                and not name.endswith("__")
-                and name != "_params"
-                and name != "operator"
-                and type(getattr(operator, name)).__name__
-                in [
-                    "str",
-                    "NoneType",
-                    "TargetBandDescriptors",
-                    "Aggregators",
-                    "BinningOutputBands",
-                    "BinningVariables",
-                ]
-            ]:
-                if param in [
-                    "targetBandDescriptors",
-                    "aggregatorConfigs",
-                    "variableConfigs",
-                    "bandConfigurations",
-                    "postProcessorConfig",
-                    "productCustomizerConfig",
-                ]:
-                    print(param, getattr(operator, param))
-                    if param in [
-                        "bandConfigurations",
-                        "variableConfigs",
-                        "postProcessorConfig",
-                        "productCustomizerConfig",
-                    ] and not getattr(operator, param):
-                        continue
+    @staticmethod
+    def _make_sources(source):
+        if isinstance(source, list):
+            return [
+                Source("sourceProduct" if index == 0 else "sourceProduct.%s" % index, s, None)
+                for index, s in enumerate(source)
+            ]
 
-                    if (
-                        isinstance(getattr(operator, param), TargetBandDescriptors)
-                        or isinstance(getattr(operator, param), Aggregators)
-                        or isinstance(getattr(operator, param), BinningOutputBands)
-                        or isinstance(getattr(operator, param), BinningVariables)
-                    ):
-                        parameters_elem.append(getattr(operator, param).to_xml())
+        if isinstance(source, dict):
+            return [Source(key, None, value) for key, value in source.items()]
 
-                    elif isinstance(getattr(operator, param), str):
-                        parameters_elem.append(etree.fromstring(getattr(operator, param)))
-                    else:
-                        raise ValueError()
+        return [Source("sourceProduct", source, None)]
 
+    @staticmethod
+    def _make_parameters(operator):
+        values = _operator_parameters(operator)
+        parameters = {}
+
+        for name, kind in _parameter_plan(tuple(values)):
+            value = values[name]
+
+            if kind == _SIMPLE:
+                if not isinstance(value, (str, type(None))):
+                    continue
+                if value is not None and value[:1] == "<":
+                    elem = etree.Element(name)
+                    elem.append(etree.fromstring(value))
+                    parameters[name] = elem
                 else:
-                    parameter_elem = etree.SubElement(parameters_elem, param)
-
-                    if getattr(operator, param) is not None:
-                        if getattr(operator, param)[0] != "<":
-                            parameter_elem.text = getattr(operator, param)
-                        else:
-                            parameter_elem.append(etree.fromstring(getattr(operator, param)))
-
-        node_elem.attrib["id"] = node_id
+                    parameters[name] = value
+
+            else:
+                if kind == _OPTIONAL_COMPLEX and not value:
+                    continue
+
+                if isinstance(value, _CONFIG_TYPES):
+                    elem = value.to_xml()
+                elif isinstance(value, str):
+                    elem = etree.fromstring(value)
+                elif value is None:
+                    raise ValueError(f"Parameter {name} is mandatory for {operator.operator}")
+                else:
+                    continue
+                parameters[elem.tag] = elem
 
-        operator_elem.text = operator.operator
+        return parameters
 
     def save_graph(self, filename):
         """This method saves the SNAP Graph
@@ -328,4 +804,4 @@ class Graph:
 
         with open(filename, "w") as file:
             file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-            file.write(unescape(etree.tostring(self.root, pretty_print=True).decode()))
+            file.write(unescape(self.tostring().decode()))
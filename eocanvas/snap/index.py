@@ -0,0 +1,142 @@
+"""A compact index of the SNAP operators, loaded lazily.
+
+The index is a precompiled version of `operators.json`: a small header, holding the
+SHA-256 digest of the JSON file and mapping each operator name to the offset and length
+of its description, followed by the descriptions as compact JSON. Opening it only reads
+the header, and each operator is read and decoded the first time it is used. JSON keeps
+the index readable by every supported Python version, unlike :mod:`marshal`.
+
+The index must be regenerated whenever `operators.json` changes, with:
+
+    python eocanvas/snap/index.py
+
+and `python eocanvas/snap/index.py --check` fails if it is out of date, as checked by CI.
+An index out of date is not used: the operators are read from the JSON file instead.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional
+
+MAGIC = b"EOCIDX3\n"
+_HEADER_SIZE = struct.Struct("<I")
+
+DIRNAME = os.path.dirname(os.path.abspath(__file__))
+JSON_FILENAME = os.path.join(DIRNAME, "operators.json")
+INDEX_FILENAME = os.path.join(DIRNAME, "operators.idx")
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _digest(source: str) -> str:
+    with open(source, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_index(source: str = JSON_FILENAME, target: str = INDEX_FILENAME) -> None:
+    """Compiles the operators JSON file to an index file."""
+    with open(source) as f:
+        operators = json.load(f)
+
+    blobs = []
+    offsets = {}
+    position = 0
+    for name, operator in operators.items():
+        blob = _dumps(operator)
+        offsets[name] = (position, len(blob))
+        blobs.append(blob)
+        position += len(blob)
+
+    header = _dumps({"source": _digest(source), "operators": offsets})
+    with open(target, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_SIZE.pack(len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+
+
+class OperatorIndex(Mapping):
+    """A read-only mapping of the operator names to their descriptions.
+
+    The file is only kept open while reading the header or a description.
+
+    Args:
+        filename: The index file
+        source: The JSON file the index must have been built from, if it is to be checked
+
+    Raises:
+        ValueError: if the file is not a valid index, or was built from another version
+            of `source`.
+    """
+
+    def __init__(self, filename: str = INDEX_FILENAME, source: Optional[str] = None):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{filename} is not an operators index")
+            try:
+                (size,) = _HEADER_SIZE.unpack(f.read(_HEADER_SIZE.size))
+                header = json.loads(f.read(size))
+            except (struct.error, ValueError) as exc:
+                raise ValueError(f"{filename} is not a valid operators index: {exc}")
+        if not isinstance(header, dict) or not isinstance(header.get("operators"), dict):
+            raise ValueError(f"{filename} is not a valid operators index")
+        if source is not None and header.get("source") != _digest(source):
+            raise ValueError(f"{filename} is out of date with {source}")
+        self._offsets: Dict[str, Any] = header["operators"]
+        self._start = len(MAGIC) + _HEADER_SIZE.size + size
+        self._operators: Dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        operator = self._operators.get(name)
+        if operator is None:
+            offset, length = self._offsets[name]
+            with open(self.filename, "rb") as f:
+                f.seek(self._start + offset)
+                operator = json.loads(f.read(length))
+            self._operators[name] = operator
+        return operator
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._offsets
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+
+def is_current(source: str = JSON_FILENAME, target: str = INDEX_FILENAME) -> bool:
+    """Returns whether the index file was built from the current operators JSON file."""
+    try:
+        OperatorIndex(target, source)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Builds the index of the SNAP operators.")
+    parser.add_argument(
+        "--check", action="store_true", help="only check that the index is up to date"
+    )
+    args = parser.parse_args(argv)
+    if not args.check:
+        build_index()
+    elif not is_current():
+        print(f"{INDEX_FILENAME} is out of date, run python {__file__}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,854 @@
+"""Local execution of simple SNAP Graphs with NumPy.
+
+For small inputs, submitting a job, waiting for it and downloading its results takes
+much longer than the processing itself. The :class:`LocalExecutor` runs the graphs made
+only of the operators below on the local machine instead:
+
+- Read, of NetCDF files with xarray and of GeoTIFF files with rasterio
+- Subset, by pixel or geographic region, with sub-sampling
+- BandMaths, with :mod:`eocanvas.snap.evaluator`
+- Resample, to the size of a reference band or to a given size, with nearest neighbour
+  upsampling and first or mean downsampling
+- Write, to NetCDF with h5netcdf or GeoTIFF with rasterio
+
+The bands are computed lazily, window by window: the rows of the output are processed in
+blocks of `block_rows`, and only the matching windows of the inputs are read.
+
+:func:`dispatch` runs a :class:`eocanvas.processes.SnapProcess` locally when it can,
+otherwise remotely. NumPy is required, along with xarray for NetCDF and rasterio for
+GeoTIFF: install them with `pip install eocanvas[local]`.
+
+Example:
+    >>> paths = dispatch(SnapProcess(snap_graph=graph, eo_input=inputs), download_dir="out")
+"""
+
+import math
+import os
+import re
+import tempfile
+from collections import namedtuple
+from collections.abc import Mapping
+from importlib.util import find_spec
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # pragma: no cover
+    raise ModuleNotFoundError(
+        "The local execution of graphs requires NumPy: pip install eocanvas[local]"
+    ) from None
+
+import requests
+
+from eocanvas.exceptions import UnsupportedGraphError
+from eocanvas.http import get_session
+from eocanvas.logging import logger
+
+from .evaluator import DTYPES, _band_key, compile_numpy, evaluate_target_band
+from .target_band import TargetBand
+
+# Inputs larger than this, in bytes, are processed remotely
+MAX_INPUT_SIZE = 100 * 1024 * 1024
+BLOCK_ROWS = 256
+# The timeout of the requests to the input URLs, in seconds
+TIMEOUT = 30
+
+# The parameters each operator supports locally, along with the ignored ones
+SUPPORTED_PARAMETERS = {
+    "Read": {"file", "formatName", "sourceBands", "bandNames", "copyMetadata"},
+    "Subset": {
+        "region",
+        "geoRegion",
+        "sourceBands",
+        "sourceBandNames",
+        "bandNames",
+        "subSamplingX",
+        "subSamplingY",
+        "referenceBand",
+        "copyMetadata",
+        "fullSwath",
+    },
+    "BandMaths": {"targetBands", "targetBandDescriptors"},
+    "Resample": {
+        "referenceBand",
+        "referenceBandName",
+        "targetWidth",
+        "targetHeight",
+        "upsampling",
+        "upsamplingMethod",
+        "downsampling",
+        "downsamplingMethod",
+        "flagDownsampling",
+        "flagDownsamplingMethod",
+        "resampleOnPyramidLevels",
+    },
+    "Write": {
+        "file",
+        "formatName",
+        "deleteOutputOnFailure",
+        "writeEntireTileRows",
+        "clearCacheAfterRowWrite",
+    },
+}
+_IGNORED_PARAMETERS = {"useAdvancedOptions"}
+
+_NETCDF = "NetCDF"
+_GEOTIFF = "GeoTIFF"
+_EXTENSIONS = {".nc": _NETCDF, ".nc4": _NETCDF, ".tif": _GEOTIFF, ".tiff": _GEOTIFF}
+_MODULES = {_NETCDF: "xarray", _GEOTIFF: "rasterio"}
+_WRITER_MODULES = {_NETCDF: "h5netcdf", _GEOTIFF: "rasterio"}
+_UPSAMPLING = {"Nearest"}
+_DOWNSAMPLING = {"First", "Mean"}
+
+_PLACEHOLDER = re.compile(r"^\$\{?([A-Za-z_][A-Za-z0-9_]*)\}?$")
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+# Rounding errors allowed when converting a geographic region to pixels
+_EPSILON = 1e-6
+
+Geocoding = namedtuple("Geocoding", ["x0", "dx", "y0", "dy", "crs", "geographic"])
+Geocoding.__doc__ = """The position of a regular grid: its upper left corner and pixel size."""
+
+
+class Band:
+    """A band computed or read window by window.
+
+    Attributes:
+        name: The band name
+        shape: The number of rows and columns
+        dtype: The NumPy data type
+        no_data: The no-data value, or None
+    """
+
+    __slots__ = ("name", "shape", "dtype", "no_data", "_read")
+
+    def __init__(self, name, shape, dtype, read: Callable, no_data=None):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.no_data = no_data
+        self._read = read
+
+    def __repr__(self):
+        return "Band(name='{}', shape={}, dtype={})".format(self.name, self.shape, self.dtype)
+
+    def read(self, rows: Tuple[int, int], cols: Tuple[int, int]) -> "np.ndarray":
+        """Returns the window of the band between the `(start, stop)` rows and columns."""
+        return self._read(rows, cols)
+
+
+class Product:
+    """The bands produced by a node, along with their geocoding.
+
+    Attributes:
+        bands: The bands, by name
+        geocoding: The :class:`Geocoding` of the bands of the largest size, or None
+    """
+
+    def __init__(self, bands: Dict[str, Band], geocoding: Optional[Geocoding] = None):
+        self.bands = bands
+        self.geocoding = geocoding
+
+    def __repr__(self):
+        return "Product(bands={})".format(list(self.bands))
+
+    @property
+    def shape(self):
+        """The largest band size."""
+        return max((band.shape for band in self.bands.values()), default=(0, 0))
+
+    def select(self, names):
+        """Returns the product restricted to the given bands, if any."""
+        if not names:
+            return self
+        missing = [name for name in names if name not in self.bands]
+        if missing:
+            raise UnsupportedGraphError(f"Missing bands {', '.join(missing)}")
+        return Product({name: self.bands[name] for name in names}, self.geocoding)
+
+
+class _Window(Mapping):
+    """The windows of the bands of a product, read on first access."""
+
+    def __init__(self, bands, rows, cols):
+        self._bands = bands
+        self._rows = rows
+        self._cols = cols
+        self._arrays = {}
+
+    def __getitem__(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = self._bands[name].read(self._rows, self._cols)
+        return self._arrays[name]
+
+    def __iter__(self):
+        return iter(self._bands)
+
+    def __len__(self):
+        return len(self._bands)
+
+
+def _names(value):
+    """Splits a comma separated list of names."""
+    if not value:
+        return []
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def _format(name):
+    """Returns the local format matching a SNAP format name or a file name, or None."""
+    if not name:
+        return None
+    if name.startswith(_NETCDF):
+        return _NETCDF
+    if name.startswith(_GEOTIFF):
+        return _GEOTIFF
+    return _EXTENSIONS.get(os.path.splitext(name)[1].lower())
+
+
+def _window(start, stop, step=1):
+    """Returns the source indexes of a window of a sub-sampled band."""
+    return start * step, (stop - 1) * step + 1
+
+
+def _nearest(start, stop, source, target, first=False):
+    """Returns the source indexes of the nearest, or first, pixels of a target window."""
+    positions = np.arange(start, stop) + (0.0 if first else 0.5)
+    return np.minimum((positions * source / target).astype(np.int64), source - 1)
+
+
+# -----------------------------------------------------
+# Readers
+# -----------------------------------------------------
+
+
+def _read_netcdf(path, resources):
+    import xarray as xr
+
+    dataset = xr.open_dataset(path, mask_and_scale=True, cache=False)
+    resources.append(dataset)
+    bands = {}
+    for name, variable in dataset.data_vars.items():
+        # Bands are the last two dimensions; the leading ones, such as time, are of size one
+        if variable.ndim < 2 or any(size != 1 for size in variable.shape[:-2]):
+            continue
+        leading = (0,) * (variable.ndim - 2)
+
+        def read(rows, cols, variable=variable, leading=leading):
+            return np.asarray(variable[leading + (slice(*rows), slice(*cols))].values)
+
+        bands[name] = Band(name, variable.shape[-2:], variable.dtype, read)
+
+    return Product(bands, _netcdf_geocoding(dataset))
+
+
+def _netcdf_geocoding(dataset):
+    """Returns the geocoding of regular 1D latitude and longitude coordinates, or None."""
+    coordinates = {name.lower(): dataset[name] for name in dataset.variables}
+    lon = coordinates.get("lon", coordinates.get("longitude"))
+    lat = coordinates.get("lat", coordinates.get("latitude"))
+    if lon is None or lat is None or lon.ndim != 1 or lat.ndim != 1:
+        return None
+    if len(lon) < 2 or len(lat) < 2:
+        return None
+    lon, lat = np.asarray(lon.values, dtype=np.float64), np.asarray(lat.values, dtype=np.float64)
+    dx, dy = np.diff(lon), np.diff(lat)
+    if not (np.allclose(dx, dx[0]) and np.allclose(dy, dy[0])):
+        return None
+    return Geocoding(lon[0] - dx[0] / 2, dx[0], lat[0] - dy[0] / 2, dy[0], "EPSG:4326", True)
+
+
+def _read_geotiff(path, resources):
+    import rasterio
+    from rasterio.windows import Window
+
+    dataset = rasterio.open(path)
+    resources.append(dataset)
+    bands = {}
+    for index in range(1, dataset.count + 1):
+        name = dataset.descriptions[index - 1] or f"band_{index}"
+
+        def read(rows, cols, index=index):
+            window = Window(cols[0], rows[0], cols[1] - cols[0], rows[1] - rows[0])
+            return dataset.read(index, window=window)
+
+        no_data = dataset.nodatavals[index - 1]
+        bands[name] = Band(name, dataset.shape, dataset.dtypes[index - 1], read, no_data=no_data)
+
+    geocoding = None
+    transform = dataset.transform
+    if transform.b == 0 and transform.d == 0:
+        crs = dataset.crs
+        geocoding = Geocoding(
+            transform.c,
+            transform.a,
+            transform.f,
+            transform.e,
+            crs.to_string() if crs else None,
+            bool(crs and crs.is_geographic),
+        )
+    return Product(bands, geocoding)
+
+
+_READERS = {_NETCDF: _read_netcdf, _GEOTIFF: _read_geotiff}
+
+
+# -----------------------------------------------------
+# Operators
+# -----------------------------------------------------
+
+
+def _parse_region(value):
+    """Parses a pixel region, `x,y,width,height`."""
+    numbers = [int(float(n)) for n in _NUMBER.findall(value or "")]
+    if len(numbers) != 4:
+        raise UnsupportedGraphError(f"Invalid region {value!r}")
+    return numbers
+
+
+def _geo_region(value, geocoding, shape):
+    """Returns the pixel region of the bounding box of a WKT geometry."""
+    if geocoding is None or not geocoding.geographic:
+        raise UnsupportedGraphError("geoRegion requires a product on a regular lat/lon grid")
+    numbers = [float(n) for n in _NUMBER.findall(value)]
+    if len(numbers) < 2 or len(numbers) % 2:
+        raise UnsupportedGraphError(f"Invalid geoRegion {value!r}")
+    lons, lats = numbers[0::2], numbers[1::2]
+
+    columns = [(lon - geocoding.x0) / geocoding.dx for lon in (min(lons), max(lons))]
+    rows = [(lat - geocoding.y0) / geocoding.dy for lat in (min(lats), max(lats))]
+    x0 = max(int(math.floor(min(columns) + _EPSILON)), 0)
+    x1 = min(int(math.ceil(max(columns) - _EPSILON)), shape[1])
+    y0 = max(int(math.floor(min(rows) + _EPSILON)), 0)
+    y1 = min(int(math.ceil(max(rows) - _EPSILON)), shape[0])
+    if x1 <= x0 or y1 <= y0:
+        raise UnsupportedGraphError(f"geoRegion {value!r} does not intersect the product")
+    return [x0, y0, x1 - x0, y1 - y0]
+
+
+def _subset(node, sources):
+    product = _single(node, sources)
+    parameters = node.parameters
+    product = product.select(
+        _names(
+            parameters.get("sourceBands")
+            or parameters.get("sourceBandNames")
+            or parameters.get("bandNames")
+        )
+    )
+    shapes = {band.shape for band in product.bands.values()}
+    if len(shapes) > 1:
+        raise UnsupportedGraphError(f"{node.id}: Subset of bands of different sizes")
+    shape = product.shape
+
+    if parameters.get("geoRegion"):
+        x, y, width, height = _geo_region(parameters["geoRegion"], product.geocoding, shape)
+    elif parameters.get("region"):
+        x, y, width, height = _parse_region(parameters["region"])
+        if width <= 0 or height <= 0:
+            x, y, width, height = 0, 0, shape[1], shape[0]
+        width, height = min(width, shape[1] - x), min(height, shape[0] - y)
+    else:
+        x, y, width, height = 0, 0, shape[1], shape[0]
+    step_x = int(parameters.get("subSamplingX") or 1)
+    step_y = int(parameters.get("subSamplingY") or 1)
+    target = (-(-height // step_y), -(-width // step_x))
+
+    bands = {}
+    for name, band in product.bands.items():
+
+        def read(rows, cols, band=band):
+            start_row, stop_row = _window(*rows, step_y)
+            start_col, stop_col = _window(*cols, step_x)
+            data = band.read((y + start_row, y + stop_row), (x + start_col, x + stop_col))
+            return data[::step_y, ::step_x]
+
+        bands[name] = Band(name, target, band.dtype, read, band.no_data)
+
+    geocoding = product.geocoding
+    if geocoding is not None:
+        geocoding = geocoding._replace(
+            x0=geocoding.x0 + x * geocoding.dx,
+            y0=geocoding.y0 + y * geocoding.dy,
+            dx=geocoding.dx * step_x,
+            dy=geocoding.dy * step_y,
+        )
+    return Product(bands, geocoding)
+
+
+def _target_bands(node):
+    target_bands = node.parameters.get("targetBands")
+    if target_bands is None:
+        target_bands = node.parameters.get("targetBandDescriptors")
+    if target_bands is None or isinstance(target_bands, str):
+        raise UnsupportedGraphError(f"{node.id}: BandMaths without target bands")
+
+    for elem in target_bands.iter("targetBand"):
+        fields = {child.tag: child.text for child in elem if isinstance(child.tag, str)}
+        no_data = fields.get("noDataValue", fields.get("no_data_value"))
+        yield TargetBand(
+            fields.get("name"),
+            fields.get("expression") or "",
+            fields.get("type") or "float32",
+            no_data_value=no_data if no_data is not None else "NaN",
+        )
+
+
+def _band_maths(node, sources):
+    source_bands = {}
+    geocoding = None
+    for product in sources:
+        source_bands = {**product.bands, **source_bands}
+        geocoding = geocoding or product.geocoding
+    for index, product in enumerate(sources):
+        source_bands.update({f"${index + 1}.{name}": band for name, band in product.bands.items()})
+    no_data = {
+        name: band.no_data for name, band in source_bands.items() if band.no_data is not None
+    }
+    default_shape = max((band.shape for band in source_bands.values()), default=(0, 0))
+
+    bands = {}
+    for target_band in _target_bands(node):
+        compiled = compile_numpy(target_band.expression)
+        dtype = DTYPES.get(target_band.type)
+        if dtype is None:
+            raise UnsupportedGraphError(f"{node.id}: unsupported type {target_band.type}")
+        shapes = set()
+        for name in compiled.names:
+            key = _band_key(name, source_bands)
+            if key is None:
+                raise UnsupportedGraphError(f"{node.id}: unknown band {name}")
+            shapes.add(source_bands[key].shape)
+        if len(shapes) > 1:
+            raise UnsupportedGraphError(
+                f"{node.id}: {target_band.name} uses bands of different sizes"
+            )
+        shape = shapes.pop() if shapes else default_shape
+
+        def read(rows, cols, target_band=target_band):
+            window = _Window(source_bands, rows, cols)
+            return evaluate_target_band(target_band, window, no_data, (rows[0], cols[0]))
+
+        no_data_value = target_band.no_data_value
+        bands[target_band.name] = Band(
+            target_band.name,
+            shape,
+            dtype,
+            read,
+            float(no_data_value) if no_data_value not in (None, "NaN") else None,
+        )
+    return Product(bands, geocoding)
+
+
+def _resample(node, sources):
+    product = _single(node, sources)
+    parameters = node.parameters
+    reference = parameters.get("referenceBand") or parameters.get("referenceBandName")
+    if reference:
+        if reference not in product.bands:
+            raise UnsupportedGraphError(f"{node.id}: unknown reference band {reference}")
+        shape = product.bands[reference].shape
+    elif parameters.get("targetWidth") and parameters.get("targetHeight"):
+        shape = (int(parameters["targetHeight"]), int(parameters["targetWidth"]))
+    else:
+        raise UnsupportedGraphError(f"{node.id}: Resample requires a reference band or size")
+    downsampling = parameters.get("downsampling") or parameters.get("downsamplingMethod")
+
+    bands = {}
+    for name, band in product.bands.items():
+        if band.shape == shape:
+            bands[name] = band
+            continue
+        if downsampling == "Mean" and all(s >= t for s, t in zip(band.shape, shape)):
+            if any(s % t for s, t in zip(band.shape, shape)):
+                raise UnsupportedGraphError(f"{node.id}: Mean downsampling by a fractional factor")
+            bands[name] = Band(name, shape, np.float64, _mean_reader(band, shape))
+        else:
+            read = _nearest_reader(band, shape, first=downsampling != "Mean")
+            bands[name] = Band(name, shape, band.dtype, read, band.no_data)
+
+    geocoding = product.geocoding
+    if geocoding is not None:
+        source = product.shape
+        geocoding = geocoding._replace(
+            dx=geocoding.dx * source[1] / shape[1], dy=geocoding.dy * source[0] / shape[0]
+        )
+    return Product(bands, geocoding)
+
+
+def _nearest_reader(band, shape, first):
+    def read(rows, cols):
+        row_indexes = _nearest(*rows, band.shape[0], shape[0], first and band.shape[0] > shape[0])
+        col_indexes = _nearest(*cols, band.shape[1], shape[1], first and band.shape[1] > shape[1])
+        start_row, start_col = row_indexes[0], col_indexes[0]
+        data = band.read((start_row, row_indexes[-1] + 1), (start_col, col_indexes[-1] + 1))
+        return data[np.ix_(row_indexes - start_row, col_indexes - start_col)]
+
+    return read
+
+
+def _mean_reader(band, shape):
+    factor_y, factor_x = band.shape[0] // shape[0], band.shape[1] // shape[1]
+
+    def read(rows, cols):
+        data = band.read(
+            (rows[0] * factor_y, rows[1] * factor_y), (cols[0] * factor_x, cols[1] * factor_x)
+        ).astype(np.float64)
+        if band.no_data is not None:
+            data[data == band.no_data] = np.nan
+        blocks = data.reshape(rows[1] - rows[0], factor_y, cols[1] - cols[0], factor_x)
+        with np.errstate(invalid="ignore"):
+            return np.nanmean(blocks, axis=(1, 3))
+
+    return read
+
+
+def _single(node, sources):
+    if len(sources) != 1:
+        raise UnsupportedGraphError(f"{node.id}: {node.operator} requires a single source")
+    return sources[0]
+
+
+_OPERATORS = {"Subset": _subset, "BandMaths": _band_maths, "Resample": _resample}
+
+
+# -----------------------------------------------------
+# Writers
+# -----------------------------------------------------
+
+
+def _blocks(shape, block_rows):
+    for start in range(0, shape[0], block_rows):
+        yield start, min(start + block_rows, shape[0])
+
+
+def _write_netcdf(product, path, block_rows):
+    import h5netcdf
+
+    geocoding = product.geocoding
+    geographic = geocoding is not None and geocoding.geographic
+    with h5netcdf.File(path, "w") as dataset:
+        for name, band in product.bands.items():
+            dims = ("y", "x") if band.shape == product.shape else (f"y_{name}", f"x_{name}")
+            for dim, size in zip(dims, band.shape):
+                if dim not in dataset.dimensions:
+                    dataset.dimensions[dim] = size
+            dtype = np.dtype(np.uint8) if band.dtype == np.bool_ else np.dtype(band.dtype)
+            fill = {} if band.no_data is None else {"fillvalue": dtype.type(band.no_data)}
+            variable = dataset.create_variable(name, dims, dtype, **fill)
+            if geographic and dims == ("y", "x"):
+                variable.attrs["coordinates"] = "lat lon"
+            for rows in _blocks(band.shape, block_rows):
+                variable[slice(*rows), :] = band.read(rows, (0, band.shape[1])).astype(dtype)
+
+        if geographic:
+            rows, columns = product.shape
+            for dim, size in (("y", rows), ("x", columns)):
+                if dim not in dataset.dimensions:
+                    dataset.dimensions[dim] = size
+            lat = dataset.create_variable("lat", ("y",), np.float64)
+            lat[:] = geocoding.y0 + (np.arange(rows) + 0.5) * geocoding.dy
+            lat.attrs["units"] = "degrees_north"
+            lon = dataset.create_variable("lon", ("x",), np.float64)
+            lon[:] = geocoding.x0 + (np.arange(columns) + 0.5) * geocoding.dx
+            lon.attrs["units"] = "degrees_east"
+
+
+def _write_geotiff(product, path, block_rows):
+    import rasterio
+    from rasterio.transform import Affine
+    from rasterio.windows import Window
+
+    bands = list(product.bands.values())
+    if len({band.shape for band in bands}) > 1:
+        raise UnsupportedGraphError("GeoTIFF output of bands of different sizes")
+    rows, columns = product.shape
+    dtype = np.result_type(*[band.dtype for band in bands])
+    if dtype == np.bool_:
+        dtype = np.dtype(np.uint8)
+    no_data = {band.no_data for band in bands}
+    profile = {
+        "driver": "GTiff",
+        "height": rows,
+        "width": columns,
+        "count": len(bands),
+        "dtype": dtype.name,
+    }
+    if len(no_data) == 1 and None not in no_data:
+        profile["nodata"] = no_data.pop()
+    geocoding = product.geocoding
+    if geocoding is not None:
+        profile["transform"] = Affine(geocoding.dx, 0, geocoding.x0, 0, geocoding.dy, geocoding.y0)
+        profile["crs"] = geocoding.crs
+
+    with rasterio.open(path, "w", **profile) as dataset:
+        for index, band in enumerate(bands, start=1):
+            dataset.set_band_description(index, band.name)
+            for block in _blocks(band.shape, block_rows):
+                data = band.read(block, (0, columns)).astype(dtype)
+                window = Window(0, block[0], columns, block[1] - block[0])
+                dataset.write(data, index, window=window)
+
+
+_WRITERS = {_NETCDF: (_write_netcdf, ".nc"), _GEOTIFF: (_write_geotiff, ".tif")}
+
+
+# -----------------------------------------------------
+# Executor
+# -----------------------------------------------------
+
+
+class LocalExecutor:
+    """Runs SNAP processes made of simple operators on the local machine.
+
+    Attributes:
+        max_input_size: The largest total size of the inputs, in bytes
+        block_rows: How many rows of the outputs are computed at once
+    """
+
+    def __init__(self, max_input_size: int = MAX_INPUT_SIZE, block_rows: int = BLOCK_ROWS):
+        self.max_input_size = max_input_size
+        self.block_rows = block_rows
+
+    def check(self, process) -> List[str]:
+        """Returns the reasons why a process cannot run locally, if any.
+
+        Args:
+            process: A :class:`eocanvas.processes.SnapProcess`.
+        """
+        return self._check(process)[0]
+
+    def _check(self, process) -> Tuple[List[str], Dict[str, Tuple[str, int]]]:
+        """Returns the reasons why a process cannot run locally, and the Read inputs.
+
+        The inputs are the `(location, size)` of each Read node. Locating a remote input
+        costs a request, so they are located once and passed on to :meth:`_run`.
+        """
+        graph = _graph(process)
+        reasons = []
+        writes = 0
+        for node in graph.nodes.values():
+            supported = SUPPORTED_PARAMETERS.get(node.operator)
+            if supported is None:
+                reasons.append(f"{node.id}: unsupported operator {node.operator}")
+                continue
+            for name, value in node.parameters.items():
+                if name in supported or name in _IGNORED_PARAMETERS:
+                    continue
+                if value is not None and not (isinstance(value, str) and not value.strip()):
+                    reasons.append(f"{node.id}: unsupported parameter {name}")
+            reasons.extend(_check_node(node))
+            writes += node.operator == "Write"
+        if not writes:
+            reasons.append("The graph has no Write node")
+        if reasons:
+            return reasons, {}
+
+        locations = {}
+        inputs = _inputs(process)
+        for node in graph.nodes.values():
+            if node.operator != "Read":
+                continue
+            location, reason = _locate(node, inputs)
+            if reason is not None:
+                reasons.append(reason)
+            else:
+                locations[node.id] = location
+        if sum(size for _, size in locations.values()) > self.max_input_size:
+            reasons.append(f"The inputs are larger than {self.max_input_size} bytes")
+        return reasons, locations
+
+    def run(self, process, download_dir: Optional[str] = None) -> List[str]:
+        """Runs a process and writes its outputs.
+
+        The outputs are written to a temporary directory and only moved to `download_dir`
+        once all of them are complete, so a failed run leaves no partial output behind.
+
+        Args:
+            process: A :class:`eocanvas.processes.SnapProcess`.
+            download_dir: Where to write the outputs. Defaults to ".".
+
+        Returns:
+            The list of the written file paths.
+
+        Raises:
+            UnsupportedGraphError: if the process cannot run locally.
+        """
+        reasons, locations = self._check(process)
+        if reasons:
+            raise UnsupportedGraphError("\n".join(reasons))
+        return self._run(process, locations, download_dir)
+
+    def _run(self, process, locations, download_dir: Optional[str]) -> List[str]:
+        download_dir = download_dir or "."
+        os.makedirs(download_dir, exist_ok=True)
+        graph = _graph(process)
+        products: Dict[str, Product] = {}
+        resources = []
+        paths = []
+
+        def evaluate(node_id):
+            if node_id not in products:
+                node = graph.nodes.get(node_id)
+                if node is None:
+                    raise UnsupportedGraphError(f"Unknown source node {node_id}")
+                sources = [evaluate(source_id) for source_id in node.source_ids]
+                if node.operator == "Read":
+                    product = _read(node, locations[node_id], resources, tmpdir)
+                elif node.operator == "Write":
+                    product = _single(node, sources)
+                    paths.append(self._write(node, product, outdir))
+                else:
+                    product = _OPERATORS[node.operator](node, sources)
+                products[node_id] = product
+            return products[node_id]
+
+        # The outputs are staged next to their destination, so that moving them is a rename
+        with tempfile.TemporaryDirectory() as tmpdir, tempfile.TemporaryDirectory(
+            prefix=".eocanvas-", dir=download_dir
+        ) as outdir:
+            try:
+                for node in graph.nodes.values():
+                    if node.operator == "Write":
+                        evaluate(node.id)
+            finally:
+                for resource in resources:
+                    resource.close()
+
+            written = []
+            for path in paths:
+                target = os.path.join(download_dir, os.path.basename(path))
+                if os.path.exists(path):
+                    os.replace(path, target)
+                written.append(target)
+        return written
+
+    def _write(self, node, product, download_dir):
+        file_format = _format(node.parameters.get("formatName"))
+        writer, extension = _WRITERS[file_format]
+        name = os.path.basename(_PLACEHOLDER.sub("", node.parameters.get("file") or "")) or node.id
+        if os.path.splitext(name)[1].lower() not in _EXTENSIONS:
+            name += extension
+        path = os.path.join(download_dir, name)
+        logger.info(f"Writing {path}")
+        writer(product, path, self.block_rows)
+        return path
+
+
+def _check_node(node):
+    parameters = node.parameters
+    if node.operator in ("Read", "Write"):
+        # SNAP writes BEAM-DIMAP by default
+        format_name = parameters.get("formatName")
+        if node.operator == "Write":
+            format_name = format_name or "BEAM-DIMAP"
+        if format_name and _format(format_name) is None:
+            yield f"{node.id}: unsupported format {format_name}"
+        file_format = _format(format_name)
+        modules = _MODULES if node.operator == "Read" else _WRITER_MODULES
+        if file_format is not None and find_spec(modules[file_format]) is None:
+            yield f"{node.id}: {file_format} requires {modules[file_format]}"
+    elif node.operator == "BandMaths":
+        variables = parameters.get("variables")
+        if variables is not None and not isinstance(variables, str) and len(variables):
+            yield f"{node.id}: unsupported BandMaths variables"
+    elif node.operator == "Resample":
+        for names, methods in (
+            (("upsampling", "upsamplingMethod"), _UPSAMPLING),
+            (("downsampling", "downsamplingMethod"), _DOWNSAMPLING),
+        ):
+            for name in names:
+                if parameters.get(name) and parameters[name] not in methods:
+                    yield f"{node.id}: unsupported {name} {parameters[name]}"
+
+
+def _graph(process):
+    graph = process.snap_graph
+    return graph.to_graph() if hasattr(graph, "to_graph") else graph
+
+
+def _inputs(process):
+    return {i.key: i for i in process.eo_input}
+
+
+def _locate(node, inputs):
+    """Returns the `(location, size)` of the file read by a node, or the reason why not."""
+    value = (node.parameters.get("file") or "").strip()
+    match = _PLACEHOLDER.match(value)
+    if match:
+        eo_input = inputs.get(match.group(1))
+        if eo_input is None:
+            return None, f"{node.id}: no input for {value}"
+        if eo_input.keystore is not None:
+            return None, f"{node.id}: input {eo_input.key} uses a keystore"
+        value = eo_input.url
+
+    parsed = urlparse(value)
+    location = unquote(parsed.path) if parsed.scheme == "file" else value
+    file_format = _format(node.parameters.get("formatName")) or _format(parsed.path)
+    if file_format is None:
+        return None, f"{node.id}: unsupported file {value}"
+    if find_spec(_MODULES[file_format]) is None:
+        return None, f"{node.id}: {file_format} requires {_MODULES[file_format]}"
+
+    if parsed.scheme in ("http", "https"):
+        try:
+            response = get_session().head(value, allow_redirects=True, timeout=TIMEOUT)
+        except requests.exceptions.RequestException as exc:
+            return None, f"{node.id}: cannot reach {value}: {exc}"
+        size = response.headers.get("Content-Length")
+        if not response.ok or size is None:
+            return None, f"{node.id}: unknown size of {value}"
+        return (location, int(size)), None
+    if not os.path.isfile(location):
+        return None, f"{node.id}: {value} is not a local file"
+    return (location, os.path.getsize(location)), None
+
+
+def _read(node, location, resources, tmpdir):
+    """Reads the `(location, size)` found by :func:`_locate`."""
+    location, _ = location
+    file_format = _format(node.parameters.get("formatName")) or _format(urlparse(location).path)
+
+    if urlparse(location).scheme in ("http", "https"):
+        path = os.path.join(tmpdir, f"{node.id}{os.path.splitext(urlparse(location).path)[1]}")
+        logger.info(f"Downloading {location}")
+        response = get_session().get(location, stream=True, timeout=TIMEOUT)
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                f.write(chunk)
+        location = path
+
+    product = _READERS[file_format](location, resources)
+    return product.select(
+        _names(node.parameters.get("sourceBands") or node.parameters.get("bandNames"))
+    )
+
+
+def dispatch(
+    process,
+    download_dir: Optional[str] = None,
+    executor: Optional[LocalExecutor] = None,
+    force: bool = False,
+) -> List[str]:
+    """Runs a process locally if it can, otherwise submits it.
+
+    Args:
+        process: A :class:`eocanvas.processes.SnapProcess`.
+        download_dir: Where to write or download the results. Defaults to ".".
+        executor: The :class:`LocalExecutor`, defining the size threshold.
+        force: Skip the submission ledger and the cache lookup of remote runs.
+
+    Returns:
+        The list of the result file paths.
+    """
+    executor = executor or LocalExecutor()
+    reasons, locations = executor._check(process)
+    if not reasons:
+        try:
+            return executor._run(process, locations, download_dir)
+        except UnsupportedGraphError as e:
+            reasons = [str(e)]
+    logger.info(f"Running remotely: {reasons[0]}")
+    return process.run(download_dir=download_dir, force=force)
@@ -0,0 +1,130 @@
+"""In-memory representation of the SNAP Graph nodes.
+
+The nodes are the source of truth of a :class:`eocanvas.snap.graph.Graph`:
+the XML document is produced from them only when needed.
+"""
+
+from collections import namedtuple
+from copy import deepcopy
+
+import lxml.etree as etree
+
+PARAMETERS_CLASS = "com.bc.ceres.binding.dom.XppDomElement"
+
+Source = namedtuple("Source", ["name", "refid", "text"])
+Source.__doc__ = """A node source, such as `<sourceProduct refid="Read"/>`."""
+
+
+class Node:
+    """A node of a SNAP Graph.
+
+    Attributes:
+        id: The node identifier
+        operator: The SNAP operator name
+        sources: A list of :class:`Source`
+        parameters: The parameters, in document order, keyed by XML tag. Values are either
+            strings, None for empty parameters, or lxml elements for structured parameters
+            such as `targetBands` or `aggregators`
+        parameters_attrib: The attributes of the `parameters` element
+    """
+
+    __slots__ = ("id", "operator", "sources", "parameters", "parameters_attrib")
+
+    def __init__(self, id, operator, sources=None, parameters=None, parameters_attrib=None):
+        self.id = id
+        self.operator = operator
+        self.sources = sources if sources is not None else []
+        self.parameters = parameters if parameters is not None else {}
+        self.parameters_attrib = (
+            parameters_attrib if parameters_attrib is not None else {"class": PARAMETERS_CLASS}
+        )
+
+    def __repr__(self):
+        return "Node(id='{}', operator='{}', sources={})".format(
+            self.id, self.operator, self.source_ids
+        )
+
+    @property
+    def source_ids(self):
+        """The identifiers of the source nodes."""
+        return [source.refid or source.text for source in self.sources]
+
+    def copy(self):
+        return Node(
+            self.id,
+            self.operator,
+            list(self.sources),
+            {
+                name: deepcopy(value) if isinstance(value, etree._Element) else value
+                for name, value in self.parameters.items()
+            },
+            dict(self.parameters_attrib),
+        )
+
+    @classmethod
+    def from_element(cls, elem):
+        """Creates a node from its `<node>` XML element."""
+        node = cls(elem.attrib.get("id"), None, parameters_attrib={})
+
+        for child in elem:
+            if child.tag == "operator":
+                node.operator = (child.text or "").strip()
+
+            elif child.tag == "sources":
+                for source in child:
+                    if isinstance(source.tag, str):
+                        text = source.text.strip() if source.text else None
+                        node.sources.append(Source(source.tag, source.attrib.get("refid"), text))
+
+            elif child.tag == "parameters":
+                node.parameters_attrib = dict(child.attrib)
+                for param in child:
+                    if not isinstance(param.tag, str):
+                        continue
+                    if len(param) or param.attrib:
+                        value = deepcopy(param)
+                        value.tail = None
+                        node.parameters[param.tag] = value
+                    else:
+                        node.parameters[param.tag] = param.text
+
+        return node
+
+    def to_element(self):
+        """Builds the `<node>` XML element."""
+        elem = etree.Element("node", id=self.id)
+        etree.SubElement(elem, "operator").text = self.operator
+
+        sources_elem = etree.SubElement(elem, "sources")
+        for source in self.sources:
+            source_elem = etree.SubElement(sources_elem, source.name)
+            if source.refid is not None:
+                source_elem.attrib["refid"] = source.refid
+            if source.text is not None:
+                source_elem.text = source.text
+
+        parameters_elem = etree.SubElement(elem, "parameters", self.parameters_attrib)
+        for name, value in self.parameters.items():
+            if isinstance(value, etree._Element):
+                parameters_elem.append(deepcopy(value))
+            else:
+                etree.SubElement(parameters_elem, name).text = value
+
+        return elem
+
+    def write_xml(self, writer):
+        """Writes the `<node>` XML element with an :class:`eocanvas.snap.xmlwriter.XMLWriter`."""
+        with writer.element("node", {"id": self.id}):
+            writer.leaf("operator", self.operator)
+
+            with writer.element("sources"):
+                for source in self.sources:
+                    attrib = {"refid": source.refid} if source.refid is not None else None
+                    writer.leaf(source.name, source.text, attrib)
+
+            with writer.element("parameters", self.parameters_attrib):
+                for name, value in self.parameters.items():
+                    if isinstance(value, etree._Element):
+                        writer.write(value)
+                    else:
+                        writer.leaf(name, value)
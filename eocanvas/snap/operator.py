@@ -1,19 +1,71 @@
-from types import SimpleNamespace
-
 from eocanvas.exceptions import SnapOperatorNotFound
 
-from .operatorparams import OperatorParams
 from .snap import Snap
 
 
-class Operator(SimpleNamespace):
+class Operator:
+    """A SNAP operator with its parameters.
+
+    Parameters are read and set as attributes. The default values are a read-only table
+    shared by all the operators of the same name, and each operator only stores the
+    parameters it overrides.
+
+    Example:
+        subset = Operator("Subset", copyMetadata="true")
+        subset.region = "0,0,100,100"
+        other = subset.with_params(region="100,0,100,100")
+    """
+
+    __slots__ = ("operator", "_defaults", "_overrides")
+
     def __init__(self, operator, **kwargs):
-        self._snap_operators = Snap().operators
-        if operator not in self._snap_operators:
+        defaults = Snap().defaults
+        if operator not in defaults:
             raise SnapOperatorNotFound(f"Operator {operator} not recognized.")
         self.operator = operator
-        self._params = {**OperatorParams(self.operator).params, **kwargs}
-        super().__init__(**self._params)
+        self._defaults = defaults[operator]
+        self._overrides = kwargs
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self._overrides[name]
+        except KeyError:
+            pass
+        try:
+            return self._defaults[name]
+        except KeyError:
+            raise AttributeError(f"Operator {self.operator} has no parameter {name}")
+
+    def __setattr__(self, name, value):
+        if name in Operator.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            self._overrides[name] = value
+
+    def __delattr__(self, name):
+        try:
+            del self._overrides[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __dir__(self):
+        return [*object.__dir__(self), *self._defaults, *self._overrides]
+
+    def __eq__(self, other):
+        if not isinstance(other, Operator):
+            return NotImplemented
+        return self.operator == other.operator and self.to_dict() == other.to_dict()
+
+    def __getstate__(self):
+        return self.operator, dict(self._overrides)
+
+    def __setstate__(self, state):
+        operator, overrides = state
+        self.operator = operator
+        self._defaults = Snap().defaults[operator]
+        self._overrides = overrides
 
     def __str__(self):
         return "{}:\n\t{}".format(
@@ -28,7 +80,21 @@ class Operator(SimpleNamespace):
         )
 
     def to_dict(self):
-        return dict([(name, getattr(self, name)) for name in list(self._params.keys())])
+        return {**self._defaults, **self._overrides}
+
+    def with_params(self, **overrides):
+        """Returns a copy of the operator with some parameters changed.
+
+        The copy shares the default values, only its own parameters are copied.
+        """
+        operator = Operator.__new__(Operator)
+        operator.operator = self.operator
+        operator._defaults = self._defaults
+        operator._overrides = {**self._overrides, **overrides}
+        return operator
+
+    def copy(self):
+        return self.with_params()
 
     def describe(self):
         """This function prints the human readable information about a SNAP operator
@@ -42,7 +108,7 @@ class Operator(SimpleNamespace):
         Raises:
             None.
         """
-        operator = self._snap_operators[self.operator]
+        operator = Snap().operators[self.operator]
         print(f"Operator name: {operator['alias']}\n")
         print(f"Description: {operator['description']}")
         print(f"Authors: {operator['authors']}\n")
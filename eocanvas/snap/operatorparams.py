@@ -5,13 +5,9 @@ from .snap import Snap
 
 class OperatorParams:
     def __init__(self, operator):
-        self._snap_operators = Snap().operators
-        if operator not in self._snap_operators:
+        defaults = Snap().defaults
+        if operator not in defaults:
             raise SnapOperatorNotFound(f"Operator {operator} not recognized.")
 
         self.operator = operator
-        params = self._snap_operators[operator]["params"].keys()
-        self.params = {
-            param: self._snap_operators[operator]["params"][param].get("default_values")
-            for param in params
-        }
+        self.params = dict(defaults[operator])
@@ -0,0 +1,438 @@
+"""Optimization passes over the SNAP Graph.
+
+The passes rewrite the graph so that the remote SNAP execution produces smaller
+intermediate products, without changing the written outputs beyond the rounding of
+fused float32 bands:
+
+- nodes that no Write node depends on are removed,
+- Subset nodes only selecting bands or a geographic region are moved ahead of Resample
+  and Reproject nodes,
+- chained BandMaths nodes are merged into one, whose expressions are computed in double
+  precision without rounding the intermediate float32 bands,
+- the BandMaths and Binning expressions are simplified, see
+  :func:`eocanvas.snap.expression.fold`,
+- the bands read or selected by Read and Subset nodes are reduced to the ones the
+  graph uses, see :mod:`eocanvas.snap.bands`.
+
+Example:
+    optimized, report = optimize(graph)
+    print(report)
+"""
+
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from eocanvas.exceptions import InvalidExpressionError, InvalidGraphError
+
+from .bands import band_list, prune_band_list, required_bands
+from .expression import node_expressions, references, simplify, substitute
+from .graph import Graph
+from .node import Source
+from .snap import Snap
+
+_SINK_OPERATORS = {"Write"}
+# Operators working on all the pixels of their source
+_EXPENSIVE_OPERATORS = {"Resample", "Reproject"}
+# Subset parameters that give the same result before or after the expensive operators
+_BAND_PARAMETERS = {"bandNames", "sourceBands"}
+_PUSHABLE_PARAMETERS = _BAND_PARAMETERS | {
+    "geoRegion",
+    "tiePointGridNames",
+    "tiePointGrids",
+    "copyMetadata",
+}
+# Parameters fixing the output size, which must be computed on the whole source
+_SIZE_PARAMETERS = {"targetWidth", "targetHeight", "width", "height"}
+# Target band fields that BandMaths fusion preserves
+_FUSABLE_BAND_FIELDS = {
+    "name",
+    "type",
+    "expression",
+    "description",
+    "unit",
+    "noDataValue",
+    "no_data_value",
+}
+_FLOAT_TYPES = {"float32", "float64"}
+_NO_DATA_FIELDS = {"noDataValue", "no_data_value"}
+
+
+@dataclass
+class OptimizationReport:
+    """The changes made by :func:`optimize`.
+
+    Attributes:
+        removed: The identifiers of the nodes removed because no Write node uses them
+        pushed_down: The (Subset, operator) identifier pairs, where the Subset node has
+            been moved ahead of the operator
+        fused: The (removed, kept) identifier pairs of the merged BandMaths nodes
+        pruned_bands: The bands no longer read or selected, by node identifier
+        simplified: The (node identifier, expression, simplified expression) triples
+    """
+
+    removed: List[str] = field(default_factory=list)
+    pushed_down: List[Tuple[str, str]] = field(default_factory=list)
+    fused: List[Tuple[str, str]] = field(default_factory=list)
+    pruned_bands: Dict[str, List[str]] = field(default_factory=dict)
+    simplified: List[Tuple[str, str, str]] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(
+            self.removed or self.pushed_down or self.fused or self.pruned_bands or self.simplified
+        )
+
+    def __str__(self):
+        lines = [f"Removed {node_id}" for node_id in self.removed]
+        lines += [f"Moved {subset} ahead of {node_id}" for subset, node_id in self.pushed_down]
+        lines += [f"Merged {removed} into {kept}" for removed, kept in self.fused]
+        lines += [
+            f"Removed {len(bands)} bands from {node_id}: {', '.join(bands)}"
+            for node_id, bands in self.pruned_bands.items()
+        ]
+        lines += [
+            f"Simplified {before!r} to {after!r} in {node_id}"
+            for node_id, before, after in self.simplified
+        ]
+        return "\n".join(lines) or "No changes"
+
+
+def topological_sort(graph: Graph) -> List[str]:
+    """Returns the node identifiers, each one after all of its sources.
+
+    Nodes keep their relative order when possible.
+
+    Raises:
+        InvalidGraphError: if the graph has a cycle.
+    """
+    nodes = graph.nodes
+    pending = {
+        node_id: len([s for s in node.source_ids if s in nodes]) for node_id, node in nodes.items()
+    }
+    consumers = _consumers(graph)
+    ready = deque(node_id for node_id, count in pending.items() if count == 0)
+    order = []
+
+    while ready:
+        node_id = ready.popleft()
+        order.append(node_id)
+        for consumer in consumers[node_id]:
+            pending[consumer] -= 1
+            if pending[consumer] == 0:
+                ready.append(consumer)
+
+    if len(order) < len(nodes):
+        cyclic = [node_id for node_id in nodes if pending[node_id]]
+        raise InvalidGraphError([f"Cycle between nodes {', '.join(cyclic)}"])
+    return order
+
+
+def optimize(
+    graph: Graph,
+    prune: bool = True,
+    push_down: bool = True,
+    fuse: bool = True,
+    prune_bands: bool = True,
+    simplify: bool = True,
+) -> Tuple[Graph, OptimizationReport]:
+    """Optimizes a copy of the graph.
+
+    Args:
+        graph: The graph to optimize. It is not modified.
+        prune: Remove the nodes no Write node depends on.
+        push_down: Move the Subset nodes ahead of Resample and Reproject.
+        fuse: Merge chained BandMaths nodes.
+        prune_bands: Only read and select the bands the graph uses.
+        simplify: Simplify the BandMaths and Binning expressions.
+
+    Returns:
+        The optimized graph, with its nodes in topological order, and the report of the
+        changes.
+
+    Raises:
+        InvalidGraphError: if the graph has a cycle.
+    """
+    topological_sort(graph)
+    optimized = graph.copy()
+    report = OptimizationReport()
+
+    if prune:
+        prune_dead_nodes(optimized, report)
+    if push_down:
+        push_down_subsets(optimized, report)
+    if fuse:
+        fuse_band_maths(optimized, report)
+    if simplify:
+        simplify_expressions(optimized, report)
+    if prune_bands:
+        prune_unused_bands(optimized, report)
+
+    ordered = optimized.copy(nodes=False)
+    for node_id in topological_sort(optimized):
+        ordered.set_node(optimized.nodes[node_id])
+    return ordered, report
+
+
+def prune_dead_nodes(graph: Graph, report: OptimizationReport) -> None:
+    """Removes the nodes no Write node depends on. Graphs without Write are left as is."""
+    nodes = graph.nodes
+    pending = [node_id for node_id, node in nodes.items() if node.operator in _SINK_OPERATORS]
+    if not pending:
+        return
+
+    alive = set(pending)
+    while pending:
+        for source_id in nodes[pending.pop()].source_ids:
+            if source_id in nodes and source_id not in alive:
+                alive.add(source_id)
+                pending.append(source_id)
+
+    for node_id in [node_id for node_id in nodes if node_id not in alive]:
+        graph.remove_node(node_id)
+        report.removed.append(node_id)
+
+
+def push_down_subsets(graph: Graph, report: OptimizationReport) -> None:
+    """Moves the Subset nodes ahead of the Resample and Reproject nodes they follow.
+
+    A Subset is moved only if it selects bands or a geographic region, and if the
+    operator has no other consumer.
+    """
+    nodes = graph.nodes
+    changed = True
+    while changed:
+        changed = False
+        consumers = _consumers(graph)
+        for subset in list(nodes.values()):
+            if subset.operator != "Subset" or len(subset.sources) != 1:
+                continue
+            node = nodes.get(subset.source_ids[0])
+            if (
+                node is None
+                or node.operator not in _EXPENSIVE_OPERATORS
+                or len(node.sources) != 1
+                or consumers[node.id] != [subset.id]
+                or not _is_pushable(subset, node)
+            ):
+                continue
+
+            _swap(graph, subset, node)
+            report.pushed_down.append((subset.id, node.id))
+            changed = True
+            break
+
+    graph.invalidate()
+
+
+def _is_pushable(subset, node) -> bool:
+    """Returns whether a Subset gives the same result before and after the node."""
+    defaults = Snap().operators["Subset"]["params"]
+    selected = {}
+    for name, value in subset.parameters.items():
+        if not isinstance(value, (str, type(None))):
+            return False
+        if name in _PUSHABLE_PARAMETERS:
+            selected[name] = value
+        elif value and value != defaults.get(name, {}).get("default_values"):
+            return False
+
+    bands = [b.strip() for name in _BAND_PARAMETERS for b in (selected.get(name) or "").split(",")]
+    bands = [b for b in bands if b]
+    if not bands and not selected.get("geoRegion"):
+        return False
+
+    if bands:
+        if node.parameters.get("addDeltaBands") == "true":
+            return False
+        reference = node.parameters.get("referenceBandName")
+        if reference and reference not in bands:
+            return False
+
+    if selected.get("geoRegion") and any(node.parameters.get(p) for p in _SIZE_PARAMETERS):
+        return False
+
+    return True
+
+
+def _swap(graph: Graph, subset, node) -> None:
+    """Turns `source -> node -> subset -> consumers` into `source -> subset -> node -> ...`."""
+    node_source, subset_source = node.sources[0], subset.sources[0]
+    subset.sources = [Source(subset_source.name, node_source.refid, node_source.text)]
+    node.sources = [_reference(node_source, subset.id)]
+
+    for other in graph.nodes.values():
+        if other is not node:
+            other.sources = [
+                _reference(s, node.id) if subset.id in (s.refid, s.text) else s
+                for s in other.sources
+            ]
+
+
+def _reference(source: Source, node_id: str) -> Source:
+    """Returns the source pointing to another node, in the same form."""
+    if source.refid is not None:
+        return Source(source.name, node_id, None)
+    return Source(source.name, None, node_id)
+
+
+def fuse_band_maths(graph: Graph, report: OptimizationReport) -> None:
+    """Merges each BandMaths node into the BandMaths node consuming it.
+
+    The band references of the consumer expressions are replaced with the expressions of
+    the first node. Nodes using variables, product references, integer bands or no-data
+    values other than NaN are kept.
+
+    The merged expressions are computed in double precision: the values of float32
+    bands of the first node are no longer rounded to float32 before being used.
+    """
+    nodes = graph.nodes
+    changed = True
+    while changed:
+        changed = False
+        consumers = _consumers(graph)
+        for node in list(nodes.values()):
+            if node.operator != "BandMaths" or len(node.sources) != 1:
+                continue
+            first = nodes.get(node.source_ids[0])
+            if (
+                first is None
+                or first.operator != "BandMaths"
+                or consumers[first.id] != [node.id]
+                or _has_variables(first)
+                or _has_variables(node)
+            ):
+                continue
+
+            expressions = _fusable_expressions(first)
+            if expressions is None or not _fuse(node, expressions):
+                continue
+
+            node.sources = list(first.sources)
+            graph.remove_node(first.id)
+            report.fused.append((first.id, node.id))
+            changed = True
+            break
+
+    graph.invalidate()
+
+
+def _has_variables(node) -> bool:
+    variables = node.parameters.get("variables")
+    return variables is not None and (not isinstance(variables, str) or variables.strip() != "")
+
+
+def _target_bands(node):
+    target_bands = node.parameters.get("targetBands")
+    if target_bands is None or isinstance(target_bands, str):
+        return None
+    return list(target_bands.iter("targetBand"))
+
+
+def _fusable_expressions(node) -> Optional[Dict[str, str]]:
+    """Returns the expressions of the node bands, or None if it cannot be merged."""
+    target_bands = _target_bands(node)
+    if not target_bands:
+        return None
+
+    expressions = {}
+    for target_band in target_bands:
+        fields = {child.tag: (child.text or "").strip() for child in target_band}
+        if set(fields) - _FUSABLE_BAND_FIELDS or fields.get("type") not in _FLOAT_TYPES:
+            return None
+        if not fields.get("name") or not fields.get("expression"):
+            return None
+        if any(not _is_nan(fields[key]) for key in _NO_DATA_FIELDS & set(fields)):
+            # The consumer would take the pixels equal to the no-data value as invalid
+            return None
+        expressions[fields["name"]] = fields["expression"]
+    return expressions
+
+
+def _is_nan(value: str) -> bool:
+    try:
+        return math.isnan(float(value))
+    except ValueError:
+        return False
+
+
+def _fuse(node, expressions: Dict[str, str]) -> bool:
+    """Rewrites the node expressions in terms of the previous node sources.
+
+    Returns:
+        False, leaving the node untouched, if an expression uses anything else than the
+        bands of the previous node.
+    """
+    target_bands = _target_bands(node)
+    if not target_bands:
+        return False
+
+    elements = [target_band.find("expression") for target_band in target_bands]
+    try:
+        if any(e is None or not references(e.text or "") <= set(expressions) for e in elements):
+            return False
+    except ValueError:
+        return False
+
+    for elem in elements:
+        elem.text = substitute(elem.text, expressions)
+    return True
+
+
+def simplify_expressions(graph: Graph, report: OptimizationReport) -> None:
+    """Folds the constants and removes the redundant operations of the expressions.
+
+    Expressions that cannot be parsed are left as they are, :meth:`Graph.validate` reports
+    them.
+    """
+    for node in graph.nodes.values():
+        for owner, key, expression in list(node_expressions(node)):
+            try:
+                simplified = simplify(expression)
+            except (InvalidExpressionError, RecursionError):
+                continue
+            if "".join(simplified.split()) == "".join(expression.split()):
+                continue
+            if key is None:
+                owner.text = simplified
+            else:
+                owner[key] = simplified
+            report.simplified.append((node.id, expression, simplified))
+
+    graph.invalidate()
+
+
+def prune_unused_bands(graph: Graph, report: OptimizationReport) -> None:
+    """Reduces the bandNames of the Read and Subset nodes to the bands the graph uses.
+
+    Only explicit band lists are reduced, as an empty one means all the bands. Graphs
+    without Write are left as is.
+    """
+    nodes = graph.nodes
+    if not any(node.operator in _SINK_OPERATORS for node in nodes.values()):
+        return
+
+    required = required_bands(graph, topological_sort(graph))
+    for node_id, node in nodes.items():
+        if node.operator not in ("Read", "Subset") or required[node_id] is None:
+            continue
+        for name in _BAND_PARAMETERS:
+            bands = band_list(node.parameters.get(name))
+            if bands is None:
+                continue
+            kept = prune_band_list(bands, required[node_id])
+            if kept and len(kept) < len(bands):
+                node.parameters[name] = ",".join(kept)
+                report.pruned_bands[node_id] = [b for b in bands if b not in kept]
+
+    graph.invalidate()
+
+
+def _consumers(graph: Graph) -> Dict[str, List[str]]:
+    """Maps each node identifier to the identifiers of the nodes using it as a source."""
+    consumers = {node_id: [] for node_id in graph.nodes}
+    for node in graph.nodes.values():
+        for source_id in node.source_ids:
+            if source_id in consumers:
+                consumers[source_id].append(node.id)
+    return consumers
@@ -0,0 +1,153 @@
+"""Full-text search over the SNAP operators.
+
+The operator names, descriptions, parameter names, parameter descriptions and allowed
+values are indexed once in an inverted index, mapping each term to the operators it
+appears in with a weight depending on the field. Queries only look up their own terms,
+so they don't scan the operator descriptions.
+"""
+
+import math
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Mapping, Set, Tuple
+
+NAME = 8.0
+PARAMETER = 3.0
+DESCRIPTION = 2.0
+VALUE = 1.5
+PARAMETER_DESCRIPTION = 1.0
+
+# A term matching only as a prefix of an indexed term scores less than an exact match.
+PREFIX = 0.5
+
+_WORD = re.compile(r"[A-Za-z0-9]+")
+_CAMEL_CASE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from if in is it of on or that the this to with".split()
+)
+
+
+def terms(text: str) -> Iterator[str]:
+    """Yields the lowercase terms of a text.
+
+    Words in camel case are yielded whole and split, so that `cloudMask` is found
+    by `cloudmask`, `cloud` and `mask`.
+    """
+    for word in _WORD.findall(text or ""):
+        lower = word.lower()
+        if lower not in _STOPWORDS:
+            yield lower
+        parts = _CAMEL_CASE.findall(word)
+        if len(parts) > 1:
+            for part in parts:
+                part = part.lower()
+                if part not in _STOPWORDS:
+                    yield part
+
+
+@dataclass
+class SearchResult:
+    """An operator matching a query.
+
+    Attributes:
+        operator: the operator name.
+        score: the relevance of the operator, higher is better.
+        parameters: the parameters of the operator matching the query.
+    """
+
+    operator: str
+    score: float
+    parameters: List[str]
+
+
+class SearchIndex:
+    """An inverted index of the SNAP operators.
+
+    Args:
+        operators: the operator descriptions, as found in `operators.json`.
+    """
+
+    def __init__(self, operators: Mapping[str, dict]):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._parameters: Dict[Tuple[str, str], Set[str]] = {}
+
+        for name in operators:
+            self._add(name, operators[name])
+
+        # Rare terms tell more about an operator than the ones found everywhere.
+        count = len(operators)
+        for postings in self._postings.values():
+            idf = math.log(1 + count / len(postings))
+            for name in postings:
+                postings[name] *= idf
+
+        self._terms = sorted(self._postings)
+
+    def _add(self, name: str, operator: dict) -> None:
+        weights: Dict[str, float] = {}
+
+        def add(text, weight, parameter=None):
+            for term in terms(text):
+                if weights.get(term, 0) < weight:
+                    weights[term] = weight
+                if parameter is not None:
+                    self._parameters.setdefault((term, name), set()).add(parameter)
+
+        add(name, NAME)
+        add(operator.get("description"), DESCRIPTION)
+        for parameter, spec in operator.get("params", {}).items():
+            add(parameter, PARAMETER, parameter)
+            add(spec.get("description"), PARAMETER_DESCRIPTION, parameter)
+            for value in spec.get("values_set") or ():
+                add(str(value), VALUE, parameter)
+
+        for term, weight in weights.items():
+            self._postings.setdefault(term, {})[name] = weight
+
+    def _matches(self, term: str) -> Dict[str, Tuple[float, Set[str]]]:
+        """Maps the operators matching a term to their score and matching terms."""
+        matches = {name: (weight, {term}) for name, weight in self._postings.get(term, {}).items()}
+        position = bisect_left(self._terms, term)
+        for candidate in self._terms[position:]:
+            if not candidate.startswith(term):
+                break
+            if candidate == term:
+                continue
+            for name, weight in self._postings[candidate].items():
+                weight *= PREFIX
+                score, matched = matches.get(name, (0.0, set()))
+                if weight > score:
+                    score = weight
+                matches[name] = (score, matched | {candidate})
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> List[SearchResult]:
+        """Returns the operators best matching a query.
+
+        Every term of the query also matches the indexed terms it is a prefix of.
+        Operators matching more terms of the query rank first, then the ones with the
+        highest score.
+
+        Args:
+            query: the words to look for.
+            limit: the maximum number of results.
+        """
+        scores: Dict[str, float] = {}
+        hits: Dict[str, int] = {}
+        matched: Dict[str, Set[str]] = {}
+
+        for term in dict.fromkeys(terms(query)):
+            for name, (score, found) in self._matches(term).items():
+                scores[name] = scores.get(name, 0.0) + score
+                hits[name] = hits.get(name, 0) + 1
+                matched.setdefault(name, set()).update(found)
+
+        ranking = sorted(scores, key=lambda name: (-hits[name], -scores[name], name))
+        results = []
+        for name in ranking[:limit]:
+            parameters: Set[str] = set()
+            for term in matched[name]:
+                parameters.update(self._parameters.get((term, name), ()))
+            results.append(SearchResult(name, scores[name], sorted(parameters)))
+        return results
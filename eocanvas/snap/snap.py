@@ -1,19 +1,66 @@
 import json
-import os
+from collections.abc import Mapping
+from types import MappingProxyType
 
 from eocanvas.exceptions import MalformedSnapError
+from eocanvas.logging import logger
 from eocanvas.utils import Singleton
 
+from .index import INDEX_FILENAME, JSON_FILENAME, OperatorIndex
+from .search import SearchIndex
+
+
+class _OperatorTable(Mapping):
+    """A read-only mapping computing the value of each operator on first access."""
+
+    def __init__(self, operators, build):
+        self._operators = operators
+        self._build = build
+        self._values = {}
+
+    def __getitem__(self, name):
+        value = self._values.get(name)
+        if value is None:
+            value = self._values[name] = self._build(self._operators[name])
+        return value
+
+    def __contains__(self, name):
+        return name in self._operators
+
+    def __iter__(self):
+        return iter(self._operators)
+
+    def __len__(self):
+        return len(self._operators)
+
 
 class Snap(metaclass=Singleton):
+    """The SNAP operators.
+
+    By default the operators are read from the compact index shipped with the package,
+    see :mod:`eocanvas.snap.index`, falling back to `operators.json` if the index is
+    missing or out of date. A custom JSON file
+    can be given instead.
+    """
+
     def __init__(self, filename=None):
-        if filename is None:
-            filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), "operators.json")
-        self.filename = filename
+        self.index_filename = INDEX_FILENAME if filename is None else None
+        self.filename = JSON_FILENAME if filename is None else filename
         self._operators = None
+        self._parameters = None
+        self._defaults = None
+        self._formats = None
+        self._search_index = None
 
     @property
     def operators(self):
+        if self._operators is None and self.index_filename is not None:
+            try:
+                self._operators = OperatorIndex(self.index_filename, self.filename)
+            except (OSError, ValueError) as exc:
+                logger.warning(f"Not using the SNAP operators index: {exc}")
+                self.index_filename = None
+
         if self._operators is None:
             try:
                 with open(self.filename) as f:
@@ -27,6 +74,69 @@ class Snap(metaclass=Singleton):
 
         return self._operators
 
+    @property
+    def parameters(self):
+        """Maps each operator to its parameter names and their allowed values.
+
+        An empty set means any value is allowed. Each operator entry is built once, on
+        first access, so lookups don't scan the operator descriptions.
+        """
+        if self._parameters is None:
+            self._parameters = _OperatorTable(
+                self.operators,
+                lambda operator: {
+                    param: frozenset(spec["values_set"] or ())
+                    for param, spec in operator["params"].items()
+                },
+            )
+
+        return self._parameters
+
+    @property
+    def defaults(self):
+        """Maps each operator to the read-only table of its parameter default values."""
+        if self._defaults is None:
+            self._defaults = _OperatorTable(
+                self.operators,
+                lambda operator: MappingProxyType(
+                    {param: spec["default_values"] for param, spec in operator["params"].items()}
+                ),
+            )
+
+        return self._defaults
+
+    @property
+    def formats(self):
+        """The sets of the format names accepted by the Read and Write operators."""
+        if self._formats is None:
+            self._formats = {
+                "Read": frozenset(self.read_formats),
+                "Write": frozenset(self.write_formats),
+            }
+
+        return self._formats
+
+    def search(self, query, limit=10):
+        """Searches the operators by name, description, parameters and allowed values.
+
+        The index is built on the first search, the following ones only look up the
+        terms of the query.
+
+        Example:
+            >>> [result.operator for result in Snap().search("cloud mask", limit=3)]
+
+        Args:
+            query: the words to look for. Each word also matches the words it begins.
+            limit: the maximum number of results.
+
+        Returns:
+            A list of :class:`eocanvas.snap.search.SearchResult`, best match first.
+        """
+        if self._search_index is None:
+            self._search_index = SearchIndex(self.operators)
+
+        return self._search_index.search(query, limit)
+
     @property
     def read_formats(self):
         return [
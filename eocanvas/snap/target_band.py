@@ -3,6 +3,8 @@ from xml.sax.saxutils import escape
 import attr
 import lxml.etree as etree
 
+from .xmlwriter import field_names
+
 
 @attr.s
 class TargetBand(object):
@@ -27,11 +29,24 @@ class TargetBand(object):
     def to_xml(self):
         root = etree.Element("targetBand")
 
-        for key, value in self.to_dict().items():
-            elem = etree.SubElement(root, key)
-            if key == "expression":
-                elem.text = escape(value)
-            else:
-                elem.text = value
+        for key, value in self._fields():
+            etree.SubElement(root, key).text = value
 
         return root
+
+    def write_xml(self, writer):
+        writer.record("targetBand", self._fields())
+
+    def evaluate(self, bands, no_data=None):
+        """Computes the band locally from the arrays of the source bands, with NumPy.
+
+        See :func:`eocanvas.snap.evaluator.evaluate_target_band`.
+        """
+        from .evaluator import evaluate_target_band
+
+        return evaluate_target_band(self, bands, no_data)
+
+    def _fields(self):
+        for key in field_names(TargetBand):
+            value = getattr(self, key)
+            yield key, escape(value) if key == "expression" else value
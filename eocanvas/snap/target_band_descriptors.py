@@ -12,3 +12,15 @@ class TargetBandDescriptors(object):
             root.append(target_band.to_xml())
 
         return root
+
+    def evaluate(self, bands, no_data=None):
+        """Computes the target bands locally with NumPy, returning the arrays by band name."""
+        return {
+            target_band.name: target_band.evaluate(bands, no_data)
+            for target_band in self.target_bands
+        }
+
+    def write_xml(self, writer):
+        with writer.element("targetBands"):
+            for target_band in self.target_bands:
+                target_band.write_xml(writer)
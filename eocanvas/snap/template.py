@@ -0,0 +1,124 @@
+"""Graph templates with fast placeholder substitution.
+
+A template serializes a graph once and splits the XML into literal segments and
+`$name` or `${name}` slots. Rendering a variant is then a join of byte strings,
+without parsing or serializing any XML.
+
+Placeholders without a value are left untouched, since the Serverless Functions service
+replaces the input ones, such as `$img1`, with the actual product paths.
+"""
+
+import re
+from base64 import b64encode
+from typing import Dict, List, Tuple
+from xml.sax.saxutils import escape
+
+from .graph import Graph
+
+_PLACEHOLDER = re.compile(
+    rb"\$(?:\{(?P<braced>[A-Za-z_][A-Za-z0-9_]*)\}|(?P<name>[A-Za-z_][A-Za-z0-9_]*))"
+)
+
+
+def _escape(value) -> bytes:
+    return escape(str(value), {'"': "&quot;"}).encode()
+
+
+class RenderedGraph:
+    """A graph rendered from a template.
+
+    It can be used as the `snap_graph` of a :class:`eocanvas.processes.SnapProcess`.
+    """
+
+    def __init__(self, xml: bytes):
+        self.xml = xml
+        self._fingerprint = None
+
+    def __repr__(self):
+        return "RenderedGraph({} bytes)".format(len(self.xml))
+
+    def tostring(self, pretty_print=True) -> bytes:
+        return self.xml
+
+    def b64encode(self, minify=False) -> str:
+        return b64encode(self.xml).decode()
+
+    def to_graph(self) -> Graph:
+        return Graph.from_text(self.xml)
+
+    def fingerprint(self) -> str:
+        """Returns the graph fingerprint, see :meth:`eocanvas.snap.graph.Graph.fingerprint`."""
+        if self._fingerprint is None:
+            self._fingerprint = self.to_graph().fingerprint()
+        return self._fingerprint
+
+    def validate(self, strict=True) -> List[str]:
+        """Validates the rendered graph, see :meth:`eocanvas.snap.graph.Graph.validate`."""
+        return self.to_graph().validate(strict=strict)
+
+
+class GraphTemplate:
+    """A graph compiled to literal segments and placeholder slots.
+
+    Example:
+        template = GraphTemplate(Graph.from_uri("graph.xml"))
+        for scene in scenes:
+            graph = template.bind(region=scene.region, output=scene.name)
+    """
+
+    def __init__(self, graph, pretty_print=True):
+        """
+        Args:
+            graph: A :class:`eocanvas.snap.graph.Graph`, or the graph XML as str or bytes
+            pretty_print: Whether to indent the XML of a Graph
+        """
+        if isinstance(graph, Graph):
+            xml = graph.tostring(pretty_print=pretty_print)
+        elif isinstance(graph, str):
+            xml = graph.encode()
+        else:
+            xml = bytes(graph)
+
+        self._segments: List[bytes] = []
+        self._slots: List[Tuple[str, bytes]] = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(xml):
+            start, end = match.span()
+            self._segments.append(xml[position:start])
+            name = (match.group("braced") or match.group("name")).decode()
+            self._slots.append((name, match.group(0)))
+            position = end
+        self._segments.append(xml[position:])
+
+    @classmethod
+    def from_uri(cls, uri, pretty_print=True):
+        return cls(Graph.from_uri(uri), pretty_print=pretty_print)
+
+    @property
+    def placeholders(self) -> Tuple[str, ...]:
+        """The placeholder names, in order of first appearance."""
+        return tuple(dict.fromkeys(name for name, _ in self._slots))
+
+    def render(self, **values) -> bytes:
+        """Returns the graph XML with the placeholders replaced by the given values.
+
+        Values are XML escaped. Placeholders without a value are kept as they are.
+        """
+        escaped: Dict[str, bytes] = {name: _escape(value) for name, value in values.items()}
+        parts = [self._segments[0]]
+        for (name, literal), segment in zip(self._slots, self._segments[1:]):
+            parts.append(escaped.get(name, literal))
+            parts.append(segment)
+        return b"".join(parts)
+
+    def b64encode(self, **values) -> str:
+        """Returns the base64 payload of the rendered graph."""
+        return b64encode(self.render(**values)).decode()
+
+    def bind(self, **values) -> RenderedGraph:
+        """Returns the rendered graph, ready to be submitted."""
+        return RenderedGraph(self.render(**values))
+
+    def graph(self, **values) -> Graph:
+        """Returns the rendered graph as a :class:`eocanvas.snap.graph.Graph`."""
+        return Graph.from_text(self.render(**values))
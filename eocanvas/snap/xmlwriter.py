@@ -0,0 +1,141 @@
+"""Streaming serialization of the SNAP Graphs and of their configurations.
+
+The XML is written to the target with :class:`lxml.etree.xmlfile` as the elements are
+produced, without building the document tree first. The output is the same as the one
+of :func:`lxml.etree.tostring` on the equivalent tree, indentation included.
+"""
+
+from contextlib import contextmanager
+from functools import lru_cache
+
+import attr
+import lxml.etree as etree
+
+INDENT = "  "
+
+
+@lru_cache(maxsize=None)
+def field_names(cls):
+    """The names of the attributes of an `attrs` class, in definition order."""
+    return tuple(field.name for field in attr.fields(cls))
+
+
+class XMLWriter:
+    """Writes XML elements to an :class:`lxml.etree.xmlfile`.
+
+    Indentation follows the rules of lxml: the children of an element are indented only
+    if the element has no text content.
+
+    Args:
+        xf: the incremental writer.
+        pretty_print: indent the document.
+    """
+
+    def __init__(self, xf, pretty_print=False):
+        self.xf = xf
+        self.pretty_print = pretty_print
+        # For each element being written, its tag, its attributes and, once it has a
+        # child, the context writing it. Childless elements are written as `<tag/>`.
+        self._open = []
+
+    def flush(self):
+        """Writes the pending data to the file."""
+        self.xf.flush()
+
+    def _start(self):
+        if self._open:
+            parent = self._open[-1]
+            if parent[2] is None:
+                parent[2] = self.xf.element(parent[0], parent[1])
+                parent[2].__enter__()
+            if self.pretty_print:
+                self.xf.write("\n" + INDENT * len(self._open))
+
+    @contextmanager
+    def element(self, tag, attrib=None):
+        """Opens an element: the elements written in its context are its children."""
+        self._start()
+        entry = [tag, attrib or {}, None]
+        self._open.append(entry)
+        yield
+        self._open.pop()
+        if entry[2] is None:
+            self.xf.write(etree.Element(tag, entry[1]))
+        else:
+            if self.pretty_print:
+                self.xf.write("\n" + INDENT * len(self._open))
+            entry[2].__exit__(None, None, None)
+
+    def leaf(self, tag, text=None, attrib=None):
+        """Writes an element without children."""
+        elem = etree.Element(tag, attrib or {})
+        elem.text = text
+        self._start()
+        self.xf.write(elem)
+
+    def record(self, tag, fields):
+        """Writes an element whose children are elements without children.
+
+        It is equivalent to calling :meth:`leaf` for each child in the context of
+        :meth:`element`, but faster for configurations made of many small records.
+
+        Args:
+            tag: the element tag.
+            fields: the `(tag, text)` pairs of the children. A text of None makes an
+                empty element.
+        """
+        elem = etree.Element(tag)
+        for key, text in fields:
+            etree.SubElement(elem, key).text = text
+        self._start()
+        if self.pretty_print:
+            etree.indent(elem, INDENT, level=len(self._open))
+        self.xf.write(elem, with_tail=False)
+
+    def write(self, elem):
+        """Writes an lxml element and its children, without its tail."""
+        if (
+            self.pretty_print
+            and len(elem)
+            and elem.text is None
+            and all(child.tail is None for child in elem)
+        ):
+            with self.element(elem.tag, elem.attrib):
+                for child in elem:
+                    self.write(child)
+        else:
+            self._start()
+            self.xf.write(elem, with_tail=False)
+
+
+@contextmanager
+def xml_writer(target, pretty_print=False):
+    """Opens a target for writing, yielding an :class:`XMLWriter`.
+
+    Args:
+        target: a file name or a binary file object.
+        pretty_print: indent the document.
+    """
+    if isinstance(target, str):
+        with open(target, "wb") as f:
+            with xml_writer(f, pretty_print) as writer:
+                yield writer
+        return
+
+    with etree.xmlfile(target) as xf:
+        yield XMLWriter(xf, pretty_print)
+    if pretty_print:
+        # lxml ends a pretty printed document with a new line, outside of any element
+        target.write(b"\n")
+
+
+def dump(obj, target, pretty_print=True):
+    """Writes an object having a `write_xml` method, such as a configuration, to a target.
+
+    Args:
+        obj: the object to serialize.
+        target: a file name or a binary file object.
+        pretty_print: indent the document.
+    """
+    with xml_writer(target, pretty_print) as writer:
+        obj.write_xml(writer)
@@ -0,0 +1,354 @@
+"""Parameter sweeps over Data Tailor chains and SNAP Graphs.
+
+A :class:`Sweep` takes a base chain or graph and parameter axes, and generates the
+variants lazily, as the Cartesian product of the axes or by zipping them. Variants
+giving the same chain or graph are submitted once, the jobs run with a bounded number
+of submissions in flight, and the results are tabulated per variant.
+
+An axis is named by the parameter it changes:
+
+- for a :class:`eocanvas.datatailor.chain.Chain`, a field such as `projection` or
+  `resample_resolution`, or a field of a sub model such as `filter.bands` or `roi.NSWE`,
+- for a :class:`eocanvas.snap.graph.Graph`, a node parameter such as `Subset.region`,
+  a field of the elements of a structured parameter such as
+  `BandMaths.targetBands.expression`, or a field of the binning aggregators of a type
+  such as `AggregatorPercentile.percentage` or `PERCENTILE.percentage`.
+
+Example:
+    sweep = Sweep(chain, {"projection": ["geographic", "mercator"],
+                          "resample_resolution": [[0.01, 0.01], [0.05, 0.05]]},
+                  epct_input=inputs)
+    table = sweep.run(max_pending=4, download=True, download_dir="out/{job_id}")
+    table.to_csv("sweep.csv")
+"""
+
+import csv
+import itertools
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from copy import deepcopy
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Union
+
+import lxml.etree as etree
+
+from .datatailor.chain import Chain
+from .exceptions import InvalidChainError
+from .executor import Executor
+from .logging import logger
+from .processes import DataTailorProcess, SnapProcess
+from .snap.binning import aggregators  # noqa: F401, registers the aggregator types
+from .snap.binning.aggregator import Aggregator
+from .snap.graph import Graph
+from .utils import canonical_hash
+
+PRODUCT = "product"
+ZIP = "zip"
+
+
+@dataclass
+class Variant:
+    """A variant of the base chain or graph.
+
+    Attributes:
+        index: The position of the variant in the sweep
+        params: The value of each axis
+        target: The chain or graph
+        fingerprint: The canonical hash of the chain or graph
+    """
+
+    index: int
+    params: Dict[str, Any]
+    target: Union[Chain, Graph]
+    fingerprint: str
+
+
+@dataclass
+class SweepResults:
+    """The results of a sweep, one row per variant.
+
+    Each row holds the value of each axis, the variant fingerprint, and either the
+    `result` of its job, as in :meth:`eocanvas.executor.Executor.submit`, or its `error`.
+    Equivalent variants share the result of the one submitted.
+    """
+
+    axes: List[str]
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def columns(self) -> List[str]:
+        return self.axes + ["fingerprint", "result", "error"]
+
+    @property
+    def failed(self) -> List[Dict[str, Any]]:
+        """The rows of the failed variants."""
+        return [row for row in self.rows if row["error"] is not None]
+
+    def to_csv(self, path: str) -> None:
+        """Writes the table to a CSV file."""
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, self.columns)
+            writer.writeheader()
+            for row in self.rows:
+                writer.writerow({**row, "error": "" if row["error"] is None else row["error"]})
+
+
+def _aggregator_types() -> Dict[str, str]:
+    """Maps the aggregator class names to their type."""
+    return {cls.__name__: cls.TYPE for cls in Aggregator.__subclasses__()}
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(v) for v in value)
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+
+def set_chain_parameter(chain: Chain, name: str, value: Any) -> Chain:
+    """Returns a copy of a chain with a field, or a field of a sub model, set.
+
+    Raises:
+        InvalidChainError: if the field does not exist.
+    """
+    data = chain.asdict()
+    *parents, key = name.split(".")
+    target = data
+    for parent in parents:
+        target = target.setdefault(parent, {})
+    target[key] = value
+    try:
+        return Chain(**data)
+    except TypeError as exc:
+        raise InvalidChainError(f"Invalid chain parameter {name}: {exc}")
+
+
+def set_graph_parameter(graph: Graph, name: str, value: Any) -> None:
+    """Sets a parameter of a graph in place, see the module documentation for the names.
+
+    Raises:
+        ValueError: if the parameter does not match the graph.
+    """
+    head, _, rest = name.partition(".")
+    if not rest:
+        raise ValueError(f"Invalid graph parameter {name}")
+    text = _text(value)
+
+    node = graph.nodes.get(head)
+    if node is not None:
+        parameter, _, child = rest.partition(".")
+        current = node.parameters.get(parameter)
+        if not child:
+            if isinstance(current, etree._Element):
+                raise ValueError(f"{name} is a structured parameter")
+            node.parameters[parameter] = text
+        elif isinstance(current, etree._Element):
+            elems = list(current.iter(child))
+            if not elems:
+                raise ValueError(f"No {child} in {head}.{parameter}")
+            for elem in elems:
+                elem.text = text
+        else:
+            raise ValueError(f"{head}.{parameter} is not a structured parameter")
+        graph.invalidate()
+        return
+
+    aggregator_type = _aggregator_types().get(head, head)
+    found = False
+    for node in graph.nodes.values():
+        for value in node.parameters.values():
+            if not isinstance(value, etree._Element):
+                continue
+            for aggregator in value.iter("aggregator"):
+                if aggregator.findtext("type") != aggregator_type:
+                    continue
+                elem = aggregator.find(rest)
+                if elem is None:
+                    elem = etree.SubElement(aggregator, rest)
+                elem.text = text
+                found = True
+    if not found:
+        raise ValueError(f"No node or aggregator matches {name}")
+    graph.invalidate()
+
+
+class Sweep:
+    """Runs the variants of a chain or graph along parameter axes.
+
+    Attributes:
+        base: The base :class:`eocanvas.datatailor.chain.Chain` or
+            :class:`eocanvas.snap.graph.Graph`
+        axes: The values of each axis, by parameter name
+        mode: `product` for the Cartesian product of the axes, or `zip` to take the
+            n-th value of every axis together
+        setters: Functions applying custom axes, called with the variant and the value.
+            They return the new chain, or edit the graph in place
+        process_kwargs: Any other process argument, such as `epct_input` or `eo_input`
+    """
+
+    def __init__(
+        self,
+        base: Union[Chain, Graph],
+        axes: Mapping[str, Sequence[Any]],
+        mode: str = PRODUCT,
+        setters: Optional[Mapping[str, Callable[[Any, Any], Any]]] = None,
+        **process_kwargs: Any,
+    ):
+        if mode not in (PRODUCT, ZIP):
+            raise ValueError(f"Invalid mode {mode}, must be {PRODUCT} or {ZIP}")
+        if mode == ZIP and len({len(values) for values in axes.values()}) > 1:
+            raise ValueError("Zipped axes must have the same number of values")
+        if hasattr(base, "to_graph"):
+            base = base.to_graph()
+        self.base = base
+        self.axes = {name: list(values) for name, values in axes.items()}
+        self.mode = mode
+        self.setters = dict(setters or {})
+        self.process_kwargs = process_kwargs
+
+    def _combinations(self) -> Iterator[Dict[str, Any]]:
+        names = list(self.axes)
+        values = [self.axes[name] for name in names]
+        combine = itertools.product if self.mode == PRODUCT else zip
+        for combination in combine(*values):
+            yield dict(zip(names, combination))
+
+    def _apply(self, params: Dict[str, Any]) -> Union[Chain, Graph]:
+        if isinstance(self.base, Chain):
+            target = deepcopy(self.base)
+            for name, value in params.items():
+                setter = self.setters.get(name)
+                target = (
+                    setter(target, value) if setter else set_chain_parameter(target, name, value)
+                )
+            return target
+
+        target = self.base.copy()
+        for name, value in params.items():
+            setter = self.setters.get(name)
+            if setter:
+                setter(target, value)
+                target.invalidate()
+            else:
+                set_graph_parameter(target, name, value)
+        return target
+
+    @staticmethod
+    def fingerprint(target: Union[Chain, Graph]) -> str:
+        """Returns the canonical hash of a chain or graph."""
+        if isinstance(target, Chain):
+            return canonical_hash(target.asdict())
+        return target.fingerprint()
+
+    def variants(self) -> Iterator[Variant]:
+        """Yields the variants lazily, including the equivalent ones."""
+        for index, params in enumerate(self._combinations()):
+            target = self._apply(params)
+            yield Variant(index, params, target, self.fingerprint(target))
+
+    def unique_variants(self) -> Iterator[Variant]:
+        """Yields the variants lazily, skipping the ones equivalent to a previous one."""
+        seen = set()
+        for variant in self.variants():
+            if variant.fingerprint not in seen:
+                seen.add(variant.fingerprint)
+                yield variant
+
+    def process(self, variant: Variant):
+        """Returns the process of a variant."""
+        if isinstance(variant.target, Chain):
+            return DataTailorProcess(epct_chain=variant.target, **self.process_kwargs)
+        return SnapProcess(snap_graph=variant.target, **self.process_kwargs)
+
+    def run(
+        self,
+        max_pending: int = 4,
+        retries: int = 0,
+        executor: Optional[Executor] = None,
+        force: bool = False,
+        **executor_kwargs: Any,
+    ) -> SweepResults:
+        """Submits the unique variants and tabulates their results.
+
+        At most `max_pending` variants are generated and in flight at the same time, so
+        large sweeps are neither built nor submitted all at once. Only the parameters and
+        fingerprint of each variant are kept until the end, not its chain or graph.
+
+        Args:
+            max_pending: How many variants run at the same time.
+            retries: How many times a failed variant is submitted again.
+            executor: The executor to submit to. By default a new one is created.
+            force: Skip the submission ledger for the first submission of each variant.
+            executor_kwargs: Any other :class:`eocanvas.executor.Executor` argument, such as
+                `download=True` and `download_dir`, when no executor is given.
+
+        Returns:
+            The results, one row per variant, in sweep order. Failed variants have an
+            `error` instead of a `result`.
+
+        Raises:
+            ValueError: if `max_pending` is less than 1.
+        """
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+        if executor is None:
+            executor_kwargs.setdefault("max_workers", max_pending)
+            with Executor(**executor_kwargs) as executor:
+                return self.run(max_pending, retries, executor, force)
+
+        rows = []
+        outcomes: Dict[str, Dict[str, Any]] = {}
+        pending = {}
+        attempts: Dict[str, int] = {}
+        queue = deque()
+
+        def submit(variant, first=True):
+            future = executor.submit(self.process(variant), force=force and first)
+            pending[future] = variant
+
+        for variant in self.variants():
+            rows.append((variant.params, variant.fingerprint))
+            if variant.fingerprint in outcomes or variant.fingerprint in attempts:
+                continue
+            attempts[variant.fingerprint] = 0
+            queue.append(variant)
+            while queue and len(pending) < max_pending:
+                submit(queue.popleft())
+            while len(pending) >= max_pending:
+                self._collect(pending, outcomes, attempts, retries, submit)
+
+        while queue or pending:
+            while queue and len(pending) < max_pending:
+                submit(queue.popleft())
+            self._collect(pending, outcomes, attempts, retries, submit)
+
+        table = SweepResults(list(self.axes))
+        for params, fingerprint in rows:
+            table.rows.append({**params, "fingerprint": fingerprint, **outcomes[fingerprint]})
+        return table
+
+    @staticmethod
+    def _collect(pending, outcomes, attempts, retries, submit) -> None:
+        """Waits for a variant to complete, and records or retries it."""
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            variant = pending.pop(future)
+            error = future.exception()
+            if error is None:
+                outcomes[variant.fingerprint] = {"result": future.result(), "error": None}
+            elif attempts[variant.fingerprint] < retries:
+                attempts[variant.fingerprint] += 1
+                logger.warning(f"Variant {variant.params} failed, retrying: {error}")
+                submit(variant, first=False)
+            else:
+                logger.warning(f"Variant {variant.params} failed: {error}")
+                outcomes[variant.fingerprint] = {"result": None, "error": error}
@@ -0,0 +1,143 @@
+"""Temporal chunking of the date range processes.
+
+A :class:`eocanvas.processes.ShearWaterProcess` sends its whole date range as one job.
+The :class:`TemporalChunker` splits a long range into windows of a few days or months,
+runs one job per window concurrently, retries the failed windows on their own, and
+returns the results in chronological order.
+
+Example:
+    chunker = TemporalChunker(ShearWaterProcess("Sindian", "2015-01-01", "2020-12-31"), months=6)
+    paths = chunker.run("out", max_workers=4)
+"""
+
+import calendar
+import os
+from dataclasses import replace
+from datetime import date, timedelta
+from typing import Any, List, Optional, Tuple
+
+from .executor import Executor, run_with_retries
+from .processes import ShearWaterProcess
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return day.replace(
+        year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1])
+    )
+
+
+def split_date_range(
+    start_day: str, end_day: str, days: Optional[int] = None, months: Optional[int] = None
+) -> List[Tuple[str, str]]:
+    """Splits a date range into consecutive windows.
+
+    Args:
+        start_day: The first day, as `YYYY-MM-DD`.
+        end_day: The last day, included, as `YYYY-MM-DD`.
+        days: The number of days of each window.
+        months: The number of months of each window, if `days` is not given.
+
+    Returns:
+        The first and last day of each window, in order. The last window ends on
+        `end_day`, and can be shorter.
+
+    Raises:
+        ValueError: if the range or the window size is invalid.
+    """
+    start = date.fromisoformat(start_day)
+    end = date.fromisoformat(end_day)
+    if end < start:
+        raise ValueError(f"end_day {end_day} is before start_day {start_day}")
+    if (days is None) == (months is None):
+        raise ValueError("Either days or months must be given")
+    if (days or months) < 1:
+        raise ValueError("The window size must be positive")
+
+    windows = []
+    first = start
+    while first <= end:
+        if days is not None:
+            following = first + timedelta(days=days)
+        else:
+            following = _add_months(start, months * (len(windows) + 1))
+        last = min(following - timedelta(days=1), end)
+        windows.append((first.isoformat(), last.isoformat()))
+        first = last + timedelta(days=1)
+    return windows
+
+
+class TemporalChunker:
+    """Runs a process over a long date range as one job per window.
+
+    Attributes:
+        process: The process over the whole range
+        windows: The first and last day of each window, see :func:`split_date_range`
+        retries: How many times a failed window is submitted again
+    """
+
+    def __init__(
+        self,
+        process: ShearWaterProcess,
+        days: Optional[int] = None,
+        months: Optional[int] = None,
+        retries: int = 2,
+    ):
+        self.process = process
+        self.windows = split_date_range(process.start_day, process.end_day, days, months)
+        self.retries = retries
+
+    def processes(self) -> List[ShearWaterProcess]:
+        """Returns the process of each window."""
+        return [
+            replace(self.process, start_day=first, end_day=last) for first, last in self.windows
+        ]
+
+    def run(
+        self,
+        download_dir: Optional[str] = None,
+        executor: Optional[Executor] = None,
+        force: bool = False,
+        **executor_kwargs: Any,
+    ) -> List[Any]:
+        """Runs the windows concurrently and returns their results in order.
+
+        The number of windows running at the same time is bounded by the executor
+        `max_workers`, and the API calls by its rate limiter, if any.
+
+        Args:
+            download_dir: Where to download the results, in one `{job_id}` directory per
+                window. If not given, the results are not downloaded.
+            executor: The executor to submit to. By default a new one is created. Its own
+                download settings apply, so it cannot be given with `download_dir`.
+            force: Skip the submission ledger for the first submission of each window.
+            executor_kwargs: Any other :class:`eocanvas.executor.Executor` argument, when no
+                executor is given.
+
+        Returns:
+            The downloaded file paths of all the windows, in chronological order, or the
+            completed jobs if `download_dir` is not given.
+
+        Raises:
+            PartialFailureError: if some windows still fail after their retries. The
+                results of the other windows are kept, and the ledger, if any, lets a new
+                run reuse their jobs.
+            ValueError: if an executor is given with `download_dir` or executor arguments.
+        """
+        if executor is not None and (download_dir is not None or executor_kwargs):
+            raise ValueError("download_dir and executor arguments need no executor to be given")
+        if executor is None and download_dir is not None:
+            executor_kwargs["download"] = True
+            executor_kwargs["download_dir"] = os.path.join(download_dir, "{job_id}")
+        results = run_with_retries(
+            self.processes(),
+            self.retries,
+            labels=[f"{first}/{last}" for first, last in self.windows],
+            executor=executor,
+            force=force,
+            **executor_kwargs,
+        )
+        if all(isinstance(result, list) for result in results):
+            return [path for paths in results for path in paths]
+        return results
@@ -1,3 +1,5 @@
+import hashlib
+import json
 from typing import Any, Dict, Type
 
 
@@ -8,3 +10,12 @@ class Singleton(type):
         if cls not in cls._instances:
             cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
         return cls._instances[cls]
+
+
+def canonical_hash(*items: Any) -> str:
+    """Returns a stable SHA-256 hex digest of JSON serializable items.
+
+    Keys are sorted and separators are fixed, so equal data always gives the same hash.
+    """
+    data = json.dumps(items, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
@@ -0,0 +1,92 @@
+import os
+import threading
+from concurrent.futures import Future
+from unittest.mock import Mock
+
+import pytest
+
+from eocanvas.api import Job, Result
+from eocanvas.exceptions import JobFailed
+
+
+class FakeExecutor:
+    """Resolves the futures right away, failing the first submissions of some processes.
+
+    Args:
+        failures: How many submissions fail, either in total or by `key(process)`
+        key: Maps a process to its key in `failures`
+        result: Maps a process and the number of submissions so far to the result
+    """
+
+    def __init__(self, failures=0, key=None, result=None):
+        self.failures = failures if isinstance(failures, int) else dict(failures)
+        self.key = key
+        self.result = result or (lambda process, count: [f"{count}.nc"])
+        self.processes = []
+
+    def submit(self, process, force=False):
+        self.processes.append(process)
+        future = Future()
+        if self._fails(process):
+            future.set_exception(JobFailed("Job failed"))
+        else:
+            future.set_result(self.result(process, len(self.processes)))
+        return future
+
+    def _fails(self, process):
+        if isinstance(self.failures, int):
+            self.failures -= 1
+            return self.failures >= 0
+        key = self.key(process)
+        self.failures[key] = self.failures.get(key, 0) - 1
+        return self.failures[key] >= 0
+
+
+def make_job_api(checks, key):
+    """Returns a fake API for real executors, whose jobs complete in a given order.
+
+    The job of a process is named `key(process)`, and stays running for as many status
+    checks as `checks` gives for it. Its only result is named after it, and its download
+    returns the path the result would have. The job identifiers are appended to
+    `api.completed` as the jobs succeed.
+    """
+    api = Mock()
+    api.ledger = None
+    api.result_cache = None
+    api.completed = []
+    remaining = {}
+    lock = threading.Lock()
+
+    def exec_process(process, force=False, validate=False):
+        job_id = key(process)
+        with lock:
+            remaining[job_id] = checks[job_id]
+        return Job(api=api, job_id=job_id, status="accepted", started=None)
+
+    def get_job(job_id):
+        with lock:
+            remaining[job_id] -= 1
+            status = "running" if remaining[job_id] > 0 else "successful"
+            if status == "successful":
+                api.completed.append(job_id)
+        return Job(api=api, job_id=job_id, status=status, started=None)
+
+    api.exec_process.side_effect = exec_process
+    api.get_job.side_effect = get_job
+    api.get_job_results.side_effect = lambda job: [
+        Result(api=api, href="h", title=f"{job.job_id}.nc")
+    ]
+    api.download_result.side_effect = lambda result, download_dir: os.path.join(
+        download_dir, result.title
+    )
+    return api
+
+
+@pytest.fixture
+def fake_executor():
+    return FakeExecutor
+
+
+@pytest.fixture
+def job_api():
+    return make_job_api
@@ -1,3 +1,6 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 from unittest.mock import Mock, patch
 
@@ -8,9 +11,11 @@ from eocanvas import API
 from eocanvas.api import Job, JobRunner, Key, Paginator, Process, S3KeyConfig, WebDavKeyConfig
 from eocanvas.auth import Credentials
 from eocanvas.config import URLs
-from eocanvas.exceptions import JobFailed
+from eocanvas.exceptions import HTTPError, InvalidGraphError, JobFailed
+from eocanvas.ledger import SubmissionLedger
 from eocanvas.processes import SnapProcess
 from eocanvas.snap.graph import Graph
+from eocanvas.snap.operator import Operator
 
 PROCESSES_RESPONSE = {
     "processes": [
@@ -271,6 +276,133 @@ def test_exec_process(mock_api):
     assert job.status == "accepted"
 
 
+@pytest.fixture
+def ledger(tmp_path):
+    api = API()
+    api.ledger = SubmissionLedger(tmp_path / "submissions.db")
+    yield api.ledger
+    api.ledger = None
+
+
+def _add_exec_and_detail(mock_api, process, status):
+    urls = URLs()
+    job = {
+        "processID": "snap-function",
+        "type": "process",
+        "jobID": "93fc7efb-4860-5de1-bd75-ca850685bed4",
+        "status": status,
+        "started": "2024-08-01:13.23.46",
+    }
+    mock_api.add(
+        responses.POST,
+        url=urls.get("process_execution", process_id=process.process_id),
+        json={**job, "status": "accepted"},
+        status=201,
+    )
+    mock_api.add(
+        responses.GET, url=urls.get("job_detail", job_id=job["jobID"]), json=job, status=200
+    )
+
+
+def test_exec_process_deduplicated(mock_api, ledger):
+    process = Process(process_id="fake_process")
+    _add_exec_and_detail(mock_api, process, "running")
+
+    api = API()
+    job = api.exec_process(process)
+    again = api.exec_process(Process(process_id="fake_process"))
+    assert again.job_id == job.job_id
+    assert again.status == "running"
+    assert len([c for c in mock_api.calls if c.request.url.endswith("/execution")]) == 1
+
+
+def test_exec_process_resubmits_failed_or_forced(mock_api, ledger):
+    process = Process(process_id="fake_process")
+    _add_exec_and_detail(mock_api, process, "failed")
+
+    api = API()
+    api.exec_process(process)
+    api.exec_process(process)
+    api.exec_process(process, force=True)
+    assert len([c for c in mock_api.calls if c.request.url.endswith("/execution")]) == 3
+
+
+def test_exec_process_stale_ledger_entry(mock_api, ledger):
+    process = Process(process_id="fake_process")
+    _add_exec_and_detail(mock_api, process, "running")
+    ledger.record(process.fingerprint(), process.process_id, "stale")
+    mock_api.add(responses.GET, url=URLs().get("job_detail", job_id="stale"), status=404)
+
+    job = API().exec_process(process)
+    assert job.job_id == "93fc7efb-4860-5de1-bd75-ca850685bed4"
+    assert ledger.lookup(process.fingerprint()) == job.job_id
+
+
+def test_exec_process_ledger_during_outage(mock_api, ledger):
+    process = Process(process_id="fake_process")
+    _add_exec_and_detail(mock_api, process, "running")
+    ledger.record(process.fingerprint(), process.process_id, "unavailable")
+    mock_api.add(responses.GET, url=URLs().get("job_detail", job_id="unavailable"), status=503)
+
+    with pytest.raises(HTTPError):
+        API().exec_process(process)
+    assert ledger.lookup(process.fingerprint()) == "unavailable"
+    assert not [c for c in mock_api.calls if c.request.url.endswith("/execution")]
+
+
+def test_exec_process_concurrent_duplicates(mock_api, ledger):
+    process = Process(process_id="fake_process")
+    urls = URLs()
+    job = {
+        "processID": "fake_process",
+        "jobID": "93fc7efb-4860-5de1-bd75-ca850685bed4",
+        "started": "2024-08-01:13.23.46",
+    }
+
+    def slow_post(request):
+        time.sleep(0.1)
+        return 201, {}, json.dumps({**job, "status": "accepted"})
+
+    mock_api.add_callback(
+        responses.POST,
+        url=urls.get("process_execution", process_id=process.process_id),
+        callback=slow_post,
+    )
+    mock_api.add(
+        responses.GET,
+        url=urls.get("job_detail", job_id=job["jobID"]),
+        json={**job, "status": "running"},
+    )
+
+    api = API()
+    with ThreadPoolExecutor(4) as executor:
+        jobs = list(executor.map(lambda _: api.exec_process(process), range(4)))
+    assert {job.job_id for job in jobs} == {"93fc7efb-4860-5de1-bd75-ca850685bed4"}
+    assert len([c for c in mock_api.calls if c.request.url.endswith("/execution")]) == 1
+
+
+def test_exec_process_post_not_retried(mock_api):
+    process = Process(process_id="fake_process")
+    url = URLs().get("process_execution", process_id=process.process_id)
+    mock_api.add(responses.POST, url=url, status=503)
+
+    with pytest.raises(HTTPError):
+        API().exec_process(process)
+    assert len(mock_api.calls) == 1
+
+
+def test_exec_process_validates_graph(mock_api):
+    graph = Graph()
+    graph.add_node(Operator("Read", file="$img1"), "Read")
+    graph.add_node(Operator("Write", formatName="JPEG"), "Write", "Subset")
+    process = SnapProcess(snap_graph=graph)
+
+    api = API()
+    with pytest.raises(InvalidGraphError):
+        api.exec_process(process, validate=True)
+    assert not mock_api.calls
+
+
 def test_get_jobs(mock_api):
     urls = URLs()
     mock_api.add(responses.GET, url=urls.get("job_list"), json=JOBS_RESPONSE, status=200)
@@ -0,0 +1,126 @@
+import pytest
+
+from eocanvas.snap.binning.aggregators import (
+    AggregatorAvg,
+    AggregatorAvgOutlier,
+    AggregatorMinMax,
+    AggregatorOnMaxSet,
+    AggregatorPercentile,
+    AggregatorSum,
+)
+
+np = pytest.importorskip("numpy")
+binner = pytest.importorskip("eocanvas.snap.binning.binner")
+
+
+@pytest.fixture
+def samples():
+    rng = np.random.default_rng(42)
+    bins = rng.integers(0, 50, 5000)
+    values = rng.normal(10.0, 3.0, 5000)
+    values[rng.random(5000) < 0.05] = np.nan
+    other = rng.random(5000)
+    return bins, {"chl": values, "tsm": other}
+
+
+def _per_bin(bins, values, num_bins=51):
+    for index in range(num_bins):
+        selected = values[(bins == index) & ~np.isnan(values)]
+        yield index, selected
+
+
+def test_bin_samples(samples):
+    bins, variables = samples
+    aggregators = [
+        AggregatorAvg("chl", "chl"),
+        AggregatorMinMax("chl", "chl"),
+        AggregatorSum("chl", "chl_total"),
+        AggregatorPercentile("chl", "chl", 75),
+    ]
+    result = binner.bin_samples(aggregators, bins, variables, num_bins=51, chunk_size=777)
+
+    for index, selected in _per_bin(bins, variables["chl"]):
+        if not len(selected):
+            assert np.isnan(result["chl_mean"][index])
+            assert np.isnan(result["chl_min"][index])
+            assert np.isnan(result["chl_p75"][index])
+            assert result["chl_counts"][index] == 0
+            continue
+        assert result["chl_mean"][index] == pytest.approx(selected.mean())
+        assert result["chl_sigma"][index] == pytest.approx(selected.std())
+        assert result["chl_counts"][index] == len(selected)
+        assert result["chl_min"][index] == selected.min()
+        assert result["chl_max"][index] == selected.max()
+        assert result["chl_sum"][index] == pytest.approx(selected.sum())
+        assert result["chl_total_sum"][index] == pytest.approx(selected.sum())
+        assert result["chl_p75"][index] == pytest.approx(np.percentile(selected, 75))
+
+
+def test_bin_samples_weighted():
+    aggregator = AggregatorAvg("chl", "chl", weightCoeff=1.0, outputSums="false")
+    result = binner.bin_samples(
+        [aggregator], [0, 0, 1], {"chl": [1.0, 4.0, 2.0]}, weights=[3.0, 1.0, 2.0]
+    )
+    assert result["chl_mean"].tolist() == [1.75, 2.0]
+    assert "chl_sum" not in result
+
+
+def test_bin_samples_outliers():
+    values = np.array([1.0, 1.1, 0.9, 1.0, 10.0, 5.0])
+    result = binner.bin_samples(
+        [AggregatorAvgOutlier("v", "v")], [0, 0, 0, 0, 0, 1], {"v": values}
+    )
+    assert result["v_mean"][0] == pytest.approx(1.0)
+    assert result["v_counts"].tolist() == [4, 1]
+    assert result["v_mean"][1] == 5.0
+
+
+def test_bin_samples_on_max_set(samples):
+    bins, variables = samples
+    aggregator = AggregatorOnMaxSet("max_chl", "chl", "tsm")
+    result = binner.bin_samples([aggregator], bins, variables, chunk_size=1000)
+
+    for index, _ in _per_bin(bins, variables["chl"], 50):
+        selected = np.flatnonzero((bins == index) & ~np.isnan(variables["chl"]))
+        best = selected[np.argmax(variables["chl"][selected])]
+        assert result["max_chl_max"][index] == variables["chl"][best]
+        assert result["max_chl_tsm"][index] == variables["tsm"][best]
+
+
+def test_binner_chunks_grow_bins():
+    accumulator = binner.Binner([AggregatorSum("v", "v"), AggregatorMinMax("v", "v")])
+    accumulator.update([0, 1], {"v": [1.0, 2.0]})
+    accumulator.update([3], {"v": [5.0]})
+    result = accumulator.result()
+    assert result["v_sum"].tolist() == [1.0, 2.0, 0.0, 5.0]
+    assert np.isnan(result["v_max"][2])
+
+
+def test_binner_invalid_bins():
+    accumulator = binner.Binner([AggregatorSum("v", "v")], num_bins=2)
+    with pytest.raises(ValueError):
+        accumulator.update([2], {"v": [1.0]})
+
+
+def test_binner_duplicated_outputs():
+    with pytest.raises(ValueError, match="chl_sum"):
+        binner.Binner([AggregatorSum("chl", "chl"), AggregatorAvg("chl", "chl")])
+
+
+def test_bin_samples_bounded():
+    rng = np.random.default_rng(1)
+    bins = rng.integers(0, 3, 30000)
+    values = rng.random(30000)
+    accumulator = binner.Binner(
+        [AggregatorPercentile("v", "v", 50), AggregatorAvgOutlier("v", "o")], max_samples=500
+    )
+    for start in range(0, 30000, 4000):
+        chunk = slice(start, start + 4000)
+        accumulator.update(bins[chunk], {"v": values[chunk]})
+
+    assert all(len(a._samples()[0]) <= 3 * 1000 for a in accumulator._accumulators)
+    result = accumulator.result()
+    for index in range(3):
+        selected = values[bins == index]
+        assert result["v_p50"][index] == pytest.approx(np.median(selected), abs=0.05)
+        assert result["o_counts"][index] == pytest.approx(0.58 * len(selected), rel=0.05)
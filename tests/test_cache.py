@@ -0,0 +1,106 @@
+import os
+import time
+from unittest.mock import Mock
+
+from eocanvas.api import Job, Process, Result
+from eocanvas.cache import ResultCache
+from eocanvas.executor import Executor
+
+
+def _make_file(path, size=10):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return str(path)
+
+
+def test_put_and_restore(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    source = _make_file(tmp_path / "out.nc")
+    cache.put("abc", "job1", [{"href": "h", "title": "out.nc", "rel": "result"}], [source])
+    os.remove(source)
+
+    entry = cache.get("abc")
+    assert entry.job_id == "job1"
+    assert entry.results[0]["title"] == "out.nc"
+
+    paths = entry.restore(str(tmp_path / "restored"))
+    assert paths == [str(tmp_path / "restored" / "out.nc")]
+    assert os.path.getsize(paths[0]) == 10
+
+    # Editing a restored file does not change the cached one
+    _make_file(paths[0], size=3)
+    again = cache.get("abc").restore(str(tmp_path / "again"))
+    assert os.path.getsize(again[0]) == 10
+
+
+def test_ttl(tmp_path):
+    cache = ResultCache(tmp_path / "cache", ttl=0.01)
+    cache.put("abc", "job1", [], [])
+    time.sleep(0.02)
+    assert cache.get("abc") is None
+
+
+def test_size_eviction(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_size=25)
+    for name in ("a", "b", "c"):
+        cache.put(name, name, [], [_make_file(tmp_path / f"{name}.nc")])
+        time.sleep(0.01)
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.get("c") is not None
+
+
+def test_put_keeps_new_entry(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_size=25)
+    assert cache.put("big", "big", [], [_make_file(tmp_path / "big.nc", size=30)]) is None
+    assert cache.get("big") is None
+    assert not os.path.exists(tmp_path / "cache" / "big")
+
+    cache = ResultCache(tmp_path / "expiring", ttl=0)
+    entry = cache.put("abc", "job1", [], [_make_file(tmp_path / "out.nc")])
+    assert all(os.path.exists(f) for f in entry.files)
+
+
+def test_process_run_uses_cache(tmp_path):
+    api = Mock()
+    api.result_cache = ResultCache(tmp_path / "cache")
+
+    def download_result(result, download_dir):
+        os.makedirs(download_dir, exist_ok=True)
+        return _make_file(os.path.join(download_dir, result.title))
+
+    api.download_result.side_effect = download_result
+    api.exec_process.return_value = Job(api=api, job_id="job1", status="successful", started=None)
+    api.get_job_results.return_value = [Result(api=api, href="h", title="out.nc")]
+
+    process = Process(api=api, process_id="fake_process")
+    first = process.run(download_dir=str(tmp_path / "first"))
+    second = process.run(download_dir=str(tmp_path / "second"))
+
+    assert api.exec_process.call_count == 1
+    assert first == [str(tmp_path / "first" / "out.nc")]
+    assert second == [str(tmp_path / "second" / "out.nc")]
+
+
+def test_executor_uses_cache(tmp_path):
+    api = Mock()
+    api.result_cache = ResultCache(tmp_path / "cache")
+
+    def download_result(result, download_dir):
+        os.makedirs(download_dir, exist_ok=True)
+        return _make_file(os.path.join(download_dir, result.title))
+
+    api.download_result.side_effect = download_result
+    api.exec_process.return_value = Job(api=api, job_id="job1", status="successful", started=None)
+    api.get_job_results.return_value = [Result(api=api, href="h", title="out.nc")]
+
+    process = Process(api=api, process_id="fake_process")
+    with Executor(download=True, download_dir=str(tmp_path / "{job_id}")) as executor:
+        first = executor.submit(process).result(timeout=5)
+        second = executor.submit(process).result(timeout=5)
+        forced = executor.submit(process, force=True).result(timeout=5)
+
+    assert api.exec_process.call_count == 2
+    assert first == second == forced == [str(tmp_path / "job1" / "out.nc")]
+    assert api.result_cache.get(process.fingerprint()).job_id == "job1"
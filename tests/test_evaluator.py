@@ -0,0 +1,134 @@
+import random
+
+import pytest
+
+from eocanvas.exceptions import InvalidExpressionError
+from eocanvas.snap.expression import simplify
+from eocanvas.snap.binning import BinningVariable, BinningVariables
+from eocanvas.snap.target_band import TargetBand
+from eocanvas.snap.target_band_descriptors import TargetBandDescriptors
+
+np = pytest.importorskip("numpy")
+evaluator = pytest.importorskip("eocanvas.snap.evaluator")
+
+
+def test_evaluate_expression():
+    bands = {"B1": np.array([1.0, -1.0, 4.0]), "B2": np.array([2.0, 2.0, 0.5])}
+    result = evaluator.evaluate("if B1 > 0 then sqrt(B1) / B2 else NaN", bands)
+    np.testing.assert_allclose(result, [0.5, np.nan, 4.0])
+
+    assert evaluator.evaluate("B1 > 0 && !(B2 < 1)", bands).tolist() == [True, False, False]
+    assert evaluator.evaluate("$1.B1 * 2 + PI * 0", bands).tolist() == [2.0, -2.0, 8.0]
+    assert evaluator.evaluate("B1 > 0 && TRUE || False", bands).tolist() == [True, False, True]
+    assert np.isnan(evaluator.evaluate("B1 * NAN", bands)).all()
+
+
+def test_evaluate_integer_division():
+    assert evaluator.evaluate("B / 2", {"B": np.array([7, -7])}).tolist() == [3, -3]
+    assert evaluator.evaluate("B / 2.0", {"B": np.array([7, -7])}).tolist() == [3.5, -3.5]
+    assert np.signbit(evaluator.evaluate("-1 / B", {"B": np.array([2])})).tolist() == [False]
+
+
+def test_evaluate_square_root_powers():
+    bands = {"B": np.array([-np.inf, -0.0, 4.0])}
+    assert evaluator.evaluate("pow(B, 0.5)", bands).tolist() == [np.inf, 0.0, 2.0]
+    assert not np.signbit(evaluator.evaluate("pow(B, 0.5)", bands)).any()
+
+
+def test_evaluate_bitwise_on_floats():
+    bands = {"F": np.array([5.7, -3.2, np.nan]), "M": np.array([True, False, True])}
+    assert evaluator.evaluate("F & 3", bands).tolist() == [1, 1, 0]
+    assert evaluator.evaluate("F | 8", bands).tolist() == [13, -3, 8]
+    assert evaluator.evaluate("(F >> 1) ^ ~0", bands).tolist() == [-3, 1, -1]
+    assert evaluator.evaluate("M & (F > 0)", bands).tolist() == [True, False, False]
+
+
+def test_evaluate_pixel_coordinates():
+    result = evaluator.evaluate("X + 10 * Y", {"B1": np.zeros((2, 3))})
+    assert result.tolist() == [[5.5, 6.5, 7.5], [15.5, 16.5, 17.5]]
+
+
+def test_evaluate_errors():
+    with pytest.raises(InvalidExpressionError, match="missing bands B3"):
+        evaluator.evaluate("B1 + B3", {"B1": np.zeros(2)})
+    with pytest.raises(InvalidExpressionError, match="unsupported function"):
+        evaluator.compile_numpy("unknown(B1)")
+
+
+def _random_expression(rng, numeric=True, depth=4):
+    """Returns a random expression, numeric or boolean, mostly well typed."""
+    if depth == 0 or rng.random() < 0.2:
+        if numeric:
+            return rng.choice(["B1", "I1", "0", "1", "2", "-3", "0.5", "2.0", "PI", "1e300"])
+        return rng.choice(["true", "false", "B1 > 0", "I1 == 1"])
+    depth -= 1
+    if rng.random() < 0.15:
+        # A possibly ill-typed conditional, to check the rejected expressions too
+        condition = _random_expression(rng, False, depth)
+        then = _random_expression(rng, rng.random() < 0.7, depth)
+        otherwise = _random_expression(rng, numeric, depth)
+        return f"({condition} ? {then} : {otherwise})"
+    if not numeric:
+        op = rng.choice(["<", ">=", "==", "&&", "||", "!"])
+        if op == "!":
+            return f"!({_random_expression(rng, False, depth)})"
+        operands = op in ("<", ">=", "==")
+        left, right = (_random_expression(rng, operands, depth) for _ in range(2))
+        return f"({left} {op} {right})"
+    choice = rng.choice(["+", "-", "*", "/", "%", "neg", "sqrt", "abs", "min", "max", "pow"])
+    if choice == "neg":
+        return f"-({_random_expression(rng, True, depth)})"
+    if choice in ("sqrt", "abs"):
+        return f"{choice}({_random_expression(rng, True, depth)})"
+    left, right = (_random_expression(rng, True, depth) for _ in range(2))
+    if choice in ("min", "max", "pow"):
+        return f"{choice}({left}, {right})"
+    return f"({left} {choice} {right})"
+
+
+def test_folding_keeps_values():
+    rng = random.Random(0)
+    bands = {"B1": np.array([-2.5, 0.0, 1.0, 3.0, np.nan]), "I1": np.array([-3, 0, 1, 2, 7])}
+    checked = 0
+    for _ in range(2000):
+        expression = _random_expression(rng)
+        try:
+            folded = evaluator.NumpyExpression(expression)
+        except InvalidExpressionError:
+            # Ill-typed expressions are rejected, and not rewritten into other ones
+            with pytest.raises(InvalidExpressionError):
+                simplify(expression)
+            continue
+        expected = evaluator.NumpyExpression(expression, simplify=False)(bands)
+        result = folded(bands)
+        np.testing.assert_allclose(
+            np.asarray(result, dtype=float), np.asarray(expected, dtype=float), err_msg=expression
+        )
+        evaluator.NumpyExpression(simplify(expression))
+        checked += 1
+    assert checked > 1000
+
+
+def test_evaluate_target_bands():
+    bands = {"B1": np.array([1.0, np.nan, 3.0, 4.0]), "B2": np.array([1, 1, 1, 0])}
+    descriptors = TargetBandDescriptors(
+        [
+            TargetBand("ratio", "B1 / B2"),
+            TargetBand("flag", "B1 &gt; 2", type="uint8", no_data_value="255"),
+        ]
+    )
+    result = descriptors.evaluate(bands, no_data={"B2": 0})
+
+    assert result["ratio"].dtype == np.float32
+    np.testing.assert_allclose(result["ratio"], [1.0, np.nan, 3.0, np.nan])
+    assert result["flag"].dtype == np.uint8
+    assert result["flag"].tolist() == [0, 255, 1, 1]
+
+
+def test_evaluate_binning_variables():
+    variables = BinningVariables(
+        [BinningVariable("ratio", "B1 / B2", "B2 > 0"), BinningVariable("double", "ratio * 2", "")]
+    )
+    result = variables.evaluate({"B1": np.array([1.0, 2.0]), "B2": np.array([2.0, 0.0])})
+    np.testing.assert_allclose(result["ratio"], [0.5, np.nan])
+    np.testing.assert_allclose(result["double"], [1.0, np.nan])
@@ -0,0 +1,126 @@
+import os
+from concurrent.futures import as_completed
+from unittest.mock import Mock
+
+import pytest
+
+from eocanvas.api import Job, Process, Result
+from eocanvas.exceptions import JobFailed
+from eocanvas.executor import Executor, pipeline
+
+
+def make_api(statuses):
+    """Returns a fake API whose jobs go through the given statuses, by job ID."""
+    api = Mock()
+    api.ledger = None
+    api.result_cache = None
+    progress = {job_id: iter(values) for job_id, values in statuses.items()}
+
+    def exec_process(process, force=False, validate=False):
+        return Job(api=api, job_id=process.process_id, status="accepted", started=None)
+
+    def get_job(job_id):
+        return Job(api=api, job_id=job_id, status=next(progress[job_id]), started=None)
+
+    api.exec_process.side_effect = exec_process
+    api.get_job.side_effect = get_job
+    return api
+
+
+def test_submit_resolves_to_jobs():
+    api = make_api({"a": ["running", "successful"], "b": ["successful"]})
+    with Executor(max_workers=2, poll_interval=0.01) as executor:
+        futures = [executor.submit(Process(api=api, process_id=pid)) for pid in ("a", "b")]
+        jobs = [future.result(timeout=5) for future in as_completed(futures)]
+
+    assert sorted(job.job_id for job in jobs) == ["a", "b"]
+    assert all(job.completed for job in jobs)
+
+
+def test_failed_job_raises():
+    api = make_api({"a": ["running", "failed"]})
+    with Executor(poll_interval=0.01) as executor:
+        future = executor.submit(Process(api=api, process_id="a"))
+        with pytest.raises(JobFailed):
+            future.result(timeout=5)
+
+
+def test_same_job_submitted_twice():
+    # The ledger returns the same job to both submissions
+    api = make_api({"same": ["running", "running", "successful", "successful"]})
+    with Executor(max_workers=2, poll_interval=0.01) as executor:
+        futures = [executor.submit(Process(api=api, process_id="same")) for _ in range(2)]
+        jobs = [future.result(timeout=5) for future in futures]
+
+    assert [job.job_id for job in jobs] == ["same", "same"]
+
+
+def test_map_keeps_order():
+    api = make_api({"a": ["running", "running", "successful"], "b": ["successful"]})
+    with Executor(poll_interval=0.01) as executor:
+        jobs = list(executor.map([Process(api=api, process_id=pid) for pid in ("a", "b")]))
+
+    assert [job.job_id for job in jobs] == ["a", "b"]
+
+
+def test_pipeline_downloads_each_job(tmp_path):
+    api = make_api({"a": ["running", "successful"], "b": ["successful"]})
+    api.get_job_results.side_effect = lambda job: [
+        Result(api=api, href="h", title=f"{job.job_id}.nc"),
+        Result(api=api, href="h", title="keystore://key/out.nc"),
+    ]
+    api.download_result.side_effect = lambda result, download_dir: os.path.join(
+        download_dir, result.title
+    )
+
+    processes = [Process(api=api, process_id=pid) for pid in ("a", "b")]
+    download_dir = str(tmp_path / "{job_id}")
+    completed = {
+        process.process_id: paths
+        for process, paths in pipeline(processes, download_dir=download_dir, poll_interval=0.01)
+    }
+
+    assert completed == {"a": [str(tmp_path / "a" / "a.nc")], "b": [str(tmp_path / "b" / "b.nc")]}
+
+
+def test_shutdown_without_wait_keeps_downloading(tmp_path):
+    api = make_api({"a": ["running", "running", "successful"]})
+    api.get_job_results.side_effect = lambda job: [Result(api=api, href="h", title="a.nc")]
+    api.download_result.side_effect = lambda result, download_dir: os.path.join(
+        download_dir, result.title
+    )
+    executor = Executor(poll_interval=0.01, download=True, download_dir=str(tmp_path))
+    future = executor.submit(Process(api=api, process_id="a"))
+    executor.shutdown(wait=False)
+
+    assert future.result(timeout=5) == [str(tmp_path / "a.nc")]
+
+
+def test_monitor_survives_failures():
+    class FailingExecutor(Executor):
+        def _on_success(self, watch):
+            if watch.job.job_id == "bad":
+                raise ValueError("Cannot complete")
+            super()._on_success(watch)
+
+    api = make_api(
+        {"bad": ["running", "successful"], "good": ["running", "running", "successful"]}
+    )
+    with FailingExecutor(max_workers=2, poll_interval=0.01) as executor:
+        bad, good = [executor.submit(Process(api=api, process_id=pid)) for pid in ("bad", "good")]
+        with pytest.raises(ValueError):
+            bad.result(timeout=5)
+        assert good.result(timeout=5).job_id == "good"
+
+
+def test_downloads_default_to_one_directory_per_job(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    api = make_api({"a": ["successful"], "b": ["successful"]})
+    api.get_job_results.side_effect = lambda job: [Result(api=api, href="h", title="out.nc")]
+    api.download_result.side_effect = lambda result, download_dir: os.path.join(
+        download_dir, result.title
+    )
+
+    processes = [Process(api=api, process_id=pid) for pid in ("a", "b")]
+    paths = sorted(path for _, paths in pipeline(processes, poll_interval=0.01) for path in paths)
+    assert paths == [os.path.join("a", "out.nc"), os.path.join("b", "out.nc")]
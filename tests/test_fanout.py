@@ -0,0 +1,94 @@
+from unittest.mock import Mock
+
+import os
+
+import pytest
+
+from eocanvas.api import Config, ConfigOption, Input, Result
+from eocanvas.fanout import FanOut, merge_copies
+from eocanvas.snap import Graph, Operator
+
+
+def _graph():
+    graph = Graph()
+    graph.add_node(Operator("Read", file="$img1"), "Read")
+    graph.add_node(Operator("Subset", region="0,0,10,10"), "Subset", "Read")
+    graph.add_node(Operator("Write", file="output.nc", formatName="NetCDF4-CF"), "Write", "Subset")
+    return graph
+
+
+def _products(count):
+    return [Input(key="img1", url=f"http://example.com/{index}.zip") for index in range(count)]
+
+
+def test_plan_by_count():
+    fan_out = FanOut(_graph(), _products(10), jobs=3, api=Mock())
+    batches = fan_out.plan()
+    assert [len(batch.products) for batch in batches] == [4, 3, 3]
+    assert [p[0].url for p in batches[1].products] == [
+        f"http://example.com/{index}.zip" for index in (4, 5, 6)
+    ]
+    assert len(FanOut(_graph(), _products(10), max_products=4, api=Mock()).plan()) == 3
+    assert len(FanOut(_graph(), _products(2), jobs=5, api=Mock()).plan()) == 2
+
+
+def test_plan_by_size():
+    sizes = [7, 5, 4, 3, 3, 2]
+    products = _products(len(sizes))
+    fan_out = FanOut(
+        _graph(), products, jobs=2, size=lambda p: sizes[products.index(p[0])], api=Mock()
+    )
+    batches = fan_out.plan()
+    assert sorted(batch.size for batch in batches) == [12, 12]
+    assert sum(len(batch.products) for batch in batches) == len(sizes)
+
+
+def test_merge_copies():
+    merged = merge_copies(_graph(), ["img1"], 2)
+    assert list(merged.nodes) == ["Read_1", "Subset_1", "Write_1", "Read_2", "Subset_2", "Write_2"]
+    assert merged.nodes["Read_2"].parameters["file"] == "$img1_2"
+    assert merged.nodes["Subset_2"].source_ids == ["Read_2"]
+    assert merged.nodes["Write_2"].parameters["file"] == "output_2.nc"
+    merged.validate()
+
+
+def test_process_renames_inputs():
+    config = Config("img1", ConfigOption("product.SEN3/xfdumanifest.xml"))
+    fan_out = FanOut(_graph(), _products(3), jobs=2, eo_config=[config], api=Mock())
+    first, second = fan_out.processes()
+    assert [i.key for i in first.eo_input] == ["img1_1", "img1_2"]
+    assert [c.key for c in first.eo_config] == ["img1_1", "img1_2"]
+    assert second.eo_input == [_products(3)[2]]
+    assert second.snap_graph.tostring() == _graph().tostring()
+
+
+def test_submit(fake_executor):
+    executor = fake_executor()
+    handle = FanOut(_graph(), _products(5), jobs=2, api=Mock()).submit(executor=executor)
+    assert handle.wait(1)
+    assert handle.result() == ["1.nc", "2.nc"]
+    assert handle.errors() == {}
+    assert len(executor.processes) == 2
+
+
+def test_invalid_products():
+    with pytest.raises(ValueError):
+        FanOut(_graph(), [Input(key="img2", url="http://example.com/0.zip")], api=Mock())
+
+
+def _product_name(process):
+    return os.path.splitext(os.path.basename(process.eo_input[0].url))[0]
+
+
+def test_submit_downloads_each_job_apart(tmp_path, job_api, fake_executor):
+    # The first job completes last, and every job writes output.nc
+    api = job_api({"0": 6, "1": 1, "2": 3}, key=_product_name)
+    api.get_job_results.side_effect = lambda job: [Result(api=api, href="h", title="output.nc")]
+
+    fan_out = FanOut(_graph(), _products(3), api=api)
+    handle = fan_out.submit(str(tmp_path), poll_interval=0.01)
+    assert handle.result(timeout=5) == [str(tmp_path / job / "output.nc") for job in "012"]
+    assert api.completed.index("1") < api.completed.index("0")
+
+    with pytest.raises(ValueError):
+        fan_out.submit(str(tmp_path), executor=fake_executor())
@@ -2,7 +2,7 @@ import pytest
 import requests
 
 from eocanvas.exceptions import HTTPError
-from eocanvas.http import delete, get, patch, post, put
+from eocanvas.http import delete, get, get_adapter, patch, post, put
 
 
 class MockHTTPResponse:
@@ -35,3 +35,10 @@ def test_request_calls(monkeypatch):
 def test_get_with_retries():
     with pytest.raises(HTTPError):
         get("https://500.returnco.de/whatever")
+
+
+def test_adapter_without_resend():
+    retries = get_adapter(5, 0.25, resend=False).max_retries
+    assert retries.total == 5
+    assert retries.read is False and retries.status == 0 and retries.other == 0
+    assert get_adapter(5, 0.25).max_retries.read is None
@@ -0,0 +1,172 @@
+import os
+from unittest.mock import Mock
+
+import pytest
+import responses
+
+from eocanvas.api import Input
+from eocanvas.exceptions import UnsupportedGraphError
+from eocanvas.processes import SnapProcess
+from eocanvas.snap import Graph, Operator, TargetBand, TargetBandDescriptors
+
+np = pytest.importorskip("numpy")
+local = pytest.importorskip("eocanvas.snap.local")
+
+
+@pytest.fixture
+def netcdf(tmp_path):
+    xr = pytest.importorskip("xarray")
+    pytest.importorskip("h5netcdf")
+    lat = 45.0 - np.arange(20) * 0.1 - 0.05
+    lon = 10.0 + np.arange(30) * 0.1 + 0.05
+    dataset = xr.Dataset(
+        {
+            "B1": (("lat", "lon"), np.arange(600, dtype=np.float32).reshape(20, 30)),
+            "B2": (("lat", "lon"), np.full((20, 30), 2.0, dtype=np.float32)),
+        },
+        coords={"lat": lat, "lon": lon},
+    )
+    dataset["B1"][0, 0] = np.nan
+    path = str(tmp_path / "input.nc")
+    dataset.to_netcdf(path)
+    return path
+
+
+@pytest.fixture
+def geotiff(tmp_path):
+    rasterio = pytest.importorskip("rasterio")
+    from rasterio.transform import from_origin
+
+    path = str(tmp_path / "input.tif")
+    profile = {
+        "driver": "GTiff",
+        "height": 8,
+        "width": 6,
+        "count": 1,
+        "dtype": "uint16",
+        "crs": "EPSG:4326",
+        "transform": from_origin(10.0, 45.0, 0.5, 0.5),
+    }
+    with rasterio.open(path, "w", **profile) as dataset:
+        dataset.write(np.arange(48, dtype=np.uint16).reshape(8, 6), 1)
+    return path
+
+
+def _process(path, *operators, format_name="NetCDF4-CF"):
+    graph = Graph()
+    graph.add_node(Operator("Read", file="$img1"), "Read")
+    source = "Read"
+    for node_id, operator in operators:
+        graph.add_node(operator, node_id, source)
+        source = node_id
+    graph.add_node(Operator("Write", file="$output", formatName=format_name), "Write", source)
+    return SnapProcess(api=Mock(), snap_graph=graph, eo_input=Input(key="img1", url=path))
+
+
+def _band_maths(*target_bands):
+    return Operator("BandMaths", targetBandDescriptors=TargetBandDescriptors(list(target_bands)))
+
+
+def test_run_subset_band_maths(netcdf, tmp_path):
+    xr = pytest.importorskip("xarray")
+    process = _process(
+        netcdf,
+        ("Subset", Operator("Subset", region="2,1,10,5", subSamplingX="2")),
+        ("BandMaths", _band_maths(TargetBand("ratio", "B1 / B2 + X * 0"))),
+    )
+    executor = local.LocalExecutor(block_rows=2)
+    assert executor.check(process) == []
+
+    paths = executor.run(process, str(tmp_path / "out"))
+    assert paths == [str(tmp_path / "out" / "Write.nc")]
+    with xr.open_dataset(paths[0]) as result:
+        expected = np.arange(600).reshape(20, 30)[1:6, 2:12:2] / 2
+        np.testing.assert_allclose(result["ratio"].values, expected)
+        np.testing.assert_allclose(result["lon"].values, 10.3 + np.arange(5) * 0.2)
+
+
+def test_run_geo_region(netcdf, tmp_path):
+    xr = pytest.importorskip("xarray")
+    process = _process(
+        netcdf,
+        ("Subset", Operator("Subset", geoRegion="POLYGON((10 45, 10.5 45, 10.5 44.8, 10 45))")),
+    )
+    paths = local.LocalExecutor().run(process, str(tmp_path))
+    with xr.open_dataset(paths[0]) as result:
+        assert result["B2"].shape == (2, 5)
+        assert np.isnan(result["B1"].values[0, 0])
+
+
+def test_run_resample_geotiff(geotiff, tmp_path):
+    rasterio = pytest.importorskip("rasterio")
+    process = _process(
+        geotiff,
+        ("Resample", Operator("Resample", targetWidth="3", targetHeight="4", downsampling="Mean")),
+        format_name="GeoTIFF",
+    )
+    paths = local.LocalExecutor(block_rows=3).run(process, str(tmp_path))
+    with rasterio.open(paths[0]) as result:
+        data = np.arange(48).reshape(8, 6)
+        expected = data.reshape(4, 2, 3, 2).mean(axis=(1, 3))
+        np.testing.assert_allclose(result.read(1), expected)
+        assert result.transform.a == 1.0
+
+
+def test_check_unsupported(netcdf):
+    process = _process(netcdf, ("Terrain", Operator("Terrain-Flattening")))
+    assert local.LocalExecutor().check(process) == [
+        "Terrain: unsupported operator Terrain-Flattening"
+    ]
+
+    process = _process(netcdf, format_name="BEAM-DIMAP")
+    assert local.LocalExecutor().check(process) == ["Write: unsupported format BEAM-DIMAP"]
+
+    process = _process(netcdf)
+    assert local.LocalExecutor(max_input_size=10).check(process) == [
+        "The inputs are larger than 10 bytes"
+    ]
+    process.eo_input[0].url = "http://example.com/product.zip"
+    assert local.LocalExecutor().check(process) == [
+        "Read: unsupported file http://example.com/product.zip"
+    ]
+    with pytest.raises(UnsupportedGraphError):
+        local.LocalExecutor().run(process)
+
+    process = _process(netcdf, ("Subset", Operator("Subset", tiePointGrids="latitude")))
+    assert local.LocalExecutor().check(process) == ["Subset: unsupported parameter tiePointGrids"]
+
+
+def test_dispatch(netcdf, tmp_path, monkeypatch):
+    remote = []
+    monkeypatch.setattr(SnapProcess, "run", lambda self, **kwargs: remote.append(kwargs) or [])
+
+    paths = local.dispatch(_process(netcdf), str(tmp_path))
+    assert os.path.exists(paths[0]) and remote == []
+
+    local.dispatch(_process(netcdf), str(tmp_path), local.LocalExecutor(max_input_size=10))
+    assert remote == [{"download_dir": str(tmp_path), "force": False}]
+
+
+@responses.activate
+def test_dispatch_locates_remote_inputs_once(netcdf, tmp_path):
+    with open(netcdf, "rb") as f:
+        content = f.read()
+    url = "https://example.com/input.nc"
+    responses.add(responses.HEAD, url, headers={"Content-Length": str(len(content))})
+    responses.add(responses.GET, url, body=content)
+
+    paths = local.dispatch(_process(url), str(tmp_path / "out"))
+    assert os.path.exists(paths[0])
+    assert [call.request.method for call in responses.calls] == ["HEAD", "GET"]
+
+
+def test_dispatch_leaves_no_partial_outputs(netcdf, tmp_path, monkeypatch):
+    remote = []
+    monkeypatch.setattr(SnapProcess, "run", lambda self, **kwargs: remote.append(kwargs) or [])
+    process = _process(netcdf)
+    graph = process.snap_graph
+    graph.add_node(Operator("Write", file="other.nc", formatName="NetCDF4-CF"), "Other", "Missing")
+
+    local.dispatch(process, str(tmp_path / "out"))
+    assert len(remote) == 1
+    assert os.listdir(tmp_path / "out") == []
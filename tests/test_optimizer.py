@@ -0,0 +1,244 @@
+import os
+
+import pytest
+
+from eocanvas.exceptions import InvalidExpressionError, InvalidGraphError
+from eocanvas.snap.binning import Aggregators, BinningVariable, BinningVariables
+from eocanvas.snap.binning.aggregators import AggregatorAvg, AggregatorMinMax
+from eocanvas.snap.expression import compile_expression, references, simplify, substitute
+from eocanvas.snap.graph import Graph
+from eocanvas.snap.operator import Operator
+from eocanvas.snap.optimizer import optimize, topological_sort
+from eocanvas.snap.target_band import TargetBand
+from eocanvas.snap.target_band_descriptors import TargetBandDescriptors
+
+
+def band_maths(*bands, type="float32"):
+    descriptors = TargetBandDescriptors(
+        [TargetBand(name, expression, type=type) for name, expression in bands]
+    )
+    return Operator("BandMaths", targetBandDescriptors=descriptors)
+
+
+def expressions(node):
+    return [e.text for e in node.parameters["targetBands"].iter("expression")]
+
+
+def test_expression_substitute():
+    expression = "if LAND then NaN else max(CHL, 0.5e-3) * $1.B1"
+    assert references(expression) == {"LAND", "CHL", "$1.B1"}
+    assert substitute(expression, {"CHL": "a + b", "max": "x"}) == (
+        "if LAND then NaN else max((a + b), 0.5e-3) * $1.B1"
+    )
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("(B1 + B2) * (2 * PI / 360) - 0", "(B1 + B2) * 0.017453292519943295"),
+        ("if 1 < 2 then B1 else 0", "B1"),
+        ("if 1 < 2 then B1 else B2", "if true then B1 else B2"),
+        ("if 1 > 2 then B1 else sqrt(B2)", "sqrt(B2)"),
+        ("if LAND then B1 * 1.0 * 1 else (B1 * 1.0)", "B1 * 1.0"),
+        ("-(-B1) - (B2 - B3)", "B1 - (B2 - B3)"),
+        ("7 / 2 + 7.0 / 2", "7 / 2 + 3.5"),
+        ("2147483647 + 1", "2147483647 + 1"),
+        ("B1 &lt; 0 &amp;&amp; B2", "B1 &lt; 0 &amp;&amp; B2"),
+        ("a ? b : (c ? d : e)", "a ? b : c ? d : e"),
+        ("(if a then b else c) * max(1, 2)", "(if a then b else c) * 2"),
+    ],
+)
+def test_compile_expression(expression, expected):
+    assert compile_expression(expression) == expected
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "B1 +",
+        "(B1",
+        "B1 B2",
+        "max(1,",
+        "if a then b",
+        "",
+        "sqrt(B1, B2)",
+        "abs(false, B2)",
+        "max(B1)",
+        "-(c ? true : x)",
+        "(3 < -B2) / -(true ? true : 0)",
+        "(B1 > 0) + 1",
+        "sqrt(B1 < 0)",
+        "- -true",
+        "false ? -true : 1.0",
+    ],
+)
+def test_invalid_expression(expression):
+    with pytest.raises(InvalidExpressionError):
+        compile_expression(expression)
+
+
+def test_expression_bands():
+    bands = ["B1", "B2", "WQSF_lsb"]
+    assert compile_expression("B1.raw + $2.B2 * WQSF_lsb_LAND", bands=bands)
+    with pytest.raises(InvalidExpressionError, match="unknown bands B3"):
+        compile_expression("B1 + B3", bands=bands)
+
+
+def test_topological_sort():
+    g = Graph()
+    g.add_node(Operator("Write"), "Write", "Subset")
+    g.add_node(Operator("Subset"), "Subset", "Read")
+    g.add_node(Operator("Read"), "Read")
+    assert topological_sort(g) == ["Read", "Subset", "Write"]
+
+    g.add_node(Operator("Read"), "Read", "Write")
+    with pytest.raises(InvalidGraphError):
+        topological_sort(g)
+
+
+def test_prune_dead_nodes():
+    g = Graph()
+    g.add_node(Operator("Read"), "Read")
+    g.add_node(Operator("Subset"), "Unused", "Read")
+    g.add_node(Operator("Write"), "Write", "Read")
+
+    optimized, report = optimize(g)
+    assert report.removed == ["Unused"]
+    assert list(optimized.nodes) == ["Read", "Write"]
+    assert "Unused" in g.nodes
+
+
+def test_push_down_subset():
+    g = Graph()
+    g.add_node(Operator("Read"), "Read")
+    g.add_node(Operator("Reproject", crs="EPSG:4326"), "Reproject", "Read")
+    g.add_node(Operator("Subset", bandNames="B1,B2"), "Subset", "Reproject")
+    g.add_node(Operator("Write"), "Write", "Subset")
+
+    optimized, report = optimize(g)
+    assert report.pushed_down == [("Subset", "Reproject")]
+    assert list(optimized.nodes) == ["Read", "Subset", "Reproject", "Write"]
+    assert optimized.nodes["Subset"].source_ids == ["Read"]
+    assert optimized.nodes["Write"].source_ids == ["Reproject"]
+
+
+def test_pixel_subset_not_pushed_down():
+    g = Graph()
+    g.add_node(Operator("Read"), "Read")
+    g.add_node(Operator("Reproject", crs="EPSG:4326"), "Reproject", "Read")
+    g.add_node(Operator("Subset", region="0,0,10,10"), "Subset", "Reproject")
+    g.add_node(Operator("Write"), "Write", "Subset")
+
+    _, report = optimize(g)
+    assert not report
+
+
+def test_fuse_band_maths():
+    g = Graph()
+    g.add_node(Operator("Read"), "Read")
+    g.add_node(band_maths(("a", "B1 + B2"), ("b", "B3")), "First", "Read")
+    g.add_node(band_maths(("c", "a * b - a")), "Second", "First")
+    g.add_node(Operator("Write"), "Write", "Second")
+
+    optimized, report = optimize(g)
+    assert report.fused == [("First", "Second")]
+    assert optimized.nodes["Second"].source_ids == ["Read"]
+    assert expressions(optimized.nodes["Second"]) == ["(B1 + B2) * B3 - (B1 + B2)"]
+
+
+def test_simplify_expressions():
+    g = Graph()
+    g.add_node(Operator("Read"), "Read")
+    g.add_node(band_maths(("a", "B1 * (10 / 2.0) - 0"), ("b", "B2")), "BandMaths", "Read")
+    g.add_node(Operator("Write"), "Write", "BandMaths")
+
+    optimized, report = optimize(g)
+    assert expressions(optimized.nodes["BandMaths"]) == ["B1 * 5.0", "B2"]
+    assert report.simplified == [("BandMaths", "B1 * (10 / 2.0) - 0", "B1 * 5.0")]
+
+
+def test_simplify_keeps_result_types():
+    # A 0/1 band stays numeric, and mixed arguments fold to a float as in SNAP
+    assert simplify("LAND - 0") == "LAND - 0"
+    assert simplify("1 * (LAND ? 1 : B2)") == "1 * (LAND ? 1 : B2)"
+    assert simplify("(B1 + B2) * 1") == "B1 + B2"
+    assert simplify("min(1, 2.0)") == "1.0"
+    assert simplify("max(2, 3)") == "3"
+
+
+def test_validate_expressions():
+    g = Graph()
+    g.add_node(Operator("Read"), "Read")
+    g.add_node(band_maths(("a", "B1 * (B2")), "BandMaths", "Read")
+    errors = g.validate(strict=False)
+    assert len(errors) == 1 and "Node BandMaths: Invalid expression" in errors[0]
+
+
+def test_integer_band_maths_not_fused():
+    g = Graph()
+    g.add_node(Operator("Read"), "Read")
+    g.add_node(band_maths(("a", "B1 / 2"), type="int16"), "First", "Read")
+    g.add_node(band_maths(("c", "a * 2")), "Second", "First")
+    g.add_node(Operator("Write"), "Write", "Second")
+
+    _, report = optimize(g)
+    assert report.fused == []
+
+
+def test_band_maths_with_no_data_value_not_fused():
+    g = Graph()
+    g.add_node(Operator("Read"), "Read")
+    descriptors = TargetBandDescriptors([TargetBand("a", "B1 / 2", no_data_value="-1")])
+    g.add_node(Operator("BandMaths", targetBandDescriptors=descriptors), "First", "Read")
+    g.add_node(band_maths(("c", "a * 2")), "Second", "First")
+    g.add_node(Operator("Write"), "Write", "Second")
+
+    _, report = optimize(g)
+    assert report.fused == []
+
+    g.nodes["First"].parameters["targetBands"].find("targetBand/no_data_value").text = "NaN"
+    _, report = optimize(g)
+    assert report.fused == [("First", "Second")]
+
+
+def test_prune_unused_bands():
+    g = Graph.from_uri(f"{os.path.dirname(__file__)}/data/graph.xml")
+    g.add_node(
+        Operator(
+            "Read", file="$img1", bandNames="CHL_NN,CHL_OC4ME,Oa01,WQSF_lsb,WQSF_msb,latitude"
+        ),
+        "Read",
+    )
+
+    optimized, report = optimize(g)
+    assert optimized.nodes["Read"].parameters["bandNames"] == (
+        "CHL_NN,CHL_OC4ME,WQSF_lsb,WQSF_msb,latitude"
+    )
+    assert report.pruned_bands == {"Read": ["Oa01"]}
+
+
+def test_prune_binning_bands():
+    variables = BinningVariables([BinningVariable("ratio", "B1 / B2", "B3 > 0")])
+    aggregators = Aggregators([AggregatorAvg("ratio", "ratio_avg"), AggregatorMinMax("B4", "B4")])
+    g = Graph()
+    g.add_node(Operator("Read", bandNames="B1,B2,B3,B4,B5,B6"), "Read")
+    g.add_node(
+        Operator("Binning", variableConfigs=variables, aggregatorConfigs=aggregators),
+        "Binning",
+        "Read",
+    )
+    g.add_node(Operator("Write"), "Write", "Binning")
+
+    optimized, _ = optimize(g)
+    assert optimized.nodes["Read"].parameters["bandNames"] == "B1,B2,B3,B4"
+
+
+def test_unknown_operator_keeps_bands():
+    g = Graph()
+    g.add_node(Operator("Read", bandNames="B1,B2"), "Read")
+    g.add_node(Operator("Terrain-Correction"), "Terrain-Correction", "Read")
+    g.add_node(band_maths(("a", "B1")), "BandMaths", "Terrain-Correction")
+    g.add_node(Operator("Write"), "Write", "BandMaths")
+
+    _, report = optimize(g)
+    assert report.pruned_bands == {}
@@ -1,6 +1,7 @@
 from eocanvas.api import Config, ConfigOption, Input, Key, Process
 from eocanvas.datatailor import Chain
-from eocanvas.processes import DataTailorProcess
+from eocanvas.processes import DataTailorProcess, SnapProcess
+from eocanvas.snap import Graph, GraphTemplate, Operator
 
 
 def test_prepare_inputs_with_no_outputs():
@@ -90,3 +91,17 @@ def test_data_tailor_prepare_inputs_with_input_key_and_config():
         "outputs": {},
         "response": "raw",
     }
+
+
+def test_snap_fingerprint_uses_graph_fingerprint():
+    graph = Graph()
+    graph.add_node(Operator("Read", file="$img1"), "Read")
+    graph.add_node(Operator("Write", file="$output"), "Write", "Read")
+    rendered = GraphTemplate(graph).bind(output="out.tif")
+    graph.add_node(Operator("Write", file="out.tif"), "Write")
+
+    eo_input = Input(key="img1", url="http://example.com/product.zip")
+    assert (
+        SnapProcess(snap_graph=graph, eo_input=eo_input).fingerprint()
+        == SnapProcess(snap_graph=rendered, eo_input=eo_input).fingerprint()
+    )
@@ -0,0 +1,60 @@
+import pytest
+
+from eocanvas.config import URLs
+from eocanvas.exceptions import RateLimitError
+from eocanvas.ratelimit import RateLimiter, SQLiteTokenBucket, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_bucket_allows_burst_then_waits():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+    assert [bucket.try_acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.try_acquire() == pytest.approx(0.5)
+
+    bucket.acquire()
+    assert clock.now == pytest.approx(0.5)
+
+
+def test_bucket_timeout():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+    with pytest.raises(RateLimitError):
+        bucket.acquire(timeout=0.1)
+
+
+def test_sqlite_bucket_is_shared(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "buckets.db"
+    first = SQLiteTokenBucket(path, "job_detail", rate=1, capacity=2, clock=clock)
+    second = SQLiteTokenBucket(path, "job_detail", rate=1, capacity=2, clock=clock)
+    assert first.try_acquire() == 0
+    assert second.try_acquire() == 0
+    assert first.try_acquire() == pytest.approx(1.0)
+
+
+def test_rate_limiter_buckets():
+    shared = TokenBucket(rate=1)
+    limiter = RateLimiter(
+        {"job_detail": 5, "job_logs": shared, "job_results": shared, "process_execution": (1, 2)},
+        urls=URLs(),
+    )
+    assert limiter.bucket("job_logs") is limiter.bucket("job_results")
+    assert limiter.bucket("process_execution").capacity == 2
+    assert limiter.bucket("key_list") is None
+
+
+def test_rate_limiter_unknown_endpoint():
+    with pytest.raises(ValueError):
+        RateLimiter({"unknown": 1}, urls=URLs())
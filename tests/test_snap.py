@@ -1,8 +1,30 @@
+import io
+import json
 import os
 import xml.etree.ElementTree as ET
 from base64 import b64decode
+from collections import OrderedDict
 
+import lxml.etree as etree
+import pytest
+import responses
+
+from eocanvas.exceptions import InvalidGraphError
+from eocanvas.snap.binning import Aggregators, BinningVariable, BinningVariables
+from eocanvas.snap.binning.aggregators import (
+    AggregatorAvg,
+    AggregatorOnMaxSet,
+    AggregatorPercentile,
+)
+from eocanvas.snap import graph as graph_module
 from eocanvas.snap.graph import Graph
+from eocanvas.snap.index import JSON_FILENAME, MAGIC, OperatorIndex, build_index, is_current
+from eocanvas.snap.operator import Operator
+from eocanvas.snap.snap import Snap
+from eocanvas.snap.target_band import TargetBand
+from eocanvas.snap.target_band_descriptors import TargetBandDescriptors
+from eocanvas.snap.template import GraphTemplate
+from eocanvas.snap.xmlwriter import dump
 
 
 def test_graph_load():
@@ -11,3 +33,314 @@ def test_graph_load():
     encoded = g.b64encode()
     g2 = Graph.from_text(b64decode(encoded))
     assert ET.tostring(g.root) == ET.tostring(g2.root)
+
+
+def test_add_node():
+    g = Graph()
+    g.add_node(Operator("Read", file="$img1"), "Read")
+    g.add_node(Operator("Subset", region="0,0,10,10"), "Subset", "Read")
+    g.add_node(Operator("Write", file="out.tif"), "Write", ["Subset"])
+
+    assert [n.attrib["id"] for n in g.root.iterfind("node")] == ["Read", "Subset", "Write"]
+    assert g.root.find("node[@id='Subset']/sources/sourceProduct").attrib["refid"] == "Read"
+    assert g.root.find("node[@id='Subset']/parameters/region").text == "0,0,10,10"
+    params = [p.tag for p in g.root.find("node[@id='Subset']/parameters")]
+    assert params == sorted(params)
+
+
+def test_add_node_overwrites():
+    g = Graph()
+    g.add_node(Operator("Read", file="$img1"), "Read")
+    g.add_node(Operator("Subset", region="0,0,10,10"), "Subset", "Read")
+    g.add_node(Operator("Subset", region="5,5,10,10"), "Subset")
+
+    assert len(g.root.findall("node")) == 2
+    assert len(g.root.findall("node[@id='Subset']/parameters/region")) == 1
+    assert g.root.find("node[@id='Subset']/parameters/region").text == "5,5,10,10"
+    assert g.root.find("node[@id='Subset']/sources/sourceProduct").attrib["refid"] == "Read"
+
+
+def test_add_node_on_loaded_graph():
+    g = Graph.from_uri(f"{os.path.dirname(__file__)}/data/graph.xml")
+    g.add_node(Operator("Write", file="other.nc", formatName="NetCDF4-CF"), "Write")
+    assert len(g.root.findall("node[@id='Write']")) == 1
+    assert g.root.find("node[@id='Write']/parameters/file").text == "other.nc"
+
+
+def test_graph_serialization_is_cached():
+    g = Graph.from_uri(f"{os.path.dirname(__file__)}/data/graph.xml")
+    assert g.tostring() is g.tostring()
+
+    g.add_node(Operator("Write", file="other.nc"), "Write")
+    assert b"other.nc" in g.tostring()
+    assert len(g.tostring(pretty_print=False)) < len(g.tostring())
+    assert Graph.from_text(b64decode(g.b64encode(minify=True))).tostring() == g.tostring()
+
+
+def test_graph_root_assignment_and_copy():
+    g = Graph.from_uri(f"{os.path.dirname(__file__)}/data/graph.xml")
+    root = g.root
+    assert g.root is root
+    root.find("node[@id='Read']/parameters/file").text = "$img2"
+    assert b"$img2" in g.tostring()
+    assert g.nodes["Read"].parameters["file"] == "$img2"
+
+    # Editing the nodes rebuilds the element
+    g.nodes["Read"].parameters["file"] = "$img3"
+    g.invalidate()
+    assert g.root is not root
+    assert g.root.find("node[@id='Read']/parameters/file").text == "$img3"
+
+    g.root = root
+    assert g.nodes["Read"].parameters["file"] == "$img2"
+    root.find("node[@id='Read']/parameters/file").text = "$img4"
+    assert g.nodes["Read"].parameters["file"] == "$img4"
+
+    copy = g.copy()
+    copy.remove_node("Write")
+    assert "Write" in g.nodes
+    assert "Write" not in copy.nodes
+
+    empty = g.copy(nodes=False)
+    assert not empty.nodes and empty.version == g.version
+    empty.set_node(g.nodes["Read"].copy())
+    assert list(empty.nodes) == ["Read"]
+    assert b"$img4" in empty.tostring()
+
+
+def test_template_render():
+    g = Graph()
+    g.add_node(Operator("Read", file="$img1"), "Read")
+    g.add_node(Operator("Subset", region="${region}"), "Subset", "Read")
+    g.add_node(Operator("Write", file="$output"), "Write", "Subset")
+    template = GraphTemplate(g)
+
+    assert template.placeholders == ("img1", "region", "output")
+
+    rendered = template.graph(region="0,0,10,10", output="a&b.tif")
+    assert rendered.nodes["Read"].parameters["file"] == "$img1"
+    assert rendered.nodes["Subset"].parameters["region"] == "0,0,10,10"
+    assert rendered.nodes["Write"].parameters["file"] == "a&b.tif"
+    assert b"a&amp;b.tif" in template.render(output="a&b.tif")
+
+
+def test_template_matches_graph():
+    g = Graph()
+    g.add_node(Operator("Read", file="$img1"), "Read")
+    g.add_node(Operator("Write", file="$output"), "Write", "Read")
+    template = GraphTemplate(g)
+
+    g.add_node(Operator("Write", file="out.tif"), "Write", "Read")
+    bound = template.bind(output="out.tif")
+    assert bound.b64encode() == g.b64encode()
+    assert template.b64encode(output="out.tif") == g.b64encode()
+
+
+def test_validate():
+    g = Graph.from_uri(f"{os.path.dirname(__file__)}/data/graph.xml")
+    assert g.validate() == []
+
+    g.add_node(Operator("Reproject", resamplingName="Cubic"), "Reproject")
+    g.add_node(Operator("Write", formatName="JPEG", unknown="1"), "Write", "Missing")
+    g.add_node(Operator("Subset"), "Subset", "Loop")
+    g.add_node(Operator("Subset"), "Loop", "Subset")
+    errors = g.validate(strict=False)
+
+    assert errors == [
+        "Node Reproject: invalid resamplingName value 'Cubic'",
+        "Node Write: invalid formatName value 'JPEG'",
+        "Node Write: unknown parameter unknown for Write",
+        "Node Write: source Missing not found",
+        "Cycle between nodes Subset, Loop",
+    ]
+    with pytest.raises(InvalidGraphError):
+        g.validate()
+
+
+def test_fingerprint():
+    g = Graph()
+    g.add_node(Operator("Read", file="$img1"), "Read")
+    g.add_node(Operator("Subset", region="0,0,10,10"), "Subset", "Read")
+    g.add_node(Operator("Write", file="out.tif"), "Write", "Subset")
+
+    renamed = Graph()
+    renamed.add_node(Operator("Read", file=" $img1 "), "Input")
+    renamed.add_node(Operator("Subset", region="0,0,10,10", copyMetadata="false"), "Crop", "Input")
+    renamed.add_node(Operator("Write", file="out.tif"), "Output", "Crop")
+    assert g.fingerprint() == renamed.fingerprint()
+
+    before = g.fingerprint()
+    g.add_node(Operator("Subset", region="0,0,20,20"), "Subset")
+    assert g.fingerprint() != before
+
+
+def test_diff():
+    g = Graph()
+    g.add_node(Operator("Read", file="$img1"), "Read")
+    g.add_node(Operator("Subset", region="0,0,10,10"), "Subset", "Read")
+    g.add_node(Operator("Write", file="out.tif"), "Write", "Subset")
+
+    other = g.copy()
+    other.remove_node("Read")
+    other.add_node(Operator("Read", file="$img1"), "Input")
+    other.add_node(Operator("Subset", region="0,0,20,20"), "Subset", "Input")
+    other.add_node(Operator("Write", file="out.tif"), "Output", "Subset")
+    other.remove_node("Write")
+
+    diff = g.diff(other)
+    assert diff.renamed == [("Read", "Input")]
+    assert diff.changed == {"Subset": ["region"]}
+    assert diff.removed == ["Write"]
+    assert diff.added == ["Output"]
+    assert not g.diff(g.copy())
+
+
+@responses.activate
+def test_graph_from_url_cached_by_etag():
+    with open(f"{os.path.dirname(__file__)}/data/graph.xml", "rb") as f:
+        content = f.read()
+
+    def callback(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return 304, {}, b""
+        return 200, {"ETag": '"v1"'}, content
+
+    url = "https://example.com/graph.xml"
+    responses.add_callback(responses.GET, url, callback=callback)
+
+    g = Graph.from_uri(url)
+    again = Graph.from_uri(url)
+    assert [c.response.status_code for c in responses.calls] == [200, 304]
+    assert again.tostring() == g.tostring()
+    assert again is not g
+
+
+@responses.activate
+def test_graph_url_cache_is_bounded(monkeypatch):
+    with open(f"{os.path.dirname(__file__)}/data/graph.xml", "rb") as f:
+        content = f.read()
+    monkeypatch.setattr(graph_module, "_REMOTE_GRAPHS", OrderedDict())
+    monkeypatch.setattr(graph_module, "_REMOTE_GRAPHS_MAX_SIZE", 2)
+    for name in ("a", "b", "c"):
+        url = f"https://example.com/{name}.xml"
+        responses.add(responses.GET, url, body=content, headers={"ETag": '"v1"'})
+        Graph.from_uri(url)
+
+    assert list(graph_module._REMOTE_GRAPHS) == [
+        "https://example.com/b.xml",
+        "https://example.com/c.xml",
+    ]
+
+
+def test_operator_index_matches_json(tmp_path):
+    with open(JSON_FILENAME) as f:
+        operators = json.load(f)
+    index = OperatorIndex()
+    assert list(index) == list(operators)
+    assert all(index[name] == operator for name, operator in operators.items())
+
+    invalid = tmp_path / "operators.idx"
+    invalid.write_bytes(b"{}")
+    with pytest.raises(ValueError):
+        OperatorIndex(str(invalid))
+    invalid.write_bytes(MAGIC + b"\x05")
+    with pytest.raises(ValueError):
+        OperatorIndex(str(invalid))
+
+
+def test_operator_index_is_current(tmp_path):
+    assert is_current()
+
+    source, target = tmp_path / "operators.json", tmp_path / "operators.idx"
+    source.write_text('{"Read": {"parameters": []}}')
+    build_index(str(source), str(target))
+    assert is_current(str(source), str(target))
+    assert OperatorIndex(str(target), str(source))["Read"] == {"parameters": []}
+
+    source.write_text('{"Read": {"parameters": []}, "Write": {"parameters": []}}')
+    assert not is_current(str(source), str(target))
+    with pytest.raises(ValueError, match="out of date"):
+        OperatorIndex(str(target), str(source))
+
+
+def test_operator_with_params():
+    subset = Operator("Subset", region="0,0,10,10")
+    subset.copyMetadata = "true"
+    other = subset.with_params(region="10,0,10,10")
+
+    assert subset.region == "0,0,10,10"
+    assert other.region == "10,0,10,10"
+    assert other.copyMetadata == "true"
+    assert other.subSamplingX == "1"
+    assert other.to_dict().keys() == subset.to_dict().keys()
+    with pytest.raises(AttributeError):
+        subset.unknown
+
+    g = Graph()
+    g.add_node(other, "Subset")
+    assert g.nodes["Subset"].parameters["region"] == "10,0,10,10"
+    assert g.nodes["Subset"].parameters["copyMetadata"] == "true"
+
+
+def test_search_operators():
+    results = Snap().search("terrain correction", limit=3)
+    assert results[0].operator in {"Terrain-Correction", "SARSim-Terrain-Correction"}
+    assert [r.score for r in results] == sorted((r.score for r in results), reverse=True)
+
+    subset = Snap().search("subset region")[0]
+    assert subset.operator == "Subset"
+    assert "geoRegion" in subset.parameters
+
+    assert Snap().search("reproj")[0].operator in {"Reproject", "S2tbx-Reproject"}
+    assert Snap().search("bilinear")[0].parameters
+    assert Snap().search("cloud", limit=2) == Snap().search("Cloud", limit=2)
+    assert Snap().search("zzzz") == []
+
+
+def test_describe_operators_from_any_directory(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    descriptions = Graph.describe_operators()
+    assert set(descriptions) == set(Graph.list_operators())
+    assert "Subset - " in capsys.readouterr().out
+
+
+def test_graph_write_matches_tostring(tmp_path):
+    g = Graph.from_uri(f"{os.path.dirname(__file__)}/data/graph.xml")
+    g.add_node(Operator("Subset", region="0,0,10,10", geoRegion=None), "Subset", "Read")
+    g.add_node(Operator("Write", file="out&<é>.tif"), "Write", {"sourceProduct": "Subset"})
+
+    for pretty_print in (True, False):
+        buffer = io.BytesIO()
+        g.write(buffer, pretty_print=pretty_print)
+        assert buffer.getvalue() == etree.tostring(g.root, pretty_print=pretty_print)
+
+    g.write(str(tmp_path / "graph.xml"))
+    assert Graph.from_uri(str(tmp_path / "graph.xml")).fingerprint() == g.fingerprint()
+
+
+def test_dump_configurations():
+    bands = TargetBandDescriptors(
+        [TargetBand("a", "B1 > 0 && B2 < 1"), TargetBand("b", "B3", unit="m")]
+    )
+    aggregators = Aggregators(
+        [AggregatorAvg("a", "a_avg"), AggregatorOnMaxSet("a", "b"), AggregatorPercentile("a", "p")]
+    )
+    variables = BinningVariables([BinningVariable("v", "B1 / B2", None)])
+
+    for config in (bands, aggregators, variables, Aggregators([])):
+        for pretty_print in (True, False):
+            buffer = io.BytesIO()
+            dump(config, buffer, pretty_print)
+            assert buffer.getvalue() == etree.tostring(config.to_xml(), pretty_print=pretty_print)
+
+    aggregator = AggregatorAvg("a", "a_avg")
+    aggregator.type = "SUM"
+    assert aggregator.to_dict()["type"] == "AVG"
+    assert (
+        repr(aggregator)
+        == str(aggregator)
+        == (
+            "AggregatorAvg(type='AVG', varName='a', targetName='a_avg', weightCoeff='0.0', "
+            "outputCounts='true', outputSums='true')"
+        )
+    )
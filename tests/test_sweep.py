@@ -0,0 +1,115 @@
+from unittest.mock import Mock
+
+import pytest
+
+from eocanvas.datatailor.chain import Chain
+from eocanvas.exceptions import InvalidChainError
+from eocanvas.snap import Graph, Operator
+from eocanvas.snap.binning import Aggregators, BinningVariable, BinningVariables
+from eocanvas.snap.binning.aggregators import AggregatorAvg, AggregatorPercentile
+from eocanvas.sweep import Sweep
+
+
+def _chain():
+    return Chain(product="HRSEVIRI", format="geotiff", roi={"NSWE": "50,40,0,10"})
+
+
+def _graph():
+    aggregators = Aggregators(
+        [AggregatorAvg("chl", "chl_avg"), AggregatorPercentile("chl", "chl", 90)]
+    )
+    graph = Graph()
+    graph.add_node(Operator("Read", file="$img1"), "Read")
+    graph.add_node(Operator("Subset", region="0,0,10,10"), "Subset", "Read")
+    graph.add_node(
+        Operator(
+            "Binning",
+            variableConfigs=BinningVariables([BinningVariable("chl", "CHL", None)]),
+            aggregatorConfigs=aggregators,
+        ),
+        "Binning",
+        "Subset",
+    )
+    graph.add_node(Operator("Write", file="output.nc"), "Write", "Binning")
+    return graph
+
+
+def test_chain_variants():
+    sweep = Sweep(
+        _chain(),
+        {"projection": ["geographic", "mercator"], "roi.NSWE": ["50,40,0,10", "60,50,0,10"]},
+        api=Mock(),
+    )
+    variants = list(sweep.variants())
+    assert [v.params for v in variants][1] == {
+        "projection": "geographic",
+        "roi.NSWE": "60,50,0,10",
+    }
+    assert variants[1].target.roi.NSWE == "60,50,0,10"
+    assert variants[1].target.product == "HRSEVIRI"
+    assert len({v.fingerprint for v in variants}) == 4
+    assert sweep.process(variants[0]).epct_chain.projection == "geographic"
+
+    with pytest.raises(InvalidChainError):
+        next(Sweep(_chain(), {"unknown": [1]}).variants())
+
+
+def test_graph_variants():
+    sweep = Sweep(
+        _graph(),
+        {"Subset.region": ["0,0,5,5", "0,0,20,20"], "AggregatorPercentile.percentage": [50, 75]},
+        mode="zip",
+    )
+    variants = list(sweep.variants())
+    assert len(variants) == 2
+    binning = variants[1].target.nodes["Binning"].parameters["aggregators"]
+    percentiles = [a for a in binning.iter("aggregator") if a.findtext("type") == "PERCENTILE"]
+    assert percentiles[0].findtext("percentage") == "75"
+    assert variants[1].target.nodes["Subset"].parameters["region"] == "0,0,20,20"
+    assert sweep.base.nodes["Subset"].parameters["region"] == "0,0,10,10"
+
+    with pytest.raises(ValueError):
+        Sweep(_graph(), {"Subset.region": ["0,0,5,5"], "PERCENTILE.percentage": [50, 75]}, "zip")
+    with pytest.raises(ValueError):
+        next(Sweep(_graph(), {"Unknown.value": [1]}).variants())
+
+
+def test_run_dedupes_variants(fake_executor):
+    # A region given as a list is the same graph as the string
+    sweep = Sweep(_graph(), {"Subset.region": ["0,0,5,5", [0, 0, 5, 5], "0,0,20,20"]}, api=Mock())
+    executor = fake_executor()
+    table = sweep.run(max_pending=1, executor=executor)
+    assert len(executor.processes) == 2
+    assert [row["result"] for row in table] == [["1.nc"], ["1.nc"], ["2.nc"]]
+    assert table.rows[0]["fingerprint"] == table.rows[1]["fingerprint"]
+    assert table.columns == ["Subset.region", "fingerprint", "result", "error"]
+
+
+def test_run_retries_and_failures(tmp_path, fake_executor):
+    sweep = Sweep(_chain(), {"projection": ["geographic", "mercator"]}, api=Mock())
+    table = sweep.run(retries=1, executor=fake_executor(failures=1))
+    assert not table.failed
+
+    table = sweep.run(retries=1, executor=fake_executor(failures=4))
+    assert len(table.failed) == 2
+    table.to_csv(tmp_path / "sweep.csv")
+    header = (tmp_path / "sweep.csv").read_text().splitlines()[0]
+    assert header == "projection,fingerprint,result,error"
+
+    with pytest.raises(ValueError):
+        sweep.run(max_pending=0, executor=fake_executor())
+
+
+def test_run_with_jobs_completing_out_of_order(tmp_path, job_api):
+    projections = ["geographic", "mercator", "utm", "polar"]
+    checks = {"geographic": 6, "mercator": 1, "utm": 3, "polar": 1}
+    api = job_api(checks, key=lambda process: process.epct_chain.projection)
+    sweep = Sweep(_chain(), {"projection": projections}, api=api)
+    table = sweep.run(
+        max_pending=2, download=True, download_dir=str(tmp_path / "{job_id}"), poll_interval=0.01
+    )
+
+    assert api.completed.index("mercator") < api.completed.index("geographic")
+    assert [row["result"] for row in table] == [
+        [str(tmp_path / projection / f"{projection}.nc")] for projection in projections
+    ]
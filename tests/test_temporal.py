@@ -0,0 +1,84 @@
+from unittest.mock import Mock
+
+import pytest
+
+from eocanvas.exceptions import PartialFailureError
+from eocanvas.processes import ShearWaterProcess
+from eocanvas.temporal import TemporalChunker, split_date_range
+
+
+def test_split_date_range():
+    assert split_date_range("2020-01-01", "2020-01-10", days=4) == [
+        ("2020-01-01", "2020-01-04"),
+        ("2020-01-05", "2020-01-08"),
+        ("2020-01-09", "2020-01-10"),
+    ]
+    assert split_date_range("2019-11-15", "2020-03-01", months=2) == [
+        ("2019-11-15", "2020-01-14"),
+        ("2020-01-15", "2020-03-01"),
+    ]
+    assert split_date_range("2020-01-31", "2020-03-31", months=1) == [
+        ("2020-01-31", "2020-02-28"),
+        ("2020-02-29", "2020-03-30"),
+        ("2020-03-31", "2020-03-31"),
+    ]
+    with pytest.raises(ValueError):
+        split_date_range("2020-01-02", "2020-01-01", days=1)
+    with pytest.raises(ValueError):
+        split_date_range("2020-01-01", "2020-01-02")
+
+
+def _window(process):
+    return (process.start_day, process.end_day)
+
+
+def _window_result(process, count):
+    return [f"{process.start_day}.csv"]
+
+
+def test_run_in_order_with_retries(fake_executor):
+    process = ShearWaterProcess(
+        api=Mock(), area="Sindian", start_day="2020-01-01", end_day="2020-12-31"
+    )
+    chunker = TemporalChunker(process, months=3, retries=1)
+    executor = fake_executor({("2020-04-01", "2020-06-30"): 1}, _window, _window_result)
+    assert chunker.run(executor=executor) == [
+        "2020-01-01.csv",
+        "2020-04-01.csv",
+        "2020-07-01.csv",
+        "2020-10-01.csv",
+    ]
+    windows = [_window(process) for process in executor.processes]
+    assert windows.count(("2020-04-01", "2020-06-30")) == 2
+
+
+def test_run_partial_failure(fake_executor):
+    process = ShearWaterProcess(
+        api=Mock(), area="Sindian", start_day="2020-01-01", end_day="2020-01-20"
+    )
+    chunker = TemporalChunker(process, days=10, retries=2)
+    with pytest.raises(PartialFailureError) as e:
+        executor = fake_executor({("2020-01-11", "2020-01-20"): 3}, _window, _window_result)
+        chunker.run(executor=executor)
+    assert list(e.value.errors) == ["2020-01-11/2020-01-20"]
+    assert e.value.results == [["2020-01-01.csv"], None]
+
+    with pytest.raises(ValueError):
+        chunker.run(download_dir="out", executor=fake_executor())
+    with pytest.raises(ValueError):
+        chunker.run(executor=fake_executor(), max_workers=2)
+
+
+def test_run_with_jobs_completing_out_of_order(tmp_path, job_api):
+    checks = {"2020-01-01": 6, "2020-01-11": 1, "2020-01-21": 3}
+    api = job_api(checks, key=lambda process: process.start_day)
+    process = ShearWaterProcess(
+        api=api, area="Sindian", start_day="2020-01-01", end_day="2020-01-30"
+    )
+    chunker = TemporalChunker(process, days=10)
+    paths = chunker.run(download_dir=str(tmp_path), max_workers=3, poll_interval=0.01)
+
+    assert api.completed.index("2020-01-11") < api.completed.index("2020-01-01")
+    assert paths == [
+        str(tmp_path / day / f"{day}.nc") for day in ("2020-01-01", "2020-01-11", "2020-01-21")
+    ]
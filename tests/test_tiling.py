@@ -0,0 +1,112 @@
+from concurrent.futures import Future
+from unittest.mock import Mock
+
+import pytest
+
+from eocanvas.datatailor.chain import Chain, RegionOfInterest
+from eocanvas.datatailor.tiling import Tiler, format_nswe, mosaic, parse_nswe, split_roi
+
+
+def test_split_roi():
+    tiles = split_roi(RegionOfInterest(id="med", NSWE="45,35,0,20"), tile_size=(5, 10))
+    assert [(tile.row, tile.column) for tile in tiles] == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    assert [tile.roi.NSWE for tile in tiles] == [
+        "45,40,0,10",
+        "45,40,10,20",
+        "40,35,0,10",
+        "40,35,10,20",
+    ]
+    assert tiles[3].roi.id == "med_1_1"
+
+    tiles = split_roi(RegionOfInterest(NSWE="10,0,170,-170"), columns=2)
+    assert [tile.roi.NSWE for tile in tiles] == ["10,0,170,180", "10,0,-180,-170"]
+
+
+def test_parse_nswe():
+    assert parse_nswe("45.5, 35 -10 ,20") == (45.5, 35.0, -10.0, 20.0)
+    with pytest.raises(ValueError):
+        parse_nswe("35,45,0,20")
+    with pytest.raises(ValueError):
+        parse_nswe("35,45,0")
+
+
+def test_format_nswe():
+    assert format_nswe(45.0, 35.5, -10, 20) == "45,35.5,-10,20"
+    bounds = (45.123456789, 44.0000001, 12.3456789, 12.3456791)
+    assert parse_nswe(format_nswe(*bounds)) == bounds
+
+    tiles = split_roi(RegionOfInterest(NSWE="45.123456789,35,0,20"), rows=3)
+    edges = [parse_nswe(tile.roi.NSWE) for tile in tiles]
+    assert edges[0][0] == 45.123456789 and edges[-1][1] == 35
+    assert all(upper[1] == lower[0] for upper, lower in zip(edges, edges[1:]))
+
+
+def test_tiler_processes():
+    chain = Chain(product="OLL2WFR", roi={"NSWE": "45,35,0,20"})
+    tiler = Tiler(chain, rows=2, columns=1, api=Mock())
+    processes = tiler.processes()
+    assert [p.epct_chain.roi.NSWE for p in processes] == ["45,40,0,20", "40,35,0,20"]
+    assert chain.roi.NSWE == "45,35,0,20"
+
+    executor = Mock()
+    executor.submit.return_value = Future()
+    assert [tile for tile, _ in tiler.submit(executor)] == tiler.tiles
+    with pytest.raises(ValueError):
+        Tiler(Chain(product="OLL2WFR"))
+
+
+def test_mosaic(tmp_path):
+    np = pytest.importorskip("numpy")
+    rasterio = pytest.importorskip("rasterio")
+    from rasterio.transform import from_origin
+
+    data = np.arange(60, dtype=np.float32).reshape(6, 10)
+    data[0, 0] = np.nan
+    paths = []
+    for index, (row, column) in enumerate([(0, 0), (0, 5), (3, 0), (3, 5)]):
+        path = str(tmp_path / f"tile{index}.tif")
+        profile = {
+            "driver": "GTiff",
+            "height": 3,
+            "width": 5,
+            "count": 1,
+            "dtype": "float32",
+            "crs": "EPSG:4326",
+            "transform": from_origin(column * 0.5, 10 - row * 0.5, 0.5, 0.5),
+        }
+        with rasterio.open(path, "w", **profile) as dataset:
+            rows, columns = slice(row, row + 3), slice(column, column + 5)
+            dataset.write(data[rows, columns], 1)
+        paths.append(path)
+
+    output = mosaic(paths, str(tmp_path / "mosaic.tif"), block_size=4)
+    with rasterio.open(output) as result:
+        np.testing.assert_array_equal(result.read(1), data)
+        assert result.bounds.left == 0 and result.bounds.top == 10
+
+
+def test_mosaic_across_antimeridian(tmp_path):
+    np = pytest.importorskip("numpy")
+    rasterio = pytest.importorskip("rasterio")
+    from rasterio.transform import from_origin
+
+    paths = []
+    for index, west in enumerate([170.0, -180.0]):
+        path = str(tmp_path / f"tile{index}.tif")
+        profile = {
+            "driver": "GTiff",
+            "height": 2,
+            "width": 10,
+            "count": 1,
+            "dtype": "float32",
+            "crs": "EPSG:4326",
+            "transform": from_origin(west, 10.0, 1.0, 1.0),
+        }
+        with rasterio.open(path, "w", **profile) as dataset:
+            dataset.write(np.full((2, 10), index, dtype=np.float32), 1)
+        paths.append(path)
+
+    with rasterio.open(mosaic(paths, str(tmp_path / "mosaic.tif"))) as result:
+        assert result.width == 20
+        assert result.bounds.left == 170.0 and result.bounds.right == 190.0
+        assert result.read(1)[:, 15].tolist() == [1.0, 1.0]